@@ -1,7 +1,9 @@
+import json
 import os
-import google_auth_oauthlib.flow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import threading
+import time
+from datetime import datetime, timezone
+from googleapiclient.discovery import build_from_document
 from google.oauth2.credentials import Credentials
 
 # Scopes for accessing YouTube data (including private playlists and managing playlists)
@@ -10,26 +12,135 @@ SCOPES = [
     'https://www.googleapis.com/auth/youtube'
 ]
 
+TOKEN_PATH = os.environ.get('YOUTUBE_TOOL_TOKEN_PATH', 'token.json')
+
+# Local copy of the YouTube Data API discovery document, checked against the published revision once a week
+DISCOVERY_PATH = os.environ.get('YOUTUBE_TOOL_DISCOVERY_PATH', 'discovery-youtube-v3.json')
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest'
+DISCOVERY_CHECK_SECONDS = 7 * 24 * 60 * 60
+
+# Tokens are refreshed in the background once they get this close to expiring
+TOKEN_REFRESH_MARGIN_SECONDS = 5 * 60
+
+# Credentials of the authenticated service, reused for additional HTTP clients
+authenticated_credentials = None
+
+_token_lock = threading.Lock()
+
 def get_authenticated_service():
+    global authenticated_credentials
     # Load credentials from file or authorize if necessary
     credentials = None
-    if os.path.exists('token.json'):
-        credentials = Credentials.from_authorized_user_file('token.json', SCOPES)
+    if os.path.exists(TOKEN_PATH):
+        credentials = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
 
     # If there are no (valid) credentials available, let the user log in.
     if not credentials or not credentials.valid:
         if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
+            refresh_credentials(credentials)
         else:
+            # The OAuth flow is only imported for the first sign in
+            import google_auth_oauthlib.flow
             flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
                 os.environ['SECRET_JSON_YOUTUBE_API_PATH'], SCOPES)
             credentials = flow.run_local_server(port=0)
-        
-        # Save the credentials for the next run
-        with open('token.json', 'w') as token:
-            token.write(credentials.to_json())
+            save_credentials(credentials)
+
+    authenticated_credentials = credentials
+    start_background_refresh(credentials)
 
     # Build the YouTube API client with the OAuth credentials
-    youtube = build('youtube', 'v3', credentials=credentials)
+    youtube = build_from_document(get_discovery_document(), credentials=credentials)
     print("Authenticated successfully")
-    return youtube
\ No newline at end of file
+    return youtube
+
+def save_credentials(credentials):
+    # Save the credentials for the next run
+    with open(TOKEN_PATH, 'w') as token:
+        token.write(credentials.to_json())
+
+def refresh_credentials(credentials):
+    from google.auth.transport.requests import Request
+    with _token_lock:
+        credentials.refresh(Request())
+        save_credentials(credentials)
+
+def get_seconds_to_expiry(credentials):
+    if credentials.expiry is None:
+        return None
+    return (credentials.expiry.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+
+def start_background_refresh(credentials):
+    # Keeps the token fresh during long runs without blocking the caller
+    if not credentials.refresh_token or get_seconds_to_expiry(credentials) is None:
+        return
+
+    def refresh_before_expiry():
+        while True:
+            time.sleep(max(0, get_seconds_to_expiry(credentials) - TOKEN_REFRESH_MARGIN_SECONDS))
+            try:
+                refresh_credentials(credentials)
+            except Exception as e:
+                print(f"Error refreshing authorization token:\n{e}\n")
+                return
+
+    threading.Thread(target=refresh_before_expiry, daemon=True).start()
+
+def get_discovery_document():
+    document = None
+    checked_at = None
+    if os.path.exists(DISCOVERY_PATH):
+        with open(DISCOVERY_PATH) as f:
+            document = f.read()
+        checked_at = os.path.getmtime(DISCOVERY_PATH)
+
+    if document is not None and time.time() - checked_at < DISCOVERY_CHECK_SECONDS:
+        return document
+
+    # A failed check keeps the stored document until the next check instead of retrying on every run
+    published_document = fetch_discovery_document()
+    if published_document is None and document is None:
+        # Offline on the first run, start from the document bundled with googleapiclient
+        from googleapiclient import discovery_cache
+        published_document = discovery_cache.get_static_doc('youtube', 'v3')
+    if published_document is not None and (document is None or get_discovery_revision(published_document) != get_discovery_revision(document)):
+        document = published_document
+        save_discovery_document(document)
+    else:
+        os.utime(DISCOVERY_PATH)
+    return document
+
+def fetch_discovery_document():
+    try:
+        import httplib2
+        response, content = httplib2.Http(timeout=5).request(DISCOVERY_URL)
+        if response.status == 200:
+            return content.decode('utf-8')
+        print(f"Error retrieving discovery document: HTTP {response.status}")
+    except Exception as e:
+        print(f"Error retrieving discovery document:\n{e}\n")
+    return None
+
+def get_discovery_revision(document):
+    return json.loads(document).get('revision')
+
+def save_discovery_document(document):
+    temporary_path = f"{DISCOVERY_PATH}.tmp"
+    with open(temporary_path, 'w') as f:
+        f.write(document)
+    os.replace(temporary_path, DISCOVERY_PATH)
+
+def new_authorized_http():
+    # Separate authorized HTTP client for callers that execute requests from other threads
+    import httplib2
+    import google_auth_httplib2
+    return google_auth_httplib2.AuthorizedHttp(authenticated_credentials, http=httplib2.Http())
+
+def get_authorization_headers():
+    # Bearer token headers for HTTP clients outside googleapiclient, refreshing the token once it expires
+    headers = {}
+    if authenticated_credentials is not None:
+        if not authenticated_credentials.valid:
+            refresh_credentials(authenticated_credentials)
+        authenticated_credentials.apply(headers)
+    return headers
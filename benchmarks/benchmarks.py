@@ -0,0 +1,150 @@
+import contextlib
+import io
+import json
+import os
+import random
+import runpy
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from auth import auth
+from benchmarks.fake_api import CATEGORIES, FakeYouTubeApi
+from cache import cache
+from operations import async_engine
+from operations import dispatch
+from operations import executor
+from operations import operations
+from operations import urls
+from workflows import common
+
+# Offline benchmarks of the scripts and workflows against the fake YouTube Data API
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+SCENARIOS = ["resolve", "bulk-add", "bulk-remove", "divide"]
+
+# Share of the source videos already in the destination playlist, and share of deleted videos
+DESTINATION_OVERLAP = 0.5
+UNAVAILABLE_SHARE = 0.02
+
+def generate_library(api, size, seed=0):
+    generator = random.Random(seed)
+    category_ids = list(CATEGORIES)
+    video_ids = [api.add_video(f"Video {i}", generator.choice(category_ids)) for i in range(size)]
+    source_playlist_id = api.add_playlist("Source", video_ids)
+    destination_playlist_id = api.add_playlist("Destination", video_ids[:int(size * DESTINATION_OVERLAP)])
+
+    # Deleted videos stay in playlists but no longer have details
+    for video_id in generator.sample(video_ids, int(size * UNAVAILABLE_SHARE)):
+        del api.videos[video_id]
+
+    return {
+        "source_url": urls.get_playlist_url(source_playlist_id),
+        "destination_url": urls.get_playlist_url(destination_playlist_id)
+    }
+
+def get_scenario_argv(scenario, library, flags):
+    if scenario == "bulk-add":
+        return ["bulk-add-to-playlist.py", library["source_url"], library["destination_url"], "-force"] + flags
+    if scenario == "bulk-remove":
+        return ["bulk-remove-from-playlist.py", library["source_url"], library["destination_url"], "-force"] + flags
+    if scenario == "divide":
+        return ["divide-into-categories.py", library["source_url"], "-force", "-name"] + flags
+    return ["resolve", library["source_url"]] + flags
+
+def run_scenario(api, scenario, library, flags):
+    youtube = api.build_service()
+    argv = get_scenario_argv(scenario, library, flags)
+
+    def run():
+        if scenario == "resolve":
+            common.apply_command_flags(common.get_command_flags())
+            categories = operations.get_video_categories(youtube)
+            common.get_videos_at_hand(youtube, [library["source_url"]], categories)
+        else:
+            runpy.run_path(os.path.join(ROOT_PATH, argv[0]), run_name="__main__")
+
+    # Every script, worker thread and the async engine talk to the fake API
+    auth.get_authenticated_service = lambda: youtube
+    auth.new_authorized_http = lambda: api
+    executor.close()
+    if async_engine.is_available():
+        async_engine.settings["transport"] = async_engine.httpx.MockTransport(api.handle_async_request)
+        async_engine.close()
+
+    api.reset_counters()
+    sys.argv = argv
+    output = io.StringIO()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            run()
+    except SystemExit:
+        pass
+    wall_time = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "scenario": scenario,
+        "api_calls": api.counters["api_calls"],
+        "http_requests": api.counters["http_requests"],
+        "quota_units": api.counters["quota_units"],
+        "not_modified": api.counters["not_modified"],
+        "errors_injected": api.counters["errors_injected"],
+        "bytes_received": api.counters["bytes_received"],
+        "calls_by_method": api.counters["calls_by_method"],
+        "wall_time_seconds": round(wall_time, 3),
+        "peak_memory_bytes": peak_memory
+    }
+
+def run_benchmarks(sizes, scenarios, flags, latency=0.0, error_rate=0.0, warm=False):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        working_directory = os.getcwd()
+        saved_argv = sys.argv
+        saved_auth = (auth.get_authenticated_service, auth.new_authorized_http)
+        os.chdir(directory)
+        try:
+            for size in sizes:
+                for scenario in scenarios:
+                    # Every scenario starts from a fresh library and an empty cache
+                    dispatch.flush_quota_usage()
+                    cache.CACHE_PATH = os.path.join(directory, f"cache-{size}-{scenario}.sqlite")
+                    cache._connection = None
+                    api = FakeYouTubeApi(latency=latency, error_rate=error_rate)
+                    library = generate_library(api, size)
+                    runs = ["cold", "warm"] if warm else ["cold"]
+                    for run in runs:
+                        result = run_scenario(api, scenario, library, flags)
+                        result.update({"size": size, "run": run})
+                        results.append(result)
+                        print_result(result)
+        finally:
+            os.chdir(working_directory)
+            sys.argv = saved_argv
+            auth.get_authenticated_service, auth.new_authorized_http = saved_auth
+            async_engine.close()
+            async_engine.settings["transport"] = None
+            dispatch.flush_quota_usage()
+            cache._connection = None
+    return results
+
+def print_result(result):
+    print(
+        f"{result['scenario']:<12} {result['size']:>6} {result['run']:<5} "
+        f"calls={result['api_calls']:<7} http={result['http_requests']:<7} quota={result['quota_units']:<8} "
+        f"time={result['wall_time_seconds']:.3f}s peak_memory={result['peak_memory_bytes'] / 1024 / 1024:.1f}MiB"
+    )
+
+def save_results(results, settings):
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    filename = f"benchmark-{timestamp}.json"
+    with open(filename, 'w') as f:
+        json.dump({"settings": settings, "results": results}, f, indent=4)
+    print(f"Benchmark results saved to: {filename}")
+    return filename
@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.parse
+from email.parser import Parser
+import httplib2
+from googleapiclient.discovery import build
+
+# In-process fake of the YouTube Data API, plugged into googleapiclient as its HTTP object
+
+QUOTA_COSTS = {
+    "insert": 50,
+    "update": 50,
+    "delete": 50
+}
+
+CATEGORIES = {
+    "1": "Film & Animation",
+    "2": "Autos & Vehicles",
+    "10": "Music",
+    "15": "Pets & Animals",
+    "17": "Sports",
+    "20": "Gaming",
+    "22": "People & Blogs",
+    "23": "Comedy",
+    "24": "Entertainment",
+    "25": "News & Politics",
+    "26": "Howto & Style",
+    "27": "Education",
+    "28": "Science & Technology"
+}
+
+class FakeYouTubeApi:
+    # Thread safe: a single instance serves every worker thread
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.videos = {}
+        self.playlists = {}
+        self.item_playlists = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.RLock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.counters = {
+            "http_requests": 0,
+            "api_calls": 0,
+            "quota_units": 0,
+            "errors_injected": 0,
+            "not_modified": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "calls_by_method": {}
+        }
+
+    # Test data setup
+
+    def add_video(self, title, category_id):
+        with self.lock:
+            video_id = f"v{next(self.ids):010d}"
+            self.videos[video_id] = {"title": title, "categoryId": category_id}
+            return video_id
+
+    def add_playlist(self, title, video_ids=()):
+        with self.lock:
+            playlist_id = f"PL{next(self.ids):016d}"
+            self.playlists[playlist_id] = {
+                "title": title,
+                "items": [(self.new_item_id(playlist_id), video_id) for video_id in video_ids]
+            }
+            return playlist_id
+
+    def new_item_id(self, playlist_id):
+        item_id = f"PLI{next(self.ids):013d}"
+        self.item_playlists[item_id] = playlist_id
+        return item_id
+
+    def build_service(self):
+        return build('youtube', 'v3', http=self, static_discovery=True)
+
+    # httplib2.Http interface used by googleapiclient
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        if self.latency:
+            time.sleep(self.latency)
+        status, response_headers, content = self.handle_request(uri, method, body, headers)
+        return (httplib2.Response({"status": str(status), **response_headers}), content)
+
+    # httpx transport handler used by the async engine
+
+    async def handle_async_request(self, request):
+        import httpx
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = request.content.decode("utf-8") if request.content else None
+        status, response_headers, content = self.handle_request(str(request.url), request.method, body, dict(request.headers))
+        return httpx.Response(status, headers=response_headers, content=content)
+
+    def handle_request(self, uri, method, body, headers):
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        with self.lock:
+            self.counters["http_requests"] += 1
+            self.counters["bytes_sent"] += len(body or "")
+
+        parsed = urllib.parse.urlparse(uri)
+        if parsed.path.rstrip("/").endswith("/batch"):
+            status, response_headers, content = self.handle_batch(body, headers)
+        else:
+            status, content = self.handle_call(method, parsed.path, urllib.parse.parse_qs(parsed.query), body, headers)
+            response_headers = {"content-type": "application/json; charset=UTF-8"}
+
+        content = content.encode("utf-8")
+        with self.lock:
+            self.counters["bytes_received"] += len(content)
+        return (status, response_headers, content)
+
+    def handle_batch(self, body, headers):
+        message = Parser().parsestr(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+        boundary = "fake_batch_boundary"
+        parts = []
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().split("\n", 1)
+            part_method, part_uri, _ = request_line.split(" ", 2)
+            part_headers, _, part_body = rest.replace("\r\n", "\n").partition("\n\n")
+            part_headers = {
+                line.split(":", 1)[0].strip().lower(): line.split(":", 1)[1].strip()
+                for line in part_headers.split("\n") if ":" in line
+            }
+            parsed = urllib.parse.urlparse(part_uri)
+            status, content = self.handle_call(part_method, parsed.path, urllib.parse.parse_qs(parsed.query), part_body or None, part_headers)
+            content_id = part["Content-ID"]
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{content}\r\n"
+            )
+        content = "".join(parts) + f"--{boundary}--\r\n"
+        return (200, {"content-type": f"multipart/mixed; boundary={boundary}"}, content)
+
+    def handle_call(self, method, path, query, body, headers):
+        resource = path.rstrip("/").split("/")[-1]
+        params = {key: values[0] for key, values in query.items()}
+        http_method = method.upper()
+        method_name = {
+            "GET": "list",
+            "POST": "insert",
+            "PUT": "update",
+            "DELETE": "delete"
+        }.get(http_method, http_method.lower())
+
+        with self.lock:
+            self.counters["api_calls"] += 1
+            self.counters["quota_units"] += QUOTA_COSTS.get(method_name, 1)
+            method_key = f"{resource}.{method_name}"
+            self.counters["calls_by_method"][method_key] = self.counters["calls_by_method"].get(method_key, 0) + 1
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.counters["errors_injected"] += 1
+                status, response = error(503, "backendError") if self.random.random() < 0.5 else error(403, "rateLimitExceeded")
+                return (status, json.dumps(response))
+
+            handler = getattr(self, f"{resource}_{method_name}", None)
+            if handler is None:
+                status, response = error(404, "notFound")
+                return (status, json.dumps(response))
+            request_body = json.loads(body) if body else None
+            status, response = handler(params, request_body)
+            if status >= 300:
+                return (status, json.dumps(response))
+
+            # Conditional requests
+            if isinstance(response, dict) and "etag" in response and headers.get("if-none-match") == response["etag"]:
+                self.counters["not_modified"] += 1
+                return (304, "")
+            return (status, json.dumps(response) if response is not None else "")
+
+    # Resource handlers, called with the lock held
+
+    def videoCategories_list(self, params, body):
+        return (200, {
+            "items": [{"id": category_id, "snippet": {"title": title}} for category_id, title in CATEGORIES.items()]
+        })
+
+    def videos_list(self, params, body):
+        video_ids = params.get("id", "").split(",")
+        if len(video_ids) > 50:
+            return error(400, "tooManyIds")
+        return (200, {
+            "items": [
+                {"id": video_id, "snippet": dict(self.videos[video_id])}
+                for video_id in video_ids if video_id in self.videos
+            ]
+        })
+
+    def playlists_list(self, params, body):
+        if "id" in params:
+            playlist_ids = [playlist_id for playlist_id in params["id"].split(",") if playlist_id in self.playlists]
+        else:
+            playlist_ids = list(self.playlists)
+        offset = int(params.get("pageToken", 0))
+        page_size = int(params.get("maxResults", 5))
+        page_ids = playlist_ids[offset:offset + page_size]
+        response = {
+            "items": [self.playlist_resource(playlist_id) for playlist_id in page_ids]
+        }
+        if offset + page_size < len(playlist_ids):
+            response["nextPageToken"] = str(offset + page_size)
+        return (200, response)
+
+    def playlist_resource(self, playlist_id):
+        playlist = self.playlists[playlist_id]
+        return {
+            "id": playlist_id,
+            # Like the real service, the playlist ETag follows its metadata and item count, not which videos the items hold
+            "etag": etag(playlist["title"], len(playlist["items"])),
+            "snippet": {"title": playlist["title"]},
+            "contentDetails": {"itemCount": len(playlist["items"])}
+        }
+
+    def playlists_insert(self, params, body):
+        playlist_id = self.add_playlist(body["snippet"]["title"])
+        return (200, {"id": playlist_id, "snippet": body["snippet"]})
+
+    def playlistItems_list(self, params, body):
+        playlist = self.playlists.get(params.get("playlistId"))
+        if playlist is None:
+            return error(404, "playlistNotFound")
+        offset = int(params.get("pageToken", 0))
+        page_size = min(int(params.get("maxResults", 5)), 50)
+        page_items = playlist["items"][offset:offset + page_size]
+        response = {
+            "etag": etag(offset, page_items),
+            "items": [{"id": item_id, "contentDetails": {"videoId": video_id}} for item_id, video_id in page_items]
+        }
+        if offset + page_size < len(playlist["items"]):
+            response["nextPageToken"] = str(offset + page_size)
+        return (200, response)
+
+    def playlistItems_insert(self, params, body):
+        snippet = body["snippet"]
+        playlist = self.playlists.get(snippet["playlistId"])
+        if playlist is None:
+            return error(404, "playlistNotFound")
+        video_id = snippet["resourceId"]["videoId"]
+        if video_id not in self.videos:
+            return error(404, "videoNotFound")
+        position = snippet.get("position", len(playlist["items"]))
+        if position > len(playlist["items"]):
+            return error(400, "invalidPlaylistItemPosition")
+        item_id = self.new_item_id(snippet["playlistId"])
+        playlist["items"].insert(position, (item_id, video_id))
+        return (200, {"id": item_id, "snippet": snippet})
+
+    def playlistItems_update(self, params, body):
+        snippet = body["snippet"]
+        playlist = self.playlists.get(snippet["playlistId"])
+        if playlist is None:
+            return error(404, "playlistNotFound")
+        for index, (item_id, video_id) in enumerate(playlist["items"]):
+            if item_id == body["id"]:
+                del playlist["items"][index]
+                position = min(snippet.get("position", index), len(playlist["items"]))
+                playlist["items"].insert(position, (item_id, video_id))
+                return (200, {"id": item_id, "snippet": snippet})
+        return error(404, "playlistItemNotFound")
+
+    def playlistItems_delete(self, params, body):
+        item_id = params.get("id")
+        playlist_id = self.item_playlists.pop(item_id, None)
+        if playlist_id is None:
+            return error(404, "playlistItemNotFound")
+        items = self.playlists[playlist_id]["items"]
+        for index, (playlist_item_id, video_id) in enumerate(items):
+            if playlist_item_id == item_id:
+                del items[index]
+                break
+        return (204, None)
+
+def etag(*values):
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()
+
+def error(status, reason):
+    return (status, {
+        "error": {
+            "code": status,
+            "message": reason,
+            "errors": [{"reason": reason, "message": reason}]
+        }
+    })
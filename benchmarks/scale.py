@@ -0,0 +1,229 @@
+import contextlib
+import json
+import math
+import os
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks import benchmarks
+from benchmarks.fake_api import CATEGORIES
+from manifest import manifest
+from models.models import Video, VideoCollection
+from operations import operations
+from operations import urls
+from planner import planner
+from reports import reports
+from workflows import common
+
+# Scale tests of the in-memory code paths and of the workflows against the fake YouTube Data API
+# Each path runs on synthetic datasets of growing size, its growth exponents and machine independent costs are checked against a stored baseline
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scale-baseline.json")
+
+# Paths only run in memory, workflows go through the scripts and the fake API
+MEMORY_PATHS = ["add-preview", "remove-preview", "categorize", "clean-data", "manifest", "sync-plan"]
+WORKFLOW_PATHS = ["bulk-add", "bulk-remove", "divide"]
+PATHS = MEMORY_PATHS + WORKFLOW_PATHS
+
+# The fake API serves the workflows far slower than the in-memory paths run, so larger sizes skip them
+MAX_WORKFLOW_SIZE = 10000
+WORKFLOW_FLAGS = ['-rate', "100000.0", '-workers', "1", '-engine', "sync", '-nocache']
+
+# Fast paths repeat until they ran this long, the best run counts
+MIN_MEASURE_SECONDS = 0.5
+MAX_REPEATS = 20
+
+# Shares of the destination the sync target moves to the end of the playlist, and of the other videos it adds
+SYNC_MOVED_SHARE = 0.001
+SYNC_ADDED_SHARE = 0.02
+
+# A path regresses when its growth exponent (1 for linear, 2 for quadratic) exceeds the baseline's by more than the tolerance,
+# or its peak memory or API calls grow past the baseline times the threshold
+# Wall times depend on the machine, so they only count through the time exponent
+DEFAULT_THRESHOLD = 1.5
+EXPONENT_TOLERANCE = 0.25
+COUNTED_KEYS = ["peak_memory_bytes", "api_calls", "http_requests"]
+
+DESTINATION_URL = urls.get_playlist_url("PLscaledestination")
+
+def generate_dataset(size, seed=0):
+    # Videos, a destination playlist holding part of them and the lines of a manifest listing them
+    generator = random.Random(seed)
+    category_names = list(CATEGORIES.values())
+    videos = VideoCollection(
+        Video(f"v{index:010d}", f"Video {index}", generator.choice(category_names), f"PLI{index:013d}")
+        for index in range(size)
+    )
+    destination = VideoCollection(
+        Video(f"v{index:010d}", playlist_item_id=f"PLD{index:013d}")
+        for index in range(int(size * benchmarks.DESTINATION_OVERLAP))
+    )
+    return {
+        "seed": seed,
+        "videos": videos,
+        "destination": destination,
+        "manifest_lines": [f"{video.video_url}\n" for video in videos.values()]
+    }
+
+def get_path_function(path, dataset):
+    # Returns the function running the path over the dataset, building its other inputs beforehand
+    videos = dataset["videos"]
+    destination = dataset["destination"]
+    if path == "add-preview":
+        return lambda: operations.add_videos_to_playlist(None, videos, DESTINATION_URL, destination, is_preview=True, show_progress=False)
+    if path == "remove-preview":
+        return lambda: operations.remove_videos_from_playlist(None, videos, DESTINATION_URL, destination, is_preview=True, show_progress=False)
+    if path == "categorize":
+        return lambda: [
+            common.get_category_preview_data(category_videos, destination)
+            for category_videos in common.categorize_videos(videos).values()
+        ]
+    if path == "clean-data":
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result_data = operations.add_videos_to_playlist(None, videos, DESTINATION_URL, destination, is_preview=True, show_progress=False)
+        data = {
+            "input_data": {
+                "playlist_url": DESTINATION_URL,
+                "videos_to_add": list(videos.values()),
+                "videos_to_add_total": len(videos)
+            },
+            "result_data": result_data
+        }
+        return lambda: reports.clean_data(data)
+    if path == "manifest":
+        return lambda: list(manifest.iter_entries(dataset["manifest_lines"]))
+    if path == "sync-plan":
+        # The target keeps the destination's order but for a few videos moved to the end, and adds a few other videos
+        generator = random.Random(dataset["seed"])
+        destination_video_ids = list(destination)
+        other_video_ids = [video_id for video_id in videos if video_id not in destination]
+        moved = set(generator.sample(destination_video_ids, int(len(destination_video_ids) * SYNC_MOVED_SHARE)))
+        target_video_ids = dict.fromkeys(
+            [video_id for video_id in destination_video_ids if video_id not in moved]
+            + [video_id for video_id in destination_video_ids if video_id in moved]
+            + generator.sample(other_video_ids, int(len(other_video_ids) * SYNC_ADDED_SHARE))
+        )
+        return lambda: planner.plan_sync(target_video_ids, destination_video_ids, videos, reorder=True)
+    raise ValueError(f"Unknown scale test path: {path}")
+
+def measure(function):
+    # Best wall time of untraced runs, then the peak memory of one traced run, as tracing slows the code down
+    # Operations report every video they check, that output is dropped
+    timings = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        measure_start = time.perf_counter()
+        while len(timings) == 0 or (time.perf_counter() - measure_start < MIN_MEASURE_SECONDS and len(timings) < MAX_REPEATS):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            function()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return (min(timings), peak_memory)
+
+def run_path(path, size, dataset):
+    if path in WORKFLOW_PATHS:
+        # Workflows are measured by the benchmarks, with the time and memory of a single traced run
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = benchmarks.run_benchmarks([size], [path], WORKFLOW_FLAGS)[0]
+        measurement = {
+            "api_calls": result["api_calls"],
+            "http_requests": result["http_requests"]
+        }
+        seconds, peak_memory = result["wall_time_seconds"], result["peak_memory_bytes"]
+    else:
+        measurement = {}
+        seconds, peak_memory = measure(get_path_function(path, dataset))
+    return {
+        "size": size,
+        "seconds": round(seconds, 6),
+        "items_per_second": round(size / seconds) if seconds > 0 else None,
+        "peak_memory_bytes": peak_memory,
+        **measurement
+    }
+
+def get_exponent(measurements, key):
+    # Least squares slope of the log-log curve, how the cost grows with the size
+    points = [(math.log(measurement["size"]), math.log(measurement[key])) for measurement in measurements if measurement[key] > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, y in points) / len(points)
+    mean_y = sum(y for x, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, y in points)
+    if variance == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / variance, 3)
+
+def run_scale_tests(sizes, paths):
+    results = {}
+    for path in paths:
+        results[path] = {"measurements": []}
+    for size in sizes:
+        dataset = generate_dataset(size)
+        for path in paths:
+            if path in WORKFLOW_PATHS and size > MAX_WORKFLOW_SIZE:
+                continue
+            measurement = run_path(path, size, dataset)
+            results[path]["measurements"].append(measurement)
+            print_measurement(path, measurement)
+    for path, result in results.items():
+        result["time_exponent"] = get_exponent(result["measurements"], "seconds")
+        result["memory_exponent"] = get_exponent(result["measurements"], "peak_memory_bytes")
+        print(f"{path:<15} time_exponent={result['time_exponent']} memory_exponent={result['memory_exponent']}")
+    return results
+
+def print_measurement(path, measurement):
+    print(
+        f"{path:<15} {measurement['size']:>8} time={measurement['seconds']:.4f}s "
+        f"throughput={measurement['items_per_second'] or 0:>10}/s peak_memory={measurement['peak_memory_bytes'] / 1024 / 1024:.1f}MiB"
+    )
+
+def get_regressions(results, baseline, threshold):
+    # Compares each path at the largest size both runs measured, paths or sizes missing from the baseline are not checked
+    regressions = []
+    for path, result in results.items():
+        baseline_result = baseline.get(path)
+        if baseline_result is None:
+            print(f"{path}: not in the baseline, skipped")
+            continue
+        for key in ["time_exponent", "memory_exponent"]:
+            if result[key] is not None and baseline_result.get(key) is not None and result[key] > baseline_result[key] + EXPONENT_TOLERANCE:
+                regressions.append(f"{path}: {key} {result[key]} exceeds the baseline {baseline_result[key]}")
+
+        baseline_measurements = {measurement["size"]: measurement for measurement in baseline_result["measurements"]}
+        common_sizes = [measurement["size"] for measurement in result["measurements"] if measurement["size"] in baseline_measurements]
+        if len(common_sizes) == 0:
+            continue
+        size = max(common_sizes)
+        measurement = next(measurement for measurement in result["measurements"] if measurement["size"] == size)
+        for key in COUNTED_KEYS:
+            baseline_value = baseline_measurements[size].get(key)
+            if key in measurement and baseline_value is not None and baseline_value > 0 and measurement[key] > baseline_value * threshold:
+                regressions.append(f"{path}: {key} at size {size} is {measurement[key] / baseline_value:.2f}x the baseline")
+    return regressions
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)["results"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not read scale test baseline {path}:\n{e}\n")
+        return None
+
+def save_baseline(results, settings, path):
+    with open(path, 'w') as f:
+        json.dump({"settings": settings, "results": results}, f, indent=4)
+    print(f"Scale test baseline saved to: {path}")
+
+def save_results(results, settings):
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    filename = f"scale-{timestamp}.json"
+    with open(filename, 'w') as f:
+        json.dump({"settings": settings, "results": results}, f, indent=4)
+    print(f"Scale test results saved to: {filename}")
+    return filename
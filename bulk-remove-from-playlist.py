@@ -1,14 +1,25 @@
 import sys
 
-from auth import auth
-from workflows import workflows
-from operations import operations
-
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python bulk-remove-from-playlist.py <comma_separated_video_or_playlist_urls_to_remove> <playlist_url_to_remove_from> [-force] [-previewonly]")
+    # Execution plans written by an earlier preview already hold the input and the playlists
+    if len(sys.argv) < 3 and '-execute-plan' not in sys.argv:
+        print("Usage: python bulk-remove-from-playlist.py <comma_separated_video_or_playlist_urls_to_remove|@manifest_path|@-> <comma_separated_playlist_urls_to_remove_from> [-force] [-previewonly] [-nocache] [-refresh] [-library] [-workers N] [-budget N] [-dailybudget N] [-rate R] [-resume <journal>] [-stream] [-report json|ndjson|ndjson.gz] [-profile] [-prometheus <path>] [-engine sync|async] [-concurrency N] [-server <host:port>]")
+        print("       python bulk-remove-from-playlist.py -execute-plan <plan> [-workers N] [-rate R] [-budget N] [-resume <journal>] [-report json|ndjson|ndjson.gz] [-server <host:port>]")
         sys.exit(1)
 
+    from manifest import manifest
+    manifest.check_stdin_argument(sys.argv)
+
+    # Hand the job to a running server instead of running it in this process
+    if '-server' in sys.argv:
+        from server import client
+        client.run_remote_workflow("bulk-remove", sys.argv)
+
+    # The Google client stack is only imported once the arguments are valid
+    from auth import auth
+    from workflows import workflows
+    from operations import operations
+
     youtube = auth.get_authenticated_service()
     workflows.bulk_videos_playlist_workflow(youtube, videos_at_hand_label="videos_to_remove", playlist_function=operations.remove_videos_from_playlist)
 
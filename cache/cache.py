@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Local metadata cache shared by all scripts
+
+CACHE_PATH = os.environ.get('YOUTUBE_TOOL_CACHE_PATH', 'cache.sqlite')
+
+# Entries older than their TTL are treated as missing and fetched again
+VIDEO_TTL_SECONDS = 7 * 24 * 60 * 60
+CATEGORIES_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Least recently used video entries are evicted past this size
+MAX_VIDEO_ENTRIES = 250000
+
+# SQLite limits the number of bound parameters per statement
+SQLITE_MAX_PARAMETERS = 500
+
+settings = {
+    "enabled": True,
+    "refresh": False
+}
+
+_connection = None
+
+# Categories are also kept in memory, so long-running processes never query them twice
+_memory_categories = {}
+_lock = threading.RLock()
+
+def configure(enabled=True, refresh=False):
+    settings["enabled"] = enabled
+    settings["refresh"] = refresh
+
+def is_readable():
+    return settings["enabled"] and not settings["refresh"]
+
+def is_writable():
+    return settings["enabled"]
+
+def get_connection():
+    global _connection
+    with _lock:
+        if _connection is None:
+            _connection = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+            _connection.execute("PRAGMA journal_mode=WAL")
+            _connection.execute("""
+                CREATE TABLE IF NOT EXISTS video_details (
+                    video_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    category_id TEXT,
+                    expires_at REAL,
+                    last_access REAL
+                )
+            """)
+            _connection.execute("CREATE INDEX IF NOT EXISTS video_details_last_access ON video_details (last_access)")
+            _connection.execute("""
+                CREATE TABLE IF NOT EXISTS video_categories (
+                    region_code TEXT PRIMARY KEY,
+                    categories TEXT,
+                    expires_at REAL
+                )
+            """)
+            _connection.execute("""
+                CREATE TABLE IF NOT EXISTS quota_usage (
+                    day TEXT PRIMARY KEY,
+                    units INTEGER
+                )
+            """)
+            _connection.commit()
+        return _connection
+
+def get_video_details(video_ids):
+    # Returns cached snippets for fresh entries and the IDs that still need fetching
+    if not is_readable():
+        return ({}, list(video_ids))
+
+    video_details = {}
+    now = time.time()
+    unique_video_ids = list(dict.fromkeys(video_ids))
+    try:
+        with _lock:
+            connection = get_connection()
+            for i in range(0, len(unique_video_ids), SQLITE_MAX_PARAMETERS):
+                chunk = unique_video_ids[i:i + SQLITE_MAX_PARAMETERS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT video_id, title, category_id FROM video_details WHERE video_id IN ({placeholders}) AND expires_at > ?",
+                    chunk + [now]
+                ).fetchall()
+                for video_id, title, category_id in rows:
+                    video_details[video_id] = {"title": title, "categoryId": category_id}
+                connection.execute(
+                    f"UPDATE video_details SET last_access = ? WHERE video_id IN ({placeholders})",
+                    [now] + chunk
+                )
+            connection.commit()
+    except Exception as e:
+        print(f"Error reading video details cache:\n{e}\n")
+        return ({}, unique_video_ids)
+
+    missing_video_ids = [video_id for video_id in unique_video_ids if video_id not in video_details]
+    return (video_details, missing_video_ids)
+
+def put_video_details(video_details):
+    if not is_writable() or len(video_details) == 0:
+        return
+
+    now = time.time()
+    try:
+        with _lock:
+            connection = get_connection()
+            connection.executemany(
+                "INSERT OR REPLACE INTO video_details (video_id, title, category_id, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (video_id, snippet.get("title"), snippet.get("categoryId"), now + VIDEO_TTL_SECONDS, now)
+                    for video_id, snippet in video_details.items()
+                ]
+            )
+            evict_video_details(connection)
+            connection.commit()
+    except Exception as e:
+        print(f"Error writing video details cache:\n{e}\n")
+
+def evict_video_details(connection):
+    # Drop expired entries first, then the least recently used ones past the size bound
+    connection.execute("DELETE FROM video_details WHERE expires_at <= ?", (time.time(),))
+    total = connection.execute("SELECT COUNT(*) FROM video_details").fetchone()[0]
+    if total > MAX_VIDEO_ENTRIES:
+        connection.execute(
+            "DELETE FROM video_details WHERE video_id IN (SELECT video_id FROM video_details ORDER BY last_access ASC LIMIT ?)",
+            (total - MAX_VIDEO_ENTRIES,)
+        )
+
+def get_video_categories(region_code):
+    if not is_readable():
+        return None
+    memory_entry = _memory_categories.get(region_code)
+    if memory_entry is not None and memory_entry[1] > time.time():
+        return memory_entry[0]
+    try:
+        with _lock:
+            row = get_connection().execute(
+                "SELECT categories, expires_at FROM video_categories WHERE region_code = ? AND expires_at > ?",
+                (region_code, time.time())
+            ).fetchone()
+        if not row:
+            return None
+        categories = json.loads(row[0])
+        _memory_categories[region_code] = (categories, row[1])
+        return categories
+    except Exception as e:
+        print(f"Error reading video categories cache:\n{e}\n")
+        return None
+
+def put_video_categories(region_code, categories):
+    if not is_writable():
+        return
+    _memory_categories[region_code] = (categories, time.time() + CATEGORIES_TTL_SECONDS)
+    try:
+        with _lock:
+            connection = get_connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO video_categories (region_code, categories, expires_at) VALUES (?, ?, ?)",
+                (region_code, json.dumps(categories), time.time() + CATEGORIES_TTL_SECONDS)
+            )
+            connection.commit()
+    except Exception as e:
+        print(f"Error writing video categories cache:\n{e}\n")
+
+# Quota usage is always tracked, independent of the cache flags
+
+def get_quota_usage(day):
+    try:
+        with _lock:
+            row = get_connection().execute("SELECT units FROM quota_usage WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
+    except Exception as e:
+        print(f"Error reading quota usage:\n{e}\n")
+        return 0
+
+def add_quota_usage(day, units):
+    try:
+        with _lock:
+            connection = get_connection()
+            connection.execute(
+                "INSERT INTO quota_usage (day, units) VALUES (?, ?) ON CONFLICT(day) DO UPDATE SET units = units + excluded.units",
+                (day, units)
+            )
+            connection.commit()
+    except Exception as e:
+        print(f"Error writing quota usage:\n{e}\n")
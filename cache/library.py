@@ -0,0 +1,163 @@
+import time
+from cache import cache
+
+# Inverted index of the user's playlists stored next to the metadata cache, video ID to the playlist items holding it
+
+def create_tables(connection):
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS library_playlists (
+            playlist_id TEXT PRIMARY KEY,
+            title TEXT,
+            etag TEXT,
+            item_count INTEGER,
+            updated_at REAL
+        )
+    """)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS library_items (
+            playlist_id TEXT,
+            position INTEGER,
+            video_id TEXT,
+            playlist_item_id TEXT,
+            PRIMARY KEY (playlist_id, position)
+        )
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS library_items_video_id ON library_items (video_id)")
+
+def get_playlists():
+    # Returns {playlist_id: {"title", "etag", "item_count"}} of the indexed playlists
+    if not cache.is_writable():
+        return {}
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            rows = connection.execute("SELECT playlist_id, title, etag, item_count FROM library_playlists").fetchall()
+        return {
+            playlist_id: {"title": title, "etag": etag, "item_count": item_count}
+            for playlist_id, title, etag, item_count in rows
+        }
+    except Exception as e:
+        print(f"Error reading library index:\n{e}\n")
+        return {}
+
+def put_playlist(playlist_id, title, etag, items):
+    # Replaces the indexed items of the playlist, items are playlistItems resources in playlist order
+    if not cache.is_writable():
+        return
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            connection.execute("DELETE FROM library_items WHERE playlist_id = ?", (playlist_id,))
+            connection.executemany(
+                "INSERT INTO library_items (playlist_id, position, video_id, playlist_item_id) VALUES (?, ?, ?, ?)",
+                [
+                    (playlist_id, position, item["contentDetails"]["videoId"], item["id"])
+                    for position, item in enumerate(items)
+                ]
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO library_playlists (playlist_id, title, etag, item_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (playlist_id, title, etag, len(items), time.time())
+            )
+            connection.commit()
+    except Exception as e:
+        print(f"Error writing playlist {playlist_id} to the library index:\n{e}\n")
+
+def delete_playlists(playlist_ids):
+    if not cache.is_writable() or len(playlist_ids) == 0:
+        return
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            for playlist_id in playlist_ids:
+                connection.execute("DELETE FROM library_items WHERE playlist_id = ?", (playlist_id,))
+                connection.execute("DELETE FROM library_playlists WHERE playlist_id = ?", (playlist_id,))
+            connection.commit()
+    except Exception as e:
+        print(f"Error deleting playlists from the library index:\n{e}\n")
+
+def get_video_memberships(video_ids):
+    # Returns {video_id: {playlist_id: [playlist_item_id, ...]}} for the indexed videos among video_ids
+    memberships = {}
+    if not cache.is_writable():
+        return memberships
+    unique_video_ids = list(dict.fromkeys(video_ids))
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            for i in range(0, len(unique_video_ids), cache.SQLITE_MAX_PARAMETERS):
+                chunk = unique_video_ids[i:i + cache.SQLITE_MAX_PARAMETERS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    f"SELECT video_id, playlist_id, playlist_item_id FROM library_items WHERE video_id IN ({placeholders}) ORDER BY playlist_id, position",
+                    chunk
+                ).fetchall()
+                for video_id, playlist_id, playlist_item_id in rows:
+                    memberships.setdefault(video_id, {}).setdefault(playlist_id, []).append(playlist_item_id)
+    except Exception as e:
+        print(f"Error reading library index:\n{e}\n")
+    return memberships
+
+def get_duplicate_items(playlist_ids=None):
+    # Returns {playlist_id: {video_id: [playlist_item_id, ...]}} for videos held more than once by the same playlist
+    duplicates = {}
+    if not cache.is_writable():
+        return duplicates
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            rows = connection.execute("""
+                SELECT items.playlist_id, items.video_id, items.playlist_item_id
+                FROM library_items AS items
+                JOIN (
+                    SELECT playlist_id, video_id FROM library_items
+                    GROUP BY playlist_id, video_id HAVING COUNT(*) > 1
+                ) AS repeated ON items.playlist_id = repeated.playlist_id AND items.video_id = repeated.video_id
+                ORDER BY items.playlist_id, items.position
+            """).fetchall()
+        for playlist_id, video_id, playlist_item_id in rows:
+            if playlist_ids is None or playlist_id in playlist_ids:
+                duplicates.setdefault(playlist_id, {}).setdefault(video_id, []).append(playlist_item_id)
+    except Exception as e:
+        print(f"Error reading library index:\n{e}\n")
+    return duplicates
+
+def get_playlist_items(playlist_id):
+    # Returns [(video_id, playlist_item_id), ...] in playlist order, or None when the playlist is not indexed
+    if not cache.is_writable():
+        return None
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            if connection.execute("SELECT 1 FROM library_playlists WHERE playlist_id = ?", (playlist_id,)).fetchone() is None:
+                return None
+            return connection.execute(
+                "SELECT video_id, playlist_item_id FROM library_items WHERE playlist_id = ? ORDER BY position",
+                (playlist_id,)
+            ).fetchall()
+    except Exception as e:
+        print(f"Error reading library index:\n{e}\n")
+        return None
+
+def find_playlist_id(title):
+    # Indexed playlist with exactly this title, used to reuse category playlists
+    if not cache.is_writable():
+        return None
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            row = connection.execute(
+                "SELECT playlist_id FROM library_playlists WHERE title = ? ORDER BY playlist_id LIMIT 1",
+                (title,)
+            ).fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        print(f"Error reading library index:\n{e}\n")
+        return None
@@ -0,0 +1,96 @@
+import json
+import time
+from cache import cache
+
+# Playlist snapshots stored next to the metadata cache
+# Each page keeps its own ETag, reads send it as If-None-Match and only re-download the pages that changed
+
+def create_tables(connection):
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS playlist_snapshots (
+            playlist_id TEXT PRIMARY KEY,
+            updated_at REAL
+        )
+    """)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS playlist_snapshot_pages (
+            playlist_id TEXT,
+            page_index INTEGER,
+            page_token TEXT,
+            etag TEXT,
+            next_page_token TEXT,
+            items TEXT,
+            PRIMARY KEY (playlist_id, page_index)
+        )
+    """)
+
+def get_snapshot(playlist_id):
+    if not cache.is_readable():
+        return None
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            row = connection.execute(
+                "SELECT playlist_id FROM playlist_snapshots WHERE playlist_id = ?",
+                (playlist_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            page_rows = connection.execute(
+                "SELECT page_token, etag, next_page_token, items FROM playlist_snapshot_pages WHERE playlist_id = ? ORDER BY page_index",
+                (playlist_id,)
+            ).fetchall()
+        return {
+            "pages": [
+                {
+                    "page_token": page_token,
+                    "etag": etag,
+                    "next_page_token": next_page_token,
+                    "items": json.loads(items)
+                }
+                for page_token, etag, next_page_token, items in page_rows
+            ]
+        }
+    except Exception as e:
+        print(f"Error reading playlist {playlist_id} snapshot:\n{e}\n")
+        return None
+
+def put_snapshot(playlist_id, pages):
+    if not cache.is_writable():
+        return
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            connection.execute("DELETE FROM playlist_snapshot_pages WHERE playlist_id = ?", (playlist_id,))
+            connection.executemany(
+                "INSERT INTO playlist_snapshot_pages (playlist_id, page_index, page_token, etag, next_page_token, items) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (playlist_id, page_index, page["page_token"], page["etag"], page["next_page_token"], json.dumps(page["items"]))
+                    for page_index, page in enumerate(pages)
+                ]
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO playlist_snapshots (playlist_id, updated_at) VALUES (?, ?)",
+                (playlist_id, time.time())
+            )
+            connection.commit()
+    except Exception as e:
+        print(f"Error writing playlist {playlist_id} snapshot:\n{e}\n")
+
+def delete_snapshot(playlist_id):
+    if not cache.is_writable():
+        return
+    try:
+        with cache._lock:
+            connection = cache.get_connection()
+            create_tables(connection)
+            connection.execute("DELETE FROM playlist_snapshot_pages WHERE playlist_id = ?", (playlist_id,))
+            connection.execute("DELETE FROM playlist_snapshots WHERE playlist_id = ?", (playlist_id,))
+            connection.commit()
+    except Exception as e:
+        print(f"Error deleting playlist {playlist_id} snapshot:\n{e}\n")
+
+def get_snapshot_items(snapshot):
+    return [item for page in snapshot["pages"] for item in page["items"]]
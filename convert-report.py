@@ -0,0 +1,23 @@
+import json
+import sys
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python convert-report.py <ndjson_report_path> [<json_output_path>]")
+        sys.exit(1)
+
+    from reports import reports
+
+    report_path = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else report_path.removesuffix(".gz").removesuffix(".ndjson") + ".json"
+    if output_path == report_path:
+        print("The report is already a JSON document.")
+        sys.exit(1)
+
+    data = reports.load_report(report_path)
+    with open(output_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    print(f"Report converted to: {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,22 @@
 import sys
 
-from auth import auth
-from workflows import workflows
-
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python divide-into-categories.py <comma_separated_video_or_playlist_urls_to_divide> [-force] [-previewonly] [-name]")
+        print("Usage: python divide-into-categories.py <comma_separated_video_or_playlist_urls_to_divide|@manifest_path|@-> [-force] [-previewonly] [-name] [-nocache] [-refresh] [-library] [-workers N] [-ordered] [-budget N] [-dailybudget N] [-rate R] [-resume <journal>] [-stream] [-report json|ndjson|ndjson.gz] [-profile] [-prometheus <path>] [-engine sync|async] [-concurrency N] [-server <host:port>]")
         sys.exit(1)
 
+    from manifest import manifest
+    manifest.check_stdin_argument(sys.argv, prompts_names=True)
+
+    # Hand the job to a running server instead of running it in this process
+    if '-server' in sys.argv:
+        from server import client
+        client.run_remote_workflow("divide", sys.argv)
+
+    # The Google client stack is only imported once the arguments are valid
+    from auth import auth
+    from workflows import workflows
+
     youtube = auth.get_authenticated_service()
     workflows.divide_into_categories_workflow(youtube)
 
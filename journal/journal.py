@@ -0,0 +1,157 @@
+import atexit
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+# Append-only JSONL journal of completed work, used to resume interrupted runs
+# The file is only opened once mutations are about to run, and deleted when the run finishes without failed ones
+
+# Records are flushed immediately but only fsynced every few records
+FSYNC_EVERY_RECORDS = 20
+
+state = {
+    "path": None,
+    "file": None,
+    "unsynced_records": 0,
+    # Records made before the file is opened, such as the resolved input
+    "unwritten": [],
+    "failures": 0,
+    "input": None,
+    "completed": set(),
+    "playlists": {}
+}
+
+_lock = threading.Lock()
+
+def start(resume_path=None):
+    # A previous run in the same process must not leak into this one
+    close()
+    state["input"] = None
+    state["completed"] = set()
+    state["playlists"] = {}
+    state["unsynced_records"] = 0
+    state["unwritten"] = []
+    state["failures"] = 0
+    state["path"] = None
+
+    if resume_path is not None:
+        if not os.path.exists(resume_path):
+            print(f"Journal {resume_path} not found.")
+            sys.exit(1)
+        load(resume_path)
+        state["path"] = resume_path
+        print(f"Resuming from journal {resume_path}")
+
+def begin():
+    # Called before mutations are sent, previews and read-only runs never create a journal file
+    with _lock:
+        if state["file"] is not None:
+            return
+        if state["path"] is None:
+            state["path"] = get_new_path("journal", "jsonl")
+        journal_file = open(state["path"], 'a')
+        if journal_file.tell() > 0 and not ends_with_newline(state["path"]):
+            journal_file.write("\n")
+        for entry in state["unwritten"]:
+            journal_file.write(json.dumps(entry) + "\n")
+        journal_file.flush()
+        state["unwritten"] = []
+        state["file"] = journal_file
+        # The path is only known once the first change is about to be sent, and is the one to resume an interrupted run with
+        print(f"Journal of this run: {state['path']} (resume it with -resume {state['path']} if the run is interrupted)")
+
+def finish():
+    # A run that completed every mutation leaves nothing to resume, so its journal is deleted
+    close()
+    with _lock:
+        path = state["path"]
+        if path is None or state["failures"] > 0 or not os.path.exists(path):
+            return
+        os.remove(path)
+        state["path"] = None
+
+def get_new_path(prefix, extension):
+    # Runs started within the same second, such as queued server jobs, must not share a file
+    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    path = f"{prefix}-{timestamp}.{extension}"
+    suffix = 1
+    while os.path.exists(path):
+        path = f"{prefix}-{timestamp}-{suffix}.{extension}"
+        suffix += 1
+    return path
+
+def ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def load(path):
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a partially written last line behind
+                continue
+            apply_record(record)
+
+def apply_record(record):
+    record_type = record["type"]
+    if record_type == "input":
+        state["input"] = record
+    elif record_type in ("insert", "delete"):
+        state["completed"].add((record_type, record["playlist_id"], record["video_id"]))
+    elif record_type == "playlist":
+        state["playlists"][record["category"]] = record
+
+def record(record_type, **fields):
+    entry = {"type": record_type, **fields}
+    with _lock:
+        apply_record(entry)
+        journal_file = state["file"]
+        if journal_file is None:
+            state["unwritten"].append(entry)
+            return
+        journal_file.write(json.dumps(entry) + "\n")
+        journal_file.flush()
+        state["unsynced_records"] += 1
+        if state["unsynced_records"] >= FSYNC_EVERY_RECORDS:
+            os.fsync(journal_file.fileno())
+            state["unsynced_records"] = 0
+
+@atexit.register
+def close():
+    with _lock:
+        journal_file = state["file"]
+        if journal_file is None:
+            return
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+        journal_file.close()
+        state["file"] = None
+
+def get_input(workflow, **identity):
+    # Reuse the resolved input only when it belongs to the same workflow and destination
+    input_record = state["input"]
+    if input_record is None:
+        return None
+    if input_record["workflow"] != workflow or any(input_record.get(k) != v for k, v in identity.items()):
+        print(f"Journal {state['path']} belongs to a different operation.")
+        sys.exit(1)
+    return input_record["resolution"]
+
+def record_failure():
+    # Failed mutations are not journaled, they only keep the journal around for a resumed run to retry them
+    with _lock:
+        state["failures"] += 1
+
+def record_input(workflow, resolution, **identity):
+    record("input", workflow=workflow, resolution=resolution, **identity)
+
+def is_completed(record_type, playlist_id, video_id):
+    return (record_type, playlist_id, video_id) in state["completed"]
+
+def get_created_playlist(category):
+    return state["playlists"].get(category)
@@ -0,0 +1,117 @@
+import csv
+import itertools
+import json
+import re
+import sys
+from operations import urls
+
+# Manifests list the input of large jobs in a file instead of the command line, passed as @<path>, or @- for standard input
+# Plain text holds URLs or IDs, one or several comma separated per line, and lines starting with # are comments
+# CSV, with a header row, and NDJSON records hold a URL or ID and optionally the title and category of the video
+# Records are read lazily, and videos whose title and category are already known skip the metadata fetch
+
+# Record fields holding the input, the first one present is used
+INPUT_FIELDS = ["url", "video_id", "playlist_id", "id"]
+TITLE_FIELDS = ["title", "video_title"]
+CATEGORY_FIELDS = ["category", "video_category"]
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def is_manifest_argument(argument):
+    return argument.startswith("@")
+
+def check_stdin_argument(arguments, prompts_names=False):
+    # A manifest read from standard input leaves nothing to answer the prompts with
+    if len(arguments) < 2 or arguments[1] != "@-":
+        return
+    if not any(flag in arguments for flag in ['-force', '-f', '-previewonly', '-p']):
+        print("Reading the input from standard input requires the -force or -previewonly flag, the confirmation prompt cannot be answered.")
+        sys.exit(1)
+    if prompts_names and not any(flag in arguments for flag in ['-name', '-n']):
+        print("Reading the input from standard input requires the -name flag, the playlist name prompts cannot be answered.")
+        sys.exit(1)
+
+def read_entries(path):
+    # Opens the manifest right away, so a missing file is reported before any API call, and returns its lazy entries
+    # Entries are (source, url_type, url_id, details), details being (title, category) for videos already described
+    if path == "-":
+        return iter_entries(sys.stdin)
+    try:
+        f = open(path, newline="", encoding="utf-8")
+    except OSError as e:
+        print(f"Could not open manifest {path}:\n{e}\n")
+        sys.exit(1)
+    return iter_file_entries(f)
+
+def iter_file_entries(f):
+    with f:
+        yield from iter_entries(f)
+
+def iter_entries(lines):
+    # The format is told by the first line: a JSON object, a CSV header naming an input field, or plain text
+    lines = (line for line in lines if line.strip())
+    first_line = next(lines, None)
+    if first_line is None:
+        return
+    lines = itertools.chain([first_line], lines)
+    if first_line.lstrip().startswith("{"):
+        yield from iter_ndjson_entries(lines)
+    elif is_csv_header(first_line):
+        yield from iter_csv_entries(lines)
+    else:
+        yield from iter_text_entries(lines)
+
+def is_csv_header(line):
+    # The input column may be anywhere in the header, and quoted
+    header = next(csv.reader([line]), [])
+    return any(name.strip().lower() in INPUT_FIELDS for name in header)
+
+def iter_text_entries(lines):
+    for line in lines:
+        if line.lstrip().startswith("#"):
+            continue
+        for value in WHITESPACE_PATTERN.sub("", line).split(","):
+            if value:
+                yield get_entry(value)
+
+def iter_csv_entries(lines):
+    reader = csv.reader(lines)
+    header = [name.strip().lower() for name in next(reader)]
+    for row in reader:
+        yield get_record_entry(dict(zip(header, row)))
+
+def iter_ndjson_entries(lines):
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            print(f"Invalid manifest record: {line.strip()}")
+            continue
+        yield get_record_entry(record) if isinstance(record, dict) else get_entry(str(record))
+
+def get_entry(value, details=None):
+    url_type, url_id = urls.parse_input(value)
+    return (value, url_type, url_id, details if url_type == "video" else None)
+
+def get_record_entry(record):
+    title = get_field(record, TITLE_FIELDS)
+    category = get_field(record, CATEGORY_FIELDS)
+    details = (title, category) if title is not None and category is not None else None
+    for field in INPUT_FIELDS:
+        value = get_field(record, [field])
+        if value is None:
+            continue
+        if field == "video_id":
+            return (value, "video", value, details)
+        if field == "playlist_id":
+            return (value, "playlist", value, None)
+        return get_entry(value, details)
+    # Reported as an invalid input like any unparsable URL
+    return (str(record), None, str(record), None)
+
+def get_field(record, fields):
+    for field in fields:
+        value = record.get(field)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return None
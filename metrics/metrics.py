@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-run timings of workflow phases and per-method API call statistics
+
+state = {
+    "started_at": time.perf_counter(),
+    "phases": {},
+    "api_methods": {}
+}
+
+_lock = threading.Lock()
+
+def reset():
+    with _lock:
+        state["started_at"] = time.perf_counter()
+        state["phases"] = {}
+        state["api_methods"] = {}
+
+@contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        with _lock:
+            state["phases"][name] = state["phases"].get(name, 0.0) + seconds
+
+def get_api_method_stats(method):
+    if method not in state["api_methods"]:
+        state["api_methods"][method] = {
+            "calls": 0,
+            "http_requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "quota_units": 0,
+            "response_bytes": 0,
+            "seconds": 0.0
+        }
+    return state["api_methods"][method]
+
+def record_api_call(method, quota_units, seconds, retries, failed, sub_requests=1):
+    with _lock:
+        stats = get_api_method_stats(method)
+        stats["calls"] += sub_requests
+        stats["http_requests"] += 1 + retries
+        stats["retries"] += retries
+        stats["errors"] += 1 if failed else 0
+        stats["quota_units"] += quota_units
+        stats["seconds"] += seconds
+
+def record_response_bytes(method, response_bytes):
+    with _lock:
+        get_api_method_stats(method)["response_bytes"] += response_bytes
+
+def get_report():
+    with _lock:
+        api_methods = {method: dict(stats) for method, stats in state["api_methods"].items()}
+        phases = {name: round(seconds, 3) for name, seconds in state["phases"].items()}
+    for stats in api_methods.values():
+        stats["seconds"] = round(stats["seconds"], 3)
+    return {
+        "run_seconds": round(time.perf_counter() - state["started_at"], 3),
+        "phases": phases,
+        "api_methods": api_methods,
+        "api_totals": {
+            key: sum(stats[key] for stats in api_methods.values())
+            for key in ["calls", "http_requests", "retries", "errors", "quota_units", "response_bytes"]
+        }
+    }
+
+def write_prometheus(path, workflow):
+    # Textfile collector format, written to a temporary file first so scrapes never see partial files
+    report = get_report()
+    lines = [
+        "# HELP youtube_tool_run_seconds Wall time of the workflow run.",
+        "# TYPE youtube_tool_run_seconds gauge",
+        f'youtube_tool_run_seconds{{workflow="{workflow}"}} {report["run_seconds"]}',
+        "# HELP youtube_tool_phase_seconds Wall time of each workflow phase.",
+        "# TYPE youtube_tool_phase_seconds gauge"
+    ]
+    for name, seconds in report["phases"].items():
+        lines.append(f'youtube_tool_phase_seconds{{workflow="{workflow}",phase="{name}"}} {seconds}')
+
+    api_metrics = [
+        ("calls", "youtube_tool_api_calls", "API calls per method."),
+        ("http_requests", "youtube_tool_api_http_requests", "HTTP requests per method, including retries."),
+        ("retries", "youtube_tool_api_retries", "Retried API calls per method."),
+        ("errors", "youtube_tool_api_errors", "Failed API calls per method."),
+        ("quota_units", "youtube_tool_api_quota_units", "Quota units spent per method."),
+        ("response_bytes", "youtube_tool_api_response_bytes", "Response bytes received per method."),
+        ("seconds", "youtube_tool_api_seconds", "Time spent in API calls per method.")
+    ]
+    for key, metric, description in api_metrics:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} gauge")
+        for method, stats in report["api_methods"].items():
+            lines.append(f'{metric}{{workflow="{workflow}",method="{method}"}} {stats[key]}')
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temporary_path, path)
@@ -0,0 +1,136 @@
+import sys
+from operations import urls
+
+# Compact in-memory records for the videos workflows operate on
+
+class Video:
+    # Videos without a title are unavailable and only carry their IDs
+    __slots__ = ("video_id", "video_title", "video_category", "playlist_item_id")
+
+    def __init__(self, video_id, video_title=None, video_category=None, playlist_item_id=None):
+        self.video_id = video_id
+        self.video_title = video_title
+        # Category names repeat across most videos, so they share a single interned string
+        self.video_category = sys.intern(video_category) if video_category is not None else None
+        self.playlist_item_id = playlist_item_id
+
+    @property
+    def video_url(self):
+        return urls.get_video_url(self.video_id)
+
+    @property
+    def is_available(self):
+        return self.video_title is not None
+
+    def to_dict(self):
+        # Same shape as the video dicts the JSON output has always used
+        if not self.is_available:
+            return {
+                "video_id": self.video_id,
+                "playlist_item_id": self.playlist_item_id
+            }
+        video_data = {
+            "video_id": self.video_id,
+            "video_url": self.video_url,
+            "video_title": self.video_title,
+            "video_category": self.video_category
+        }
+        if self.playlist_item_id is not None:
+            video_data["playlist_item_id"] = self.playlist_item_id
+        return video_data
+
+    @staticmethod
+    def from_dict(video_data):
+        return Video(
+            video_data["video_id"],
+            video_data.get("video_title"),
+            video_data.get("video_category"),
+            video_data.get("playlist_item_id")
+        )
+
+class VideoCollection:
+    # Videos indexed by video ID, with an index of the video IDs of each category
+    __slots__ = ("videos", "category_index", "duplicate_items")
+
+    def __init__(self, videos=()):
+        self.videos = {}
+        self.category_index = {}
+        # Items of the playlist the collection was read from beyond one per video, which take positions too
+        self.duplicate_items = 0
+        for video in videos:
+            self.add(video)
+
+    def add(self, video):
+        previous_video = self.videos.get(video.video_id)
+        if previous_video is not None and previous_video.video_category is not None:
+            del self.category_index[previous_video.video_category][video.video_id]
+        self.videos[video.video_id] = video
+        if video.video_category is not None:
+            self.category_index.setdefault(video.video_category, {})[video.video_id] = None
+
+    def update(self, videos):
+        for video in videos.values():
+            self.add(video)
+
+    def get_items_total(self):
+        return len(self.videos) + self.duplicate_items
+
+    def group_by_category(self):
+        # Views share the collection's videos instead of copying them
+        return {
+            category: VideoCollectionView(self, video_ids)
+            for category, video_ids in self.category_index.items()
+            if len(video_ids) > 0
+        }
+
+    def values(self):
+        return self.videos.values()
+
+    def items(self):
+        return self.videos.items()
+
+    def get(self, video_id, default=None):
+        return self.videos.get(video_id, default)
+
+    def __getitem__(self, video_id):
+        return self.videos[video_id]
+
+    def __contains__(self, video_id):
+        return video_id in self.videos
+
+    def __iter__(self):
+        return iter(self.videos)
+
+    def __len__(self):
+        return len(self.videos)
+
+class VideoCollectionView:
+    # Read-only view over part of a collection
+    __slots__ = ("collection", "video_ids")
+
+    def __init__(self, collection, video_ids):
+        self.collection = collection
+        self.video_ids = video_ids
+
+    def values(self):
+        return (self.collection.videos[video_id] for video_id in self.video_ids)
+
+    def items(self):
+        return ((video_id, self.collection.videos[video_id]) for video_id in self.video_ids)
+
+    def get(self, video_id, default=None):
+        return self.collection.videos[video_id] if video_id in self.video_ids else default
+
+    def __getitem__(self, video_id):
+        if video_id not in self.video_ids:
+            raise KeyError(video_id)
+        return self.collection.videos[video_id]
+
+    def __contains__(self, video_id):
+        return video_id in self.video_ids
+
+    def __iter__(self):
+        return iter(self.video_ids)
+
+    def __len__(self):
+        return len(self.video_ids)
@@ -0,0 +1,119 @@
+import asyncio
+import atexit
+import threading
+import httplib2
+from googleapiclient.errors import HttpError
+from auth import auth
+
+# httpx is optional and only imported once the async engine is asked for
+httpx = None
+
+# Optional engine sending the requests built by googleapiclient over one pooled async HTTP client
+# All calls share a single event loop running on a background thread, so no worker thread blocks per request
+
+# Requests in flight at the same time when no -concurrency is given
+DEFAULT_CONCURRENCY = 32
+
+settings = {
+    "enabled": False,
+    "concurrency": DEFAULT_CONCURRENCY,
+    # Alternative httpx transport, used by the benchmarks to reach the fake API
+    "transport": None
+}
+
+state = {
+    "loop": None,
+    "client": None,
+    "semaphore": None
+}
+
+_lock = threading.Lock()
+
+def is_available():
+    global httpx
+    if httpx is None:
+        try:
+            import httpx
+        except ImportError:
+            return False
+    return True
+
+def has_http2():
+    try:
+        import h2
+        return True
+    except ImportError:
+        return False
+
+def is_transport_error(error):
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+def configure(enabled=False, concurrency=None):
+    # The connection pool is kept across runs of the same process unless its size changes
+    concurrency = max(1, concurrency) if concurrency is not None else DEFAULT_CONCURRENCY
+    if concurrency != settings["concurrency"]:
+        close()
+    settings["enabled"] = enabled
+    settings["concurrency"] = concurrency
+
+def is_enabled():
+    return settings["enabled"]
+
+def get_loop():
+    with _lock:
+        if state["loop"] is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+            state["loop"] = loop
+        return state["loop"]
+
+def submit(coroutine):
+    # Schedules the coroutine on the engine loop and returns a concurrent.futures.Future
+    return asyncio.run_coroutine_threadsafe(coroutine, get_loop())
+
+def run(coroutine):
+    # Blocks the calling thread until the coroutine completes, never call it from the engine loop itself
+    return submit(coroutine).result()
+
+def run_all(coroutines):
+    async def gather():
+        return await asyncio.gather(*coroutines)
+    return run(gather())
+
+def get_client():
+    # Only used on the engine loop
+    if state["client"] is None:
+        concurrency = settings["concurrency"]
+        state["client"] = httpx.AsyncClient(
+            http2=has_http2(),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=60.0,
+            transport=settings["transport"]
+        )
+        state["semaphore"] = asyncio.Semaphore(concurrency)
+    return state["client"]
+
+async def send(request):
+    # Async counterpart of googleapiclient's HttpRequest.execute, returning the deserialized response
+    client = get_client()
+    headers = dict(request.headers)
+    headers.update(auth.get_authorization_headers())
+    async with state["semaphore"]:
+        response = await client.request(request.method, request.uri, content=request.body, headers=headers)
+    resp = httplib2.Response({"status": str(response.status_code), **response.headers})
+    if response.status_code >= 300:
+        raise HttpError(resp, response.content, uri=request.uri)
+    return request.postproc(resp, response.content)
+
+@atexit.register
+def close():
+    with _lock:
+        loop = state["loop"]
+        client = state["client"]
+        state["client"] = None
+        state["semaphore"] = None
+    if loop is not None and client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=10)
+        except Exception:
+            pass
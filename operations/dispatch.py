@@ -0,0 +1,319 @@
+import asyncio
+import atexit
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from googleapiclient.errors import HttpError
+from auth import auth
+from cache import cache
+from metrics import metrics
+from operations import async_engine
+
+# Every YouTube Data API call goes through here for quota accounting, pacing and retries
+
+# Quota units charged per API method, anything else costs 1 unit
+QUOTA_COSTS = {
+    "insert": 50,
+    "update": 50,
+    "delete": 50
+}
+
+# Sub-requests accepted in one batch request
+BATCH_MAX_REQUESTS = 50
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+RETRYABLE_REASONS = RATE_LIMIT_REASONS | {"backendError", "internalError"}
+
+# Requests per second when no -rate is given
+DEFAULT_RATE = 10.0
+
+# Units spent by this process are added to the daily usage stored in the cache database in bulk, past this many units
+QUOTA_FLUSH_UNITS = 1000
+
+settings = {
+    "run_budget": None,
+    "daily_budget": None,
+    "rate": DEFAULT_RATE,
+    "max_retries": 5,
+    "backoff_base": 1.0,
+    "backoff_max": 64.0
+}
+
+usage = {
+    "calls": 0,
+    "retries": 0,
+    "quota_used": 0,
+    # Set once a budget or the API quota is exhausted, every later request fails without being sent
+    "exhausted": None
+}
+
+# Units stored for the quota day when the run started, plus those flushed since, and units of this process not stored yet
+daily_usage = {
+    "day": None,
+    "stored_units": 0,
+    "pending_units": 0
+}
+
+_lock = threading.Lock()
+_thread_data = threading.local()
+
+class QuotaBudgetExceeded(Exception):
+    pass
+
+class TokenBucket:
+    # Paces calls to a target rate, backing off when the API signals rate limiting
+    def __init__(self, rate):
+        self.max_rate = rate
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        # Takes a token if one is available, otherwise returns the seconds to wait for the next one
+        with self.lock:
+            now = time.monotonic()
+            # Holds at least one token, below one call per second the bucket could otherwise never fill up to a call
+            self.tokens = min(max(self.rate, 1), self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait = self.take()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.take()
+
+    async def acquire_async(self):
+        wait = self.take()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.take()
+
+    def slow_down(self):
+        with self.lock:
+            self.rate = max(0.5, self.rate / 2)
+
+    def speed_up(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * 1.05)
+
+_bucket = TokenBucket(settings["rate"])
+
+def configure(run_budget=None, daily_budget=None, rate=None):
+    global _bucket
+    flush_quota_usage()
+    settings["run_budget"] = run_budget
+    settings["daily_budget"] = daily_budget
+    settings["rate"] = rate if rate is not None else DEFAULT_RATE
+    _bucket = TokenBucket(settings["rate"])
+    with _lock:
+        usage["calls"] = 0
+        usage["retries"] = 0
+        usage["quota_used"] = 0
+        usage["exhausted"] = None
+        daily_usage["day"] = None
+
+def get_quota_day():
+    # The API quota resets at midnight Pacific time
+    try:
+        from zoneinfo import ZoneInfo
+        return datetime.now(ZoneInfo("America/Los_Angeles")).strftime("%Y-%m-%d")
+    except Exception:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+def get_request_method(request):
+    # e.g. "youtube.playlistItems.insert" -> "playlistItems.insert"
+    method_id = getattr(request, "methodId", None) or ""
+    return method_id.split(".", 1)[-1]
+
+def get_request_cost(request):
+    return QUOTA_COSTS.get(get_request_method(request).split(".")[-1], 1)
+
+def track_response_bytes(request):
+    # Counts the raw response size before googleapiclient deserializes it, once per request even when it is resent
+    if getattr(request, "tracks_response_bytes", False):
+        return
+    request.tracks_response_bytes = True
+    method = get_request_method(request)
+    postproc = request.postproc
+
+    def counting_postproc(resp, content):
+        metrics.record_response_bytes(method, len(content or b""))
+        return postproc(resp, content)
+
+    request.postproc = counting_postproc
+
+def reserve_quota(cost):
+    with _lock:
+        if usage["exhausted"] is not None:
+            raise QuotaBudgetExceeded(usage["exhausted"])
+
+        run_budget = settings["run_budget"]
+        if run_budget is not None and usage["quota_used"] + cost > run_budget:
+            raise exhaust_quota(f"Run quota budget of {run_budget} units exhausted")
+
+        day = get_quota_day()
+        if daily_usage["day"] != day:
+            load_daily_usage(day)
+        daily_budget = settings["daily_budget"]
+        if daily_budget is not None and daily_usage["stored_units"] + daily_usage["pending_units"] + cost > daily_budget:
+            raise exhaust_quota(f"Daily quota budget of {daily_budget} units exhausted")
+
+        usage["quota_used"] += cost
+        usage["calls"] += 1
+        daily_usage["pending_units"] += cost
+        needs_flush = daily_usage["pending_units"] >= QUOTA_FLUSH_UNITS
+    if needs_flush:
+        flush_quota_usage()
+
+def get_affordable_requests(costs):
+    # Number of leading requests of the given costs the run and daily budgets can still pay for
+    with _lock:
+        if usage["exhausted"] is not None:
+            return 0
+
+        available = []
+        if settings["run_budget"] is not None:
+            available.append(settings["run_budget"] - usage["quota_used"])
+        if settings["daily_budget"] is not None:
+            day = get_quota_day()
+            if daily_usage["day"] != day:
+                load_daily_usage(day)
+            available.append(settings["daily_budget"] - daily_usage["stored_units"] - daily_usage["pending_units"])
+    if len(available) == 0:
+        return len(costs)
+
+    units = min(available)
+    for index, cost in enumerate(costs):
+        if cost > units:
+            return index
+        units -= cost
+    return len(costs)
+
+def exhaust_quota(message):
+    # Called with the lock held, returns the error to raise
+    usage["exhausted"] = message
+    return QuotaBudgetExceeded(message)
+
+def load_daily_usage(day):
+    # Called with the lock held, once per run and quota day, units still pending belong to the previous day
+    if daily_usage["day"] is not None and daily_usage["pending_units"] > 0:
+        cache.add_quota_usage(daily_usage["day"], daily_usage["pending_units"])
+    daily_usage["day"] = day
+    daily_usage["stored_units"] = cache.get_quota_usage(day)
+    daily_usage["pending_units"] = 0
+
+@atexit.register
+def flush_quota_usage():
+    # Stores the units spent since the last flush in one write
+    with _lock:
+        day = daily_usage["day"]
+        units = daily_usage["pending_units"]
+        daily_usage["stored_units"] += units
+        daily_usage["pending_units"] = 0
+    if day is not None and units > 0:
+        cache.add_quota_usage(day, units)
+
+def get_error_reason(error):
+    try:
+        return json.loads(error.content)["error"]["errors"][0]["reason"]
+    except Exception:
+        return None
+
+def is_retryable(error):
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES or get_error_reason(error) in RETRYABLE_REASONS
+    return isinstance(error, OSError) or async_engine.is_transport_error(error)
+
+def get_backoff_seconds(attempt):
+    # Full jitter exponential backoff
+    return random.uniform(0, min(settings["backoff_max"], settings["backoff_base"] * (2 ** attempt)))
+
+def get_thread_http():
+    # httplib2 connections are not thread safe, so every other thread gets its own authorized client
+    if threading.current_thread() is threading.main_thread():
+        return None
+    if not hasattr(_thread_data, "http"):
+        _thread_data.http = auth.new_authorized_http()
+    return _thread_data.http
+
+def execute(request, http=None):
+    http = http or get_thread_http()
+    track_response_bytes(request)
+    return execute_with_retries(lambda: request.execute(http=http), get_request_cost(request), get_request_method(request))
+
+def execute_batch(batch, cost, http=None):
+    http = http or get_thread_http()
+    sub_requests = list(getattr(batch, "_requests", {}).values())
+    for request in sub_requests:
+        track_response_bytes(request)
+    method = f"batch({get_request_method(sub_requests[0])})" if len(sub_requests) > 0 else "batch"
+    return execute_with_retries(lambda: batch.execute(http=http), cost, method, sub_requests=max(1, len(sub_requests)))
+
+def execute_with_retries(call, cost, method, sub_requests=1):
+    attempt = 0
+    quota_units = 0
+    start = time.perf_counter()
+    failed = True
+    try:
+        while True:
+            reserve_quota(cost)
+            quota_units += cost
+            _bucket.acquire()
+            try:
+                response = call()
+                _bucket.speed_up()
+                failed = False
+                return response
+            except Exception as e:
+                time.sleep(get_retry_delay(e, attempt))
+                attempt += 1
+    finally:
+        metrics.record_api_call(method, quota_units, time.perf_counter() - start, attempt, failed, sub_requests)
+
+async def execute_async(request):
+    # Same accounting, pacing and retries as execute, for requests sent by the async engine
+    track_response_bytes(request)
+    cost = get_request_cost(request)
+    attempt = 0
+    quota_units = 0
+    start = time.perf_counter()
+    failed = True
+    try:
+        while True:
+            reserve_quota(cost)
+            quota_units += cost
+            await _bucket.acquire_async()
+            try:
+                response = await async_engine.send(request)
+                _bucket.speed_up()
+                failed = False
+                return response
+            except Exception as e:
+                await asyncio.sleep(get_retry_delay(e, attempt))
+                attempt += 1
+    finally:
+        metrics.record_api_call(get_request_method(request), quota_units, time.perf_counter() - start, attempt, failed)
+
+def get_retry_delay(error, attempt):
+    # Raises the error when it should not be retried, otherwise returns the seconds to wait before the next attempt
+    if isinstance(error, HttpError) and get_error_reason(error) == "quotaExceeded":
+        with _lock:
+            raise exhaust_quota("Daily YouTube Data API quota exhausted") from error
+    if not is_retryable(error) or attempt >= settings["max_retries"]:
+        raise error
+    if isinstance(error, HttpError) and (error.resp.status == 429 or get_error_reason(error) in RATE_LIMIT_REASONS):
+        _bucket.slow_down()
+    with _lock:
+        usage["retries"] += 1
+    return get_backoff_seconds(attempt)
+
+def estimate_quota_cost(list_calls=0, mutations=0):
+    return list_calls * 1 + mutations * 50
@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+from operations import async_engine
+from operations import dispatch
+
+# Runs playlist mutations with a configurable number of workers
+
+settings = {
+    "workers": 1,
+    "ordered": False
+}
+
+# Worker threads outlive a single call, so their HTTP clients stay connected across chunks and runs
+state = {
+    "pool": None,
+    "pool_workers": 0
+}
+
+# Workflows may run operations from several threads at once, they all share the pool
+_lock = threading.Lock()
+
+def configure(workers=1, ordered=False):
+    settings["workers"] = max(1, workers)
+    settings["ordered"] = ordered
+
+def get_pool(workers):
+    with _lock:
+        if state["pool_workers"] != workers:
+            close_pool()
+            state["pool"] = ThreadPoolExecutor(max_workers=workers)
+            state["pool_workers"] = workers
+        return state["pool"]
+
+def close():
+    with _lock:
+        close_pool()
+
+def close_pool():
+    if state["pool"] is not None:
+        state["pool"].shutdown(wait=True)
+    state["pool"] = None
+    state["pool_workers"] = 0
+
+def execute_request(request):
+    # Requests executed on worker threads use a per-thread HTTP client, see dispatch.get_thread_http
+    try:
+        return (True, dispatch.execute(request))
+    except Exception as e:
+        return (False, str(e))
+
+async def execute_request_async(request):
+    try:
+        return (True, await dispatch.execute_async(request))
+    except Exception as e:
+        return (False, str(e))
+
+def execute_batch_chunk(chunk, new_batch):
+    # Sends (key, request) pairs as one batch request, then resends only the sub-requests that failed with retryable errors
+    # Batches are cut down to the sub-requests the remaining budget pays for, the others are sent once nothing more fits and fail there
+    results = {}
+    pending = chunk
+    attempt = 0
+    while len(pending) > 0:
+        retries = []
+        over_budget = []
+        affordable = dispatch.get_affordable_requests([dispatch.get_request_cost(request) for key, request in pending])
+        if 0 < affordable < len(pending):
+            pending, over_budget = pending[:affordable], pending[affordable:]
+
+        def batch_callback(request_id, response, exception):
+            key, request = pending[int(request_id)]
+            if exception is None:
+                results[key] = (True, response)
+                return
+            try:
+                dispatch.get_retry_delay(exception, attempt)
+                retries.append((key, request))
+            except Exception:
+                results[key] = (False, str(exception))
+
+        batch = new_batch(callback=batch_callback)
+        for index, (key, request) in enumerate(pending):
+            batch.add(request, request_id=str(index))
+        try:
+            dispatch.execute_batch(batch, cost=sum(dispatch.get_request_cost(request) for key, request in pending))
+        except Exception as e:
+            for key, request in pending:
+                results.setdefault(key, (False, str(e)))
+            break
+
+        if len(retries) > 0:
+            time.sleep(dispatch.get_backoff_seconds(attempt))
+            attempt += 1
+        pending = retries + over_budget
+    return results
+
+def execute_requests(requests, progress_string, on_result, in_order=False, new_batch=None, show_progress=True):
+    # Executes (key, request) pairs and reports each outcome to on_result(key, (success, response_or_error))
+    # Once the quota is exhausted the remaining requests fail right away instead of being sent, see dispatch.reserve_quota
+    # Unordered requests are sent in batch requests when new_batch, the service's new_batch_http_request, is given
+    # Ordered requests may be functions building the request right before it is sent, after the outcome of the previous ones was reported
+    results = {}
+    workers = 1 if in_order else settings["workers"]
+    progress_bar = tqdm(total=len(requests), desc=progress_string, unit="video", disable=not show_progress)
+
+    if new_batch is not None and not in_order and not async_engine.is_enabled():
+        chunks = [requests[i:i + dispatch.BATCH_MAX_REQUESTS] for i in range(0, len(requests), dispatch.BATCH_MAX_REQUESTS)]
+        if workers == 1:
+            chunk_results = (execute_batch_chunk(chunk, new_batch) for chunk in chunks)
+        else:
+            pool = get_pool(workers)
+            chunk_results = (future.result() for future in as_completed([pool.submit(execute_batch_chunk, chunk, new_batch) for chunk in chunks]))
+        for chunk_result in chunk_results:
+            for key, result in chunk_result.items():
+                results[key] = result
+                on_result(key, result)
+            progress_bar.update(len(chunk_result))
+    elif async_engine.is_enabled() and not in_order:
+        # All requests run on the engine loop, outcomes are still reported on this thread
+        futures = {async_engine.submit(execute_request_async(request)): key for key, request in requests}
+        for future in as_completed(futures):
+            key = futures[future]
+            results[key] = future.result()
+            on_result(key, results[key])
+            progress_bar.update(1)
+    elif workers == 1:
+        for key, request in requests:
+            results[key] = execute_request(request() if callable(request) else request)
+            on_result(key, results[key])
+            progress_bar.update(1)
+    else:
+        pool = get_pool(workers)
+        futures = {pool.submit(execute_request, request): key for key, request in requests}
+        for future in as_completed(futures):
+            key = futures[future]
+            results[key] = future.result()
+            on_result(key, results[key])
+            progress_bar.update(1)
+
+    progress_bar.close()
+    dispatch.flush_quota_usage()
+    return results
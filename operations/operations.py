@@ -1,17 +1,38 @@
-import re
 import sys
 from tqdm import tqdm
+from googleapiclient.errors import HttpError
+from cache import cache
+from cache import snapshots
+from journal import journal
+from models.models import Video
+from operations import async_engine
+from operations import dispatch
+from operations import executor
+from operations import urls
+from reports import reports
+
+# Limit of the YouTube Data API on IDs per videos.list call
+VIDEOS_LIST_MAX_IDS = 50
+
+# Only request the video fields workflows actually read
+VIDEO_DETAILS_FIELDS = "items(id,snippet(title,categoryId))"
+PLAYLIST_ITEMS_FIELDS = "etag,nextPageToken,items(id,contentDetails/videoId)"
+MY_PLAYLISTS_FIELDS = "nextPageToken,items(id,etag,snippet/title)"
 
 # Operations workflows depend on
 
 def get_video_categories(youtube):
+    categories = cache.get_video_categories("US")
+    if categories is not None:
+        return categories
     try:
         request = youtube.videoCategories().list(
             part="snippet",
             regionCode="US"
         )
-        response = request.execute()
+        response = dispatch.execute(request)
         categories = {item["id"]: item["snippet"]["title"] for item in response["items"]}
+        cache.put_video_categories("US", categories)
         return categories
     except Exception as e:
         print(f"Error retrieving video categories:\n{e}\n")
@@ -20,44 +41,14 @@ def get_video_categories(youtube):
 # Error proof operations
 
 def get_all_playlist_video_data(youtube, playlist_id, categories):
-    try:
-        all_playlist_videos = []
-        unavailable_video_data = []
-
-        # Fetch playlist items
-        playlist_items = []
-        request = youtube.playlistItems().list(
-            part="id,contentDetails",
-            playlistId=playlist_id,
-            maxResults=50
-        )
-        while request:
-            response = request.execute()
-            playlist_items.extend(response.get("items", []))
-            request = youtube.playlistItems().list_next(request, response)
+    # Fetch playlist items
+    playlist_items = get_all_playlist_items(youtube, playlist_id)
+    if not playlist_items[0]:
+        return (False, None)
 
+    try:
         # Batch video details retrieval
-        video_ids = [item["contentDetails"]["videoId"] for item in playlist_items]
-        video_details = fetch_video_details_batch(youtube, video_ids)
-
-        for item in playlist_items:
-            video_id = item["contentDetails"]["videoId"]
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-            video_data = video_details.get(video_id)
-
-            if not video_data:
-                print(f"No details found for video {video_id}")
-                unavailable_video_data.append({"video_id": video_id, "playlist_item_id": item["id"]})
-                continue
-
-            all_playlist_videos.append({
-                "video_id": video_id,
-                "video_url": video_url,
-                "video_title": video_data["title"],
-                "video_category": categories.get(video_data["categoryId"], "Unknown"),
-                "playlist_item_id": item["id"]
-            })
-
+        all_playlist_videos, unavailable_video_data = get_playlist_items_video_data(youtube, playlist_items[1], categories)
         return (True, {
             "all_playlist_videos": all_playlist_videos,
             "unavailable_video_data": unavailable_video_data
@@ -66,84 +57,308 @@ def get_all_playlist_video_data(youtube, playlist_id, categories):
         print(f"Error retrieving playlist {playlist_id} contents:\n{e}\n")
         return (False, None)
 
+def get_all_playlist_items(youtube, playlist_id):
+    try:
+        return (True, get_playlist_items(youtube, playlist_id))
+    except Exception as e:
+        print(f"Error retrieving playlist {playlist_id} contents:\n{e}\n")
+        return (False, None)
+
+def build_video(video_id, video_details, categories, playlist_item_id=None):
+    details = video_details.get(video_id)
+    if not details:
+        return None
+    return Video(video_id, details["title"], categories.get(details["categoryId"], "Unknown"), playlist_item_id)
+
+def get_playlist_items(youtube, playlist_id):
+    if async_engine.is_enabled():
+        return async_engine.run(get_playlist_items_async(youtube, playlist_id))
+    return [item for page_items in iter_playlist_pages(youtube, playlist_id) for item in page_items]
+
+def get_playlists_items(youtube, playlist_ids):
+    # Returns (success, items) per playlist ID, paging every playlist on the async engine at once
+    async def get_all_playlist_items_async(playlist_id):
+        try:
+            return (True, await get_playlist_items_async(youtube, playlist_id))
+        except Exception as e:
+            print(f"Error retrieving playlist {playlist_id} contents:\n{e}\n")
+            return (False, None)
+    return dict(zip(playlist_ids, async_engine.run_all([get_all_playlist_items_async(playlist_id) for playlist_id in playlist_ids])))
+
+def iter_playlist_pages(youtube, playlist_id):
+    # Yields the items of each page as soon as it arrives
+    # The playlist ETag only covers its metadata and item count, so every page is validated against its own ETag
+    snapshot = snapshots.get_snapshot(playlist_id)
+
+    # Page through the playlist, only re-downloading pages whose ETag changed
+    cached_pages = snapshot["pages"] if snapshot is not None else []
+    pages = []
+    page_token = None
+    while True:
+        cached_page = get_cached_page(cached_pages, len(pages), page_token)
+        try:
+            page = read_playlist_items_page(page_token, dispatch.execute(new_playlist_items_request(youtube, playlist_id, page_token, cached_page)))
+        except HttpError as e:
+            if cached_page is None or e.resp.status != 304:
+                raise
+            page = cached_page
+
+        pages.append(page)
+        yield page["items"]
+        page_token = page["next_page_token"]
+        if not page_token:
+            break
+
+    snapshots.put_snapshot(playlist_id, pages)
+
+async def get_playlist_items_async(youtube, playlist_id):
+    # Async engine counterpart of iter_playlist_pages, returning all items at once
+    snapshot = snapshots.get_snapshot(playlist_id)
+    cached_pages = snapshot["pages"] if snapshot is not None else []
+    pages = []
+    page_token = None
+    while True:
+        cached_page = get_cached_page(cached_pages, len(pages), page_token)
+        try:
+            page = read_playlist_items_page(page_token, await dispatch.execute_async(new_playlist_items_request(youtube, playlist_id, page_token, cached_page)))
+        except HttpError as e:
+            if cached_page is None or e.resp.status != 304:
+                raise
+            page = cached_page
+
+        pages.append(page)
+        page_token = page["next_page_token"]
+        if not page_token:
+            break
+
+    snapshots.put_snapshot(playlist_id, pages)
+    return [item for page in pages for item in page["items"]]
+
+def get_cached_page(cached_pages, page_index, page_token):
+    # A cached page only applies while the playlist is paged through the same tokens
+    cached_page = cached_pages[page_index] if page_index < len(cached_pages) else None
+    if cached_page is not None and cached_page["page_token"] != page_token:
+        return None
+    return cached_page
+
+def new_playlist_items_request(youtube, playlist_id, page_token, cached_page):
+    request = youtube.playlistItems().list(
+        part="id,contentDetails",
+        playlistId=playlist_id,
+        maxResults=50,
+        pageToken=page_token,
+        fields=PLAYLIST_ITEMS_FIELDS
+    )
+    if cached_page is not None and cached_page["etag"]:
+        request.headers["If-None-Match"] = cached_page["etag"]
+    return request
+
+def read_playlist_items_page(page_token, response):
+    return {
+        "page_token": page_token,
+        "etag": response.get("etag"),
+        "next_page_token": response.get("nextPageToken"),
+        "items": response.get("items", [])
+    }
+
+def iter_playlist_video_chunks(youtube, playlist_id, categories):
+    # Yields (available_videos, unavailable_videos) for every 50 playlist items, fetching details chunk by chunk
+    pending_items = []
+    for page_items in iter_playlist_pages(youtube, playlist_id):
+        pending_items.extend(page_items)
+        while len(pending_items) >= VIDEOS_LIST_MAX_IDS:
+            yield get_playlist_items_video_data(youtube, pending_items[:VIDEOS_LIST_MAX_IDS], categories)
+            pending_items = pending_items[VIDEOS_LIST_MAX_IDS:]
+    if len(pending_items) > 0:
+        yield get_playlist_items_video_data(youtube, pending_items, categories)
+
+def get_playlist_items_video_data(youtube, playlist_items, categories):
+    video_details = fetch_video_details_batch(youtube, [item["contentDetails"]["videoId"] for item in playlist_items])
+    available_videos = []
+    unavailable_videos = []
+    for item in playlist_items:
+        video_id = item["contentDetails"]["videoId"]
+        video = build_video(video_id, video_details, categories, item["id"])
+        if not video:
+            print(f"No details found for video {video_id}")
+            unavailable_videos.append(Video(video_id, playlist_item_id=item["id"]))
+            continue
+        available_videos.append(video)
+    return (available_videos, unavailable_videos)
+
+def forget_playlist_state(playlist_id):
+    # Mutated playlists no longer match their snapshot, the next read pages them again in full
+    snapshots.delete_snapshot(playlist_id)
+
 def fetch_video_details_batch(youtube, video_ids):
+    # Only fetch the videos missing from the local cache or gone stale
+    video_details, missing_video_ids = cache.get_video_details(video_ids)
+    if len(missing_video_ids) > 0:
+        fetched_video_details = fetch_video_details_from_api(youtube, missing_video_ids)
+        cache.put_video_details(fetched_video_details)
+        video_details.update(fetched_video_details)
+    return video_details
+
+def fetch_video_details_from_api(youtube, video_ids):
     video_details = {}
     try:
-        def batch_callback(request_id, response, exception):
-            if exception:
-                print(f"Error retrieving video details for {request_id}: {exception}")
-            else:
-                if 'items' in response and len(response['items']) > 0:
-                    video_details[request_id] = response['items'][0]['snippet']
-                else:
-                    print(f"No items found in response for {request_id}")
-
-        # Creating the batch request to fetch video details
-        batch = youtube.new_batch_http_request(callback=batch_callback)
-
-        # Process video_ids in chunks of 50
-        for i in range(0, len(video_ids), 50):
-            batch_ids = video_ids[i:i + 50]  # Chunk of 50 video IDs
-            for video_id in batch_ids:
-                # Add video request to the batch
-                batch.add(
-                    youtube.videos().list(part="snippet", id=video_id),
-                    request_id=video_id  # Pass the video ID as the request ID
-                )
-
-            # Execute the batch request after adding the 50 video details fetch operations
-            try:
-                batch.execute()
-            except Exception as e:
-                print(f"Error executing batch request: {e}")
-
-            # Clear the batch to prepare for the next batch
-            batch = youtube.new_batch_http_request(callback=batch_callback)
-            
+        # Pack up to 50 unique video IDs into the id parameter of each videos.list call
+        unique_video_ids = list(dict.fromkeys(video_ids))
+        id_chunks = [unique_video_ids[i:i + VIDEOS_LIST_MAX_IDS] for i in range(0, len(unique_video_ids), VIDEOS_LIST_MAX_IDS)]
+
+        if async_engine.is_enabled():
+            for chunk_video_details in async_engine.run_all([fetch_video_details_chunk_async(youtube, chunk_index, chunk) for chunk_index, chunk in enumerate(id_chunks)]):
+                video_details.update(chunk_video_details)
+            return video_details
+
+        # Pipeline the videos.list calls, sending up to 50 of them per batch request
+        # Sub-requests failing with retryable errors are sent again like the batched writes, instead of dropping their videos
+        for i in range(0, len(id_chunks), dispatch.BATCH_MAX_REQUESTS):
+            batch_requests = [(chunk_index, new_video_details_request(youtube, chunk)) for chunk_index, chunk in enumerate(id_chunks[i:i + dispatch.BATCH_MAX_REQUESTS], start=i)]
+            for chunk_index, result in sorted(executor.execute_batch_chunk(batch_requests, youtube.new_batch_http_request).items()):
+                if not result[0]:
+                    print(f"Error retrieving video details for chunk {chunk_index}: {result[1]}")
+                    continue
+                for item in result[1].get("items", []):
+                    video_details[item["id"]] = item["snippet"]
+
     except Exception as e:
         print(f"Error retrieving batch video details:\n{e}\n")
     return video_details
 
-def add_videos_to_playlist(youtube, videos_to_add, playlist_url, destination_playlist_videos, is_preview):
-    playlist_id = re.search(r"list=([^&]+)", playlist_url).group(1) if playlist_url != None else None
-    video_additions = []
-    already_in_playlist = []
-    failed = []
+async def fetch_video_details_chunk_async(youtube, chunk_index, video_ids):
+    # The async engine multiplexes the videos.list calls over its connections instead of batching them
+    try:
+        response = await dispatch.execute_async(new_video_details_request(youtube, video_ids))
+        return {item["id"]: item["snippet"] for item in response.get("items", [])}
+    except Exception as e:
+        print(f"Error retrieving video details for chunk {chunk_index}: {e}")
+        return {}
+
+def new_video_details_request(youtube, video_ids):
+    return youtube.videos().list(
+        part="snippet",
+        id=",".join(video_ids),
+        fields=VIDEO_DETAILS_FIELDS,
+        maxResults=VIDEOS_LIST_MAX_IDS
+    )
+
+def add_videos_to_playlist(youtube, videos_to_add, playlist_url, destination_playlist_videos, is_preview, positions=None, show_progress=True):
+    # Callers running several operations at once hide their progress bars, redrawing every bar on each message is slow
+    return add_videos_to_playlists(youtube, videos_to_add, [(playlist_url, destination_playlist_videos)], is_preview, [positions], show_progress)[0]
+
+def add_videos_to_playlists(youtube, videos_to_add, destinations, is_preview, positions=None, show_progress=True, report_sections=None):
+    # Adds the videos to each (playlist_url, destination_playlist_videos) destination and returns the result data of each
+    # positions and report_sections, when given, hold the planned positions and the result section of each destination
+    playlist_ids = [urls.get_playlist_id(playlist_url) if playlist_url != None else None for playlist_url, destination_playlist_videos in destinations]
+    video_additions = [[] for destination in destinations]
+    already_in_playlist = [[] for destination in destinations]
+    failed = [[] for destination in destinations]
 
-    # Progress bar
-    progress_string = "Generating add preview" if is_preview else "Adding videos"
-    progress_bar = tqdm(total=len(videos_to_add), desc=progress_string, unit="video")
+    for index, (playlist_url, destination_playlist_videos) in enumerate(destinations):
+        playlist_id = playlist_ids[index]
 
-    # Process videos to add
-    for video_id in videos_to_add:
-        video = videos_to_add[video_id]
-        if video_id in destination_playlist_videos:
-            tqdm.write(f"Video {video_id} already found in playlist {playlist_id}")
-            already_in_playlist.append(video)
+        # Progress bar
+        progress_string = "Generating add preview" if is_preview else "Checking videos to add"
+        progress_bar = tqdm(total=len(videos_to_add), desc=progress_string, unit="video", disable=not show_progress)
+
+        # Process videos to add
+        for video_id in videos_to_add:
+            video = videos_to_add[video_id]
+            if video_id in destination_playlist_videos or journal.is_completed("insert", playlist_id, video_id):
+                tqdm.write(f"Video {video_id} already found in playlist {playlist_id}")
+                already_in_playlist[index].append(video)
+            else:
+                tqdm.write(f"Video {video_id} not yet added to playlist {playlist_id}")
+                video_additions[index].append(video)
+            progress_bar.update(1)
+        progress_bar.close()
+
+    if not is_preview:
+        start_positions = [destination_playlist_videos.get_items_total() for playlist_url, destination_playlist_videos in destinations]
+        video_additions, failed = insert_videos(youtube, playlist_ids, video_additions, start_positions, positions, show_progress, report_sections)
+
+    return [get_additions_result_data(video_additions[index], already_in_playlist[index], failed[index]) for index in range(len(destinations))]
+
+def insert_videos(youtube, playlist_ids, video_additions, start_positions, positions=None, show_progress=True, report_sections=None):
+    # Inserts the videos listed for each playlist and returns the added and the failed videos of each
+    # The inserts of every playlist go through one executor call, so batch requests are filled across playlists
+    positions = positions or [None] * len(playlist_ids)
+    failed = [[] for playlist_id in playlist_ids]
+    if all(len(additions) == 0 for additions in video_additions):
+        return (video_additions, failed)
+
+    # Explicit positions keep the insertion order when ordering is requested or positions are planned
+    ordered = executor.settings["ordered"] or any(playlist_positions is not None for playlist_positions in positions)
+    planned_positions = {}
+    if ordered:
+        for index, additions in enumerate(video_additions):
+            for position_index, video in enumerate(additions):
+                planned_positions[(index, video.video_id)] = positions[index][video.video_id] if positions[index] is not None else start_positions[index] + position_index
+    # Where the failed inserts of each playlist would stand had they succeeded, see get_insert_position
+    failed_positions = [[] for playlist_id in playlist_ids]
+
+    # Building the resource parses its discovery methods, so it is built once for all requests
+    playlist_items = youtube.playlistItems()
+
+    def new_insert_request(key):
+        index, video_id = key
+        snippet = {
+            "playlistId": playlist_ids[index],
+            "resourceId": {
+                "kind": "youtube#video",
+                "videoId": video_id
+            }
+        }
+        if key in planned_positions:
+            snippet["position"] = get_insert_position(planned_positions[key], failed_positions[index])
+        return playlist_items.insert(part="snippet", body={"snippet": snippet})
+
+    # Ordered inserts run one at a time and are built right before they are sent, so their positions account for the failed ones
+    keys = [(index, video.video_id) for index, additions in enumerate(video_additions) for video in additions]
+    requests = [(key, (lambda key=key: new_insert_request(key)) if ordered else new_insert_request(key)) for key in keys]
+
+    videos = [{video.video_id: video for video in additions} for additions in video_additions]
+
+    def on_result(key, result):
+        index, video_id = key
+        playlist_id = playlist_ids[index]
+        report_section = report_sections[index] if report_sections is not None else None
+        if ordered:
+            record_insert_outcome(planned_positions[key], result[0], failed_positions[index])
+        if result[0]:
+            journal.record("insert", playlist_id=playlist_id, video_id=video_id, playlist_item_id=result[1].get("id"))
+            reports.record_item("video_additions", videos[index][video_id], report_section)
+            tqdm.write(f"Added video {video_id} to playlist {playlist_id}")
         else:
-            tqdm.write(f"Video {video_id} not yet added to playlist {playlist_id}")
-            video_additions.append(video)
-            if not is_preview:
-                try:
-                    youtube.playlistItems().insert(
-                        part="snippet",
-                        body={
-                            "snippet": {
-                                "playlistId": playlist_id,
-                                "resourceId": {
-                                    "kind": "youtube#video",
-                                    "videoId": video_id
-                                }
-                            }
-                        }
-                    ).execute()
-                    tqdm.write(f"Added video {video_id} to playlist {playlist_id}")
-                except Exception as e:
-                    tqdm.write(f"Error adding video {video_id} to playlist {playlist_id}:\n{e}\n")
-                    failed.append((video, str(e)))
-                    video_additions.remove(video)
-        progress_bar.update(1)
-    progress_bar.close()
+            journal.record_failure()
+            reports.record_item("failed", (videos[index][video_id], result[1]), report_section)
+            tqdm.write(f"Error adding video {video_id} to playlist {playlist_id}:\n{result[1]}\n")
+
+    journal.begin()
+    results = executor.execute_requests(requests, "Adding videos", on_result, in_order=ordered, new_batch=youtube.new_batch_http_request, show_progress=show_progress)
+    added = [[] for playlist_id in playlist_ids]
+    for index, additions in enumerate(video_additions):
+        if len(additions) == 0:
+            continue
+        failed[index] = [(video, results[(index, video.video_id)][1]) for video in additions if not results[(index, video.video_id)][0]]
+        added[index] = [video for video in additions if results[(index, video.video_id)][0]]
+        forget_playlist_state(playlist_ids[index])
+    return (added, failed)
+
+def get_insert_position(planned_position, failed_positions):
+    # Planned positions assume every earlier insert succeeded, each failed insert planned before this one moves it up by one
+    return planned_position - sum(1 for failed_position in failed_positions if failed_position < planned_position)
+
+def record_insert_outcome(planned_position, succeeded, failed_positions):
+    # Keeps the failed inserts where they would stand in the planned playlist, an insert at or before one pushes it down
+    for failed_index, failed_position in enumerate(failed_positions):
+        if failed_position >= planned_position:
+            failed_positions[failed_index] = failed_position + 1
+    if not succeeded:
+        failed_positions.append(planned_position)
+
+def get_additions_result_data(video_additions, already_in_playlist, failed):
     return {
         "no_actions": len(video_additions) == 0,
         "video_additions": video_additions,
@@ -154,35 +369,86 @@ def add_videos_to_playlist(youtube, videos_to_add, playlist_url, destination_pla
         "failed_total": len(failed)
     }
 
-def remove_videos_from_playlist(youtube, videos_to_remove, playlist_url, destination_playlist_videos, is_preview):
-    playlist_id = re.search(r"list=([^&]+)", playlist_url).group(1)
-    video_removals = []
-    not_in_playlist = []
-    failed = []
+def remove_videos_from_playlist(youtube, videos_to_remove, playlist_url, destination_playlist_videos, is_preview, show_progress=True):
+    return remove_videos_from_playlists(youtube, videos_to_remove, [(playlist_url, destination_playlist_videos)], is_preview, show_progress)[0]
+
+def remove_videos_from_playlists(youtube, videos_to_remove, destinations, is_preview, show_progress=True, report_sections=None):
+    # Removes the videos from each (playlist_url, destination_playlist_videos) destination and returns the result data of each
+    playlist_ids = [urls.get_playlist_id(playlist_url) for playlist_url, destination_playlist_videos in destinations]
+    video_removals = [[] for destination in destinations]
+    not_in_playlist = [[] for destination in destinations]
+    failed = [[] for destination in destinations]
+
+    for index, (playlist_url, destination_playlist_videos) in enumerate(destinations):
+        playlist_id = playlist_ids[index]
+
+        # Progress bar
+        progress_string = "Generating removal preview" if is_preview else "Checking videos to remove"
+        progress_bar = tqdm(total=len(videos_to_remove), desc=progress_string, unit="video", disable=not show_progress)
+
+        # Process videos to remove
+        for video_id in videos_to_remove:
+            video = videos_to_remove[video_id]
+            if video_id in destination_playlist_videos and not journal.is_completed("delete", playlist_id, video_id):
+                tqdm.write(f"Found video {video_id} in playlist {playlist_id}")
+                video_removals[index].append(video)
+            else:
+                tqdm.write(f"Video {video_id} not found in playlist {playlist_id}")
+                not_in_playlist[index].append(video)
+            progress_bar.update(1)
+        progress_bar.close()
+
+    if not is_preview:
+        playlist_item_ids = [
+            [destination_playlist_videos[video.video_id].playlist_item_id for video in video_removals[index]]
+            for index, (playlist_url, destination_playlist_videos) in enumerate(destinations)
+        ]
+        video_removals, failed = delete_videos(youtube, playlist_ids, video_removals, playlist_item_ids, show_progress, report_sections)
 
-    # Progress bar
-    progress_string = "Generating removal preview" if is_preview else "Removing videos"
-    progress_bar = tqdm(total=len(videos_to_remove), desc=progress_string, unit="video")
-
-    # Process videos to remove
-    for video_id in videos_to_remove:
-        video = videos_to_remove[video_id]
-        if video_id in destination_playlist_videos:
-            tqdm.write(f"Found video {video_id} in playlist {playlist_id}")
-            video_removals.append(video)
-            if not is_preview:
-                try:
-                    youtube.playlistItems().delete(id=destination_playlist_videos[video_id]["playlist_item_id"]).execute()
-                    tqdm.write(f"Removed video {video_id} from playlist {playlist_id}")
-                except Exception as e:
-                    tqdm.write(f"Error removing video {video_id} from playlist {playlist_id}:\n{e}\n")
-                    failed.append((video, str(e)))
-                    video_removals.remove(video)
+    return [get_removals_result_data(video_removals[index], not_in_playlist[index], failed[index]) for index in range(len(destinations))]
+
+def delete_videos(youtube, playlist_ids, video_removals, playlist_item_ids, show_progress=True, report_sections=None):
+    # Deletes the playlist items listed for each playlist and returns the removed and the failed videos of each
+    # playlist_item_ids holds the item of each removal, so several items of the same video can be removed
+    # The deletes of every playlist go through one executor call, so batch requests are filled across playlists
+    failed = [[] for playlist_id in playlist_ids]
+    if all(len(removals) == 0 for removals in video_removals):
+        return (video_removals, failed)
+
+    # Deletes do not depend on each other, so they always run batched and on all workers
+    playlist_items = youtube.playlistItems()
+    requests = [
+        ((index, removal_index), playlist_items.delete(id=playlist_item_ids[index][removal_index]))
+        for index, removals in enumerate(video_removals)
+        for removal_index in range(len(removals))
+    ]
+
+    def on_result(key, result):
+        index, removal_index = key
+        playlist_id = playlist_ids[index]
+        video = video_removals[index][removal_index]
+        report_section = report_sections[index] if report_sections is not None else None
+        if result[0]:
+            journal.record("delete", playlist_id=playlist_id, video_id=video.video_id, playlist_item_id=playlist_item_ids[index][removal_index])
+            reports.record_item("video_removals", video, report_section)
+            tqdm.write(f"Removed video {video.video_id} from playlist {playlist_id}")
         else:
-            tqdm.write(f"Video {video_id} not found in playlist {playlist_id}")
-            not_in_playlist.append(video)
-        progress_bar.update(1)
-    progress_bar.close()
+            journal.record_failure()
+            reports.record_item("failed", (video, result[1]), report_section)
+            tqdm.write(f"Error removing video {video.video_id} from playlist {playlist_id}:\n{result[1]}\n")
+
+    journal.begin()
+    results = executor.execute_requests(requests, "Removing videos", on_result, new_batch=youtube.new_batch_http_request, show_progress=show_progress)
+    removed = [[] for playlist_id in playlist_ids]
+    for index, removals in enumerate(video_removals):
+        if len(removals) == 0:
+            continue
+        failed[index] = [(video, results[(index, removal_index)][1]) for removal_index, video in enumerate(removals) if not results[(index, removal_index)][0]]
+        removed[index] = [video for removal_index, video in enumerate(removals) if results[(index, removal_index)][0]]
+        forget_playlist_state(playlist_ids[index])
+    return (removed, failed)
+
+def get_removals_result_data(video_removals, not_in_playlist, failed):
     return {
         "no_actions": len(video_removals) == 0,
         "video_removals": video_removals,
@@ -193,14 +459,85 @@ def remove_videos_from_playlist(youtube, videos_to_remove, playlist_url, destina
         "failed_total": len(failed)
     }
 
+def move_videos_in_playlist(youtube, video_moves, playlist_url, is_preview):
+    # Moves (video, position) pairs in order, each position applies to the playlist as left by the previous moves
+    playlist_id = urls.get_playlist_id(playlist_url)
+    failed = []
+
+    if not is_preview and len(video_moves) > 0:
+        playlist_items = youtube.playlistItems()
+        videos = {}
+        positions = {}
+        requests = []
+        for video, position in video_moves:
+            videos[video.video_id] = video
+            positions[video.video_id] = position
+            requests.append((video.video_id, playlist_items.update(part="snippet", body={
+                "id": video.playlist_item_id,
+                "snippet": {
+                    "playlistId": playlist_id,
+                    "resourceId": {
+                        "kind": "youtube#video",
+                        "videoId": video.video_id
+                    },
+                    "position": position
+                }
+            })))
+
+        def on_result(video_id, result):
+            if result[0]:
+                journal.record("move", playlist_id=playlist_id, video_id=video_id, position=positions[video_id])
+                reports.record_item("video_moves", {"video": videos[video_id], "position": positions[video_id]})
+                tqdm.write(f"Moved video {video_id} to position {positions[video_id]} in playlist {playlist_id}")
+            else:
+                journal.record_failure()
+                reports.record_item("failed", (videos[video_id], result[1]))
+                tqdm.write(f"Error moving video {video_id} in playlist {playlist_id}:\n{result[1]}\n")
+
+        journal.begin()
+        results = executor.execute_requests(requests, "Moving videos", on_result, in_order=True)
+        failed = [(video, results[video.video_id][1]) for video, position in video_moves if not results[video.video_id][0]]
+        video_moves = [(video, position) for video, position in video_moves if results[video.video_id][0]]
+        forget_playlist_state(playlist_id)
+
+    return {
+        "no_actions": len(video_moves) == 0,
+        "video_moves": [{"video": video, "position": position} for video, position in video_moves],
+        "failed": failed,
+        "video_moves_total": len(video_moves),
+        "failed_total": len(failed)
+    }
+
+def get_my_playlists(youtube):
+    # Returns (success, playlists) with the ID, ETag and title of every playlist of the authenticated user
+    try:
+        playlists_resource = youtube.playlists()
+        playlists = []
+        page_token = None
+        while True:
+            response = dispatch.execute(playlists_resource.list(
+                part="id,snippet,contentDetails",
+                mine=True,
+                maxResults=50,
+                pageToken=page_token,
+                fields=MY_PLAYLISTS_FIELDS
+            ))
+            playlists.extend(response.get("items", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return (True, playlists)
+    except Exception as e:
+        print(f"Error retrieving your playlists:\n{e}\n")
+        return (False, None)
+
 def get_single_playlist_data(youtube, url):
     try:
-        playlist_id = re.search(r"list=([^&]+)", url).group(1)
+        playlist_id = urls.get_playlist_id(url)
         request = youtube.playlists().list(
             part="snippet",
             id=playlist_id
         )
-        response = request.execute()
+        response = dispatch.execute(request)
         if response["items"]:
             return response["items"][0]["snippet"]
         else:
@@ -226,7 +563,7 @@ def create_playlist(youtube, playlist_name):
                 }
             }
         )
-        response = request.execute()
+        response = dispatch.execute(request)
 
         # Extract playlist ID and URL from the response
         playlist_id = response["id"]
@@ -0,0 +1,52 @@
+import re
+
+# Compiled matchers for the YouTube URL forms accepted as input
+
+PLAYLIST_ID_PATTERN = re.compile(r"[?&]list=([^&#]+)")
+VIDEO_ID_PATTERNS = [
+    re.compile(r"[?&]v=([^&#]+)"),
+    re.compile(r"youtu\.be/([^?&#/]+)"),
+    re.compile(r"/(?:shorts|embed|live)/([^?&#/]+)")
+]
+
+# Bare IDs, as listed by manifests
+VIDEO_ID_FORMAT = re.compile(r"[A-Za-z0-9_-]{11}")
+PLAYLIST_ID_FORMAT = re.compile(r"(?:PL|UU|LL|FL|OL|RD)[A-Za-z0-9_-]+")
+
+def get_playlist_id(url):
+    match = PLAYLIST_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+def get_video_id(url):
+    for pattern in VIDEO_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+def parse_url(url):
+    # Returns ("video", id), ("playlist", id) or (None, url) when nothing matches
+    # A watch URL with a list parameter refers to the video being watched
+    video_id = get_video_id(url)
+    if video_id is not None and "/playlist" not in url:
+        return ("video", video_id)
+    playlist_id = get_playlist_id(url)
+    if playlist_id is not None:
+        return ("playlist", playlist_id)
+    return (None, url)
+
+def parse_input(value):
+    # Same as parse_url, also accepting bare video and playlist IDs
+    if "/" in value:
+        return parse_url(value)
+    if VIDEO_ID_FORMAT.fullmatch(value):
+        return ("video", value)
+    if PLAYLIST_ID_FORMAT.fullmatch(value):
+        return ("playlist", value)
+    return parse_url(value)
+
+def get_video_url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+def get_playlist_url(playlist_id):
+    return f"https://www.youtube.com/playlist?list={playlist_id}"
@@ -0,0 +1,211 @@
+import bisect
+import re
+
+# Set algebra over playlists and videos, and the minimal plan turning a playlist into the result
+
+# Operands are comma separated URLs, operators and parentheses are separated by whitespace
+# & (intersection) binds tighter than + (union) and - (difference), which apply left to right
+TOKEN_PATTERN = re.compile(r"\(|\)|[^\s()]+")
+OPERATORS = {
+    "+": "union",
+    "|": "union",
+    "union": "union",
+    "&": "intersection",
+    "intersect": "intersection",
+    "-": "difference",
+    "minus": "difference"
+}
+
+class ExpressionError(Exception):
+    pass
+
+def parse_expression(expression):
+    # Returns ("urls", [url, ...]) leaves combined into (operation, left, right) nodes, or None when invalid
+    tokens = TOKEN_PATTERN.findall(expression)
+    try:
+        tree, position = parse_union(tokens, 0)
+        if position != len(tokens):
+            raise ExpressionError(f"unexpected '{tokens[position]}'")
+        return tree
+    except ExpressionError as e:
+        print(f"Invalid sync expression: {e}")
+        return None
+
+def parse_union(tokens, position):
+    tree, position = parse_intersection(tokens, position)
+    while position < len(tokens) and OPERATORS.get(tokens[position].lower()) in ["union", "difference"]:
+        operation = OPERATORS[tokens[position].lower()]
+        right, position = parse_intersection(tokens, position + 1)
+        tree = (operation, tree, right)
+    return (tree, position)
+
+def parse_intersection(tokens, position):
+    tree, position = parse_operand(tokens, position)
+    while position < len(tokens) and OPERATORS.get(tokens[position].lower()) == "intersection":
+        right, position = parse_operand(tokens, position + 1)
+        tree = ("intersection", tree, right)
+    return (tree, position)
+
+def parse_operand(tokens, position):
+    if position >= len(tokens):
+        raise ExpressionError("missing operand at the end")
+    token = tokens[position]
+    if token == "(":
+        tree, position = parse_union(tokens, position + 1)
+        if position >= len(tokens) or tokens[position] != ")":
+            raise ExpressionError("missing ')'")
+        return (tree, position + 1)
+    if token == ")" or token.lower() in OPERATORS:
+        raise ExpressionError(f"expected a URL instead of '{token}'")
+    return (("urls", [url for url in token.split(",") if url]), position + 1)
+
+def get_expression_urls(tree):
+    if tree[0] == "urls":
+        return list(tree[1])
+    return get_expression_urls(tree[1]) + get_expression_urls(tree[2])
+
+def evaluate_expression(tree, url_video_ids):
+    # Video IDs are kept in dict keys, so results are ordered sets following the operands' order
+    if tree[0] == "urls":
+        return dict.fromkeys(video_id for url in tree[1] for video_id in url_video_ids.get(url, []))
+    left = evaluate_expression(tree[1], url_video_ids)
+    right = evaluate_expression(tree[2], url_video_ids)
+    if tree[0] == "union":
+        return {**left, **right}
+    if tree[0] == "intersection":
+        return {video_id: None for video_id in left if video_id in right}
+    return {video_id: None for video_id in left if video_id not in right}
+
+def plan_sync(target_video_ids, destination_video_ids, insertable_video_ids, reorder):
+    # destination_video_ids lists the destination's items in order, duplicates included
+    # Removals are the positions of every item of the videos left out of the target, duplicates included
+    # Moves act on the last item of each kept video, the one the destination collection tracks
+    last_positions = {video_id: position for position, video_id in enumerate(destination_video_ids)}
+    removals = [position for position, video_id in enumerate(destination_video_ids) if video_id not in target_video_ids]
+    additions = [video_id for video_id in target_video_ids if video_id not in last_positions and video_id in insertable_video_ids]
+    unavailable = [video_id for video_id in target_video_ids if video_id not in last_positions and video_id not in insertable_video_ids]
+    duplicates = len(destination_video_ids) - len(removals) - sum(1 for video_id in last_positions if video_id in target_video_ids)
+
+    plan = {
+        "removals": removals,
+        "moves": [],
+        "additions": [(video_id, None) for video_id in additions],
+        "unavailable": unavailable,
+        "duplicate_items": duplicates
+    }
+    if not reorder:
+        return plan
+
+    # The playlist after the removals, items are (video_id, is_tracked_item)
+    items = [
+        (video_id, last_positions[video_id] == position)
+        for position, video_id in enumerate(destination_video_ids)
+        if video_id in target_video_ids
+    ]
+    target_order = {video_id: rank for rank, video_id in enumerate(target_video_ids)}
+
+    # Items are simulated as a linked list of slots, slot 0 heads the list and each item, move and addition gets its own slot
+    # A moved video leaves its old slot empty, so positions are only counted once every slot is in its final order
+    next_slots = list(range(1, len(items) + 1)) + [None]
+    video_slots = {video_id: slot for slot, (video_id, is_tracked_item) in enumerate(items, 1) if is_tracked_item}
+    steps = []
+
+    # Videos on the longest run already in target order stay put, every other kept video moves once
+    kept = [video_id for video_id, is_tracked_item in items if is_tracked_item]
+    staying = set(get_longest_increasing_run(kept, target_order))
+    kept_in_target_order = [video_id for video_id in target_video_ids if video_id in video_slots]
+    for index, video_id in enumerate(kept_in_target_order):
+        if video_id in staying:
+            continue
+        after_slot = video_slots[kept_in_target_order[index - 1]] if index > 0 else 0
+        slot = insert_slot(next_slots, after_slot)
+        steps.append(("moves", video_id, slot, video_slots[video_id]))
+        video_slots[video_id] = slot
+
+    # New videos go right after the target video preceding them
+    previous_video_id = None
+    for video_id in target_video_ids:
+        if video_id not in video_slots:
+            if video_id not in insertable_video_ids:
+                continue
+            slot = insert_slot(next_slots, video_slots[previous_video_id] if previous_video_id is not None else 0)
+            steps.append(("additions", video_id, slot, None))
+            video_slots[video_id] = slot
+        previous_video_id = video_id
+
+    # Each step's position counts the filled slots before its own, at the time it is applied
+    plan["additions"] = []
+    ranks = get_slot_ranks(next_slots)
+    filled_counts = [0] * (len(next_slots) - 1)
+    for slot in range(1, len(items) + 1):
+        filled_counts[ranks[slot]] = 1
+    filled_slots = FenwickTree(filled_counts)
+    for kind, video_id, slot, old_slot in steps:
+        if old_slot is not None:
+            filled_slots.add(ranks[old_slot], -1)
+        plan[kind].append((video_id, filled_slots.count_before(ranks[slot])))
+        filled_slots.add(ranks[slot], 1)
+    return plan
+
+def insert_slot(next_slots, after_slot):
+    slot = len(next_slots)
+    next_slots.append(next_slots[after_slot])
+    next_slots[after_slot] = slot
+    return slot
+
+def get_slot_ranks(next_slots):
+    # Rank of each slot in list order, the head slot excluded
+    ranks = [None] * len(next_slots)
+    slot = next_slots[0]
+    rank = 0
+    while slot is not None:
+        ranks[slot] = rank
+        rank += 1
+        slot = next_slots[slot]
+    return ranks
+
+class FenwickTree:
+    # Counts of filled slots by rank, updated and summed in O(log n)
+    def __init__(self, counts):
+        self.tree = [0] + counts
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+
+    def add(self, rank, delta):
+        index = rank + 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def count_before(self, rank):
+        total = 0
+        index = rank
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+def get_longest_increasing_run(video_ids, target_order):
+    # Longest subsequence of video_ids whose target ranks increase, in O(n log n)
+    tail_ranks = []
+    tail_indexes = []
+    previous_indexes = []
+    for index, video_id in enumerate(video_ids):
+        rank = target_order[video_id]
+        length = bisect.bisect_left(tail_ranks, rank)
+        if length == len(tail_ranks):
+            tail_ranks.append(rank)
+            tail_indexes.append(index)
+        else:
+            tail_ranks[length] = rank
+            tail_indexes[length] = index
+        previous_indexes.append(tail_indexes[length - 1] if length > 0 else None)
+
+    run = []
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        run.append(video_ids[index])
+        index = previous_indexes[index]
+    return list(reversed(run))
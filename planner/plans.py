@@ -0,0 +1,42 @@
+import hashlib
+import json
+import sys
+from journal import journal
+
+# Execution plans written with the previews, listing the exact item-level operations the preview describes
+# A checksum guards the plan against edits, and a digest of each destination's items tells whether it changed since
+
+PLAN_VERSION = 2
+
+def get_checksum(plan):
+    # Computed over the canonical JSON of everything but the checksum, so reformatting the file keeps it valid
+    content = json.dumps({k: v for k, v in plan.items() if k != "checksum"}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def get_items_digest(videos):
+    # Any item added, removed or replaced in the destination changes its playlist item IDs
+    playlist_item_ids = sorted(video.playlist_item_id or "" for video in videos.values())
+    return hashlib.sha256("\n".join(playlist_item_ids).encode("utf-8")).hexdigest()
+
+def save_plan(plan):
+    plan = dict(plan, version=PLAN_VERSION)
+    plan["checksum"] = get_checksum(plan)
+    path = journal.get_new_path("plan", "json")
+    with open(path, 'w') as f:
+        json.dump(plan, f, indent=4)
+    return path
+
+def load_plan(path):
+    try:
+        with open(path) as f:
+            plan = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read plan {path}:\n{e}\n")
+        sys.exit(1)
+    if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION:
+        print(f"Plan {path} was not written by this version of the scripts, generate a new preview.")
+        sys.exit(1)
+    if plan.get("checksum") != get_checksum(plan):
+        print(f"Plan {path} was modified after it was written, generate a new preview.")
+        sys.exit(1)
+    return plan
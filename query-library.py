@@ -0,0 +1,16 @@
+import sys
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python query-library.py [<comma_separated_video_or_playlist_urls_to_look_up>] [-duplicates] [-refresh] [-budget N] [-dailybudget N] [-rate R] [-report json|ndjson|ndjson.gz] [-profile] [-prometheus <path>] [-engine sync|async] [-concurrency N]")
+        sys.exit(1)
+
+    # The Google client stack is only imported once the arguments are valid
+    from auth import auth
+    from workflows import workflows
+
+    youtube = auth.get_authenticated_service()
+    workflows.query_library_workflow(youtube)
+
+if __name__ == "__main__":
+    main()
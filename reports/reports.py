@@ -0,0 +1,228 @@
+import atexit
+import gzip
+import json
+import threading
+from contextlib import contextmanager
+from journal import journal
+from models.models import Video, VideoCollection, VideoCollectionView
+
+# Preview and result reports, written as one pretty JSON document or as NDJSON records
+# NDJSON result reports receive the items of the operations as they complete, and the rest of the document at the end
+
+FORMATS = ["json", "ndjson", "ndjson.gz"]
+
+# Only result reports receive streamed items
+STREAMED_REPORT_PREFIX = "result"
+
+# Flushing a gzip stream ends its compressed block, so gzip reports are only flushed every few records
+GZIP_FLUSH_EVERY_RECORDS = 100
+
+settings = {
+    "format": "json"
+}
+
+state = {
+    "path": None,
+    "file": None,
+    "unflushed_records": 0,
+    "streamed_paths": set()
+}
+
+_lock = threading.Lock()
+
+# Path of the result section the operations of each thread stream their items to, unset outside of executions
+_thread_data = threading.local()
+
+# Records are encoded one by one, a shared encoder saves building one per record
+_record_encoder = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+def configure(format="json"):
+    # A previous run in the same process must not leak into this one
+    close()
+    settings["format"] = format
+    state["streamed_paths"] = set()
+
+def is_streaming():
+    return settings["format"] != "json"
+
+def is_empty(value):
+    # Same outcome as `value in [None, [], "", 0]` without building the list and comparing against each entry
+    if value is None:
+        return True
+    if isinstance(value, (list, str)):
+        return len(value) == 0
+    if isinstance(value, (int, float)):
+        return value == 0
+    return False
+
+def clean_data(data):
+    # Videos and video collections are converted back to their dict shape here, at output time
+    if isinstance(data, Video):
+        return {k: v for k, v in data.to_dict().items() if not is_empty(v)}
+    elif isinstance(data, (VideoCollection, VideoCollectionView)):
+        return {video_id: clean_data(video) for video_id, video in data.items()}
+    elif isinstance(data, dict):
+        return {k: clean_data(v) for k, v in data.items() if not is_empty(v)}
+    elif isinstance(data, (list, tuple)):
+        return [clean_data(item) for item in data if not is_empty(item)]
+    else:
+        return data
+
+@contextmanager
+def section(*path):
+    # Items recorded by the operations running inside, on this thread, belong to the lists under this path of the result
+    previous_section = getattr(_thread_data, "section", None)
+    _thread_data.section = list(path)
+    try:
+        yield
+    finally:
+        _thread_data.section = previous_section
+
+def record_item(name, item, section_path=None):
+    # Appends the item to the list `name` of the given section, or of the current one, as soon as the operation completes it
+    if section_path is None:
+        section_path = getattr(_thread_data, "section", None)
+    if not is_streaming() or section_path is None:
+        return
+    path = list(section_path) + [name]
+    with _lock:
+        if state["file"] is None:
+            state["path"] = journal.get_new_path(STREAMED_REPORT_PREFIX, settings["format"])
+            state["file"] = open_report(state["path"], 'w')
+        state["streamed_paths"].add(tuple(path))
+        write_record({"stream": path, "item": clean_data(item)})
+
+        # Streamed items reach the disk right away, so an interrupted run keeps its report of the work done
+        state["unflushed_records"] += 1
+        if not state["path"].endswith(".gz") or state["unflushed_records"] >= GZIP_FLUSH_EVERY_RECORDS:
+            state["file"].flush()
+            state["unflushed_records"] = 0
+
+def save_report(data, prefix):
+    # Writes the report and returns its path, result reports continue the file their items were streamed to
+    if not is_streaming():
+        path = journal.get_new_path(prefix, "json")
+        with open(path, 'w') as f:
+            json.dump(clean_data(data), f, indent=4)
+        return path
+
+    with _lock:
+        if prefix != STREAMED_REPORT_PREFIX or state["file"] is None:
+            close_file()
+            state["path"] = journal.get_new_path(prefix, settings["format"])
+            state["file"] = open_report(state["path"], 'w')
+        path = state["path"]
+        for record in iter_dict_records(data, []):
+            write_record(record)
+        close_file()
+        state["streamed_paths"] = set()
+    return path
+
+def iter_dict_records(data, path):
+    # The cleaned document as records in document order, lists whose items were streamed are only referenced
+    emitted = False
+    for key, value in data.items():
+        if is_empty(value):
+            continue
+        for record in iter_value_records(value, path + [key]):
+            emitted = True
+            yield record
+    if not emitted:
+        yield {"path": path, "value": {}}
+
+def iter_value_records(value, path):
+    if type(value) is dict:
+        yield from iter_dict_records(value, path)
+    elif isinstance(value, list):
+        if tuple(path) in state["streamed_paths"]:
+            yield {"path": path, "streamed": True}
+            return
+        index = 0
+        for item in value:
+            if is_empty(item):
+                continue
+            if type(item) is dict:
+                yield from iter_dict_records(item, path + [index])
+            else:
+                yield {"path": path, "item": clean_data(item)}
+            index += 1
+    else:
+        yield {"path": path, "value": clean_data(value)}
+
+def open_report(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + 't', encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def write_record(record):
+    state["file"].write(_record_encoder.encode(record) + "\n")
+
+def close_file():
+    if state["file"] is not None:
+        state["file"].close()
+    state["file"] = None
+    state["unflushed_records"] = 0
+
+@atexit.register
+def close():
+    with _lock:
+        close_file()
+
+def load_report(path):
+    # Returns the report document of a JSON or NDJSON report
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+
+    data = {}
+    streamed_items = {}
+    for line in iter_report_lines(path):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A crash can leave a partially written last line behind
+            continue
+        if "stream" in record:
+            streamed_items.setdefault(tuple(record["stream"]), []).append(record["item"])
+        elif "streamed" in record:
+            set_value(data, record["path"], streamed_items.pop(tuple(record["path"]), []))
+        elif "item" in record:
+            get_parent(data, record["path"]).setdefault(record["path"][-1], []).append(record["item"])
+        else:
+            set_value(data, record["path"], record["value"])
+
+    # Reports of interrupted runs still list the items completed before the interruption
+    for path, items in streamed_items.items():
+        set_value(data, list(path), items)
+    return data
+
+def iter_report_lines(path):
+    with open_report(path, 'r') as f:
+        try:
+            yield from f
+        except EOFError:
+            # Gzip reports of interrupted runs end without the end of stream marker
+            return
+
+def get_parent(data, path):
+    # Walks to the container of the last path segment, creating the dicts and lists on the way
+    container = data
+    for segment, next_segment in zip(path, path[1:]):
+        child = [] if isinstance(next_segment, int) else {}
+        if isinstance(container, list):
+            container.extend([None] * (segment + 1 - len(container)))
+            if container[segment] is None:
+                container[segment] = child
+        else:
+            container.setdefault(segment, child)
+        container = container[segment]
+    return container
+
+def set_value(data, path, value):
+    if len(path) == 0:
+        data.update(value)
+        return
+    container = get_parent(data, path)
+    if isinstance(container, list):
+        container.extend([None] * (path[-1] + 1 - len(container)))
+    container[path[-1]] = value
@@ -0,0 +1,40 @@
+import sys
+
+from benchmarks import benchmarks
+from workflows import common
+
+def main():
+    if '-help' in sys.argv or '-h' in sys.argv:
+        print("Usage: python run-benchmarks.py [-sizes 100,1000,10000,50000] [-scenarios resolve,bulk-add,bulk-remove,divide] [-latency SECONDS] [-errorrate RATE] [-warm] [-workers N] [-rate R] [-stream] [-engine sync|async] [-concurrency N]")
+        sys.exit(0)
+
+    sizes = [int(size) for size in common.get_command_option('-sizes', ",".join(map(str, benchmarks.DEFAULT_SIZES))).split(',')]
+    scenarios = common.get_command_option('-scenarios', ",".join(benchmarks.SCENARIOS)).split(',')
+    latency = common.get_command_float_option('-latency', 0.0)
+    error_rate = common.get_command_float_option('-errorrate', 0.0)
+    warm = '-warm' in sys.argv
+
+    # Flags passed through to the workflows, the fake API is not rate limited by default
+    flags = ['-rate', str(common.get_command_float_option('-rate', 100000.0))]
+    flags += ['-workers', str(common.get_command_int_option('-workers', 1))]
+    if '-stream' in sys.argv:
+        flags.append('-stream')
+    flags += ['-engine', common.get_command_option('-engine', "sync")]
+    if '-concurrency' in sys.argv:
+        flags += ['-concurrency', str(common.get_command_int_option('-concurrency', None))]
+    if not warm:
+        flags.append('-nocache')
+
+    settings = {
+        "sizes": sizes,
+        "scenarios": scenarios,
+        "latency": latency,
+        "error_rate": error_rate,
+        "warm": warm,
+        "flags": flags
+    }
+    results = benchmarks.run_benchmarks(sizes, scenarios, flags, latency=latency, error_rate=error_rate, warm=warm)
+    benchmarks.save_results(results, settings)
+
+if __name__ == "__main__":
+    main()
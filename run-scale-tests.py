@@ -0,0 +1,45 @@
+import sys
+
+from benchmarks import scale
+from workflows import common
+
+def main():
+    if '-help' in sys.argv or '-h' in sys.argv:
+        print("Usage: python run-scale-tests.py [-sizes 1000,10000,100000] [-paths add-preview,remove-preview,categorize,clean-data,manifest,sync-plan,bulk-add,bulk-remove,divide] [-baseline <path>] [-threshold RATIO] [-update-baseline]")
+        sys.exit(0)
+
+    sizes = [int(size) for size in common.get_command_option('-sizes', ",".join(map(str, scale.DEFAULT_SIZES))).split(',')]
+    paths = common.get_command_option('-paths', ",".join(scale.PATHS)).split(',')
+    unknown_paths = [path for path in paths if path not in scale.PATHS]
+    if len(unknown_paths) > 0:
+        print(f"Unknown scale test paths: {', '.join(unknown_paths)}")
+        sys.exit(1)
+    baseline_path = common.get_command_option('-baseline', scale.DEFAULT_BASELINE_PATH)
+    threshold = common.get_command_float_option('-threshold', scale.DEFAULT_THRESHOLD)
+
+    settings = {
+        "sizes": sizes,
+        "paths": paths,
+        "threshold": threshold
+    }
+    results = scale.run_scale_tests(sizes, paths)
+    scale.save_results(results, settings)
+
+    if '-update-baseline' in sys.argv:
+        scale.save_baseline(results, settings, baseline_path)
+        return
+
+    baseline = scale.load_baseline(baseline_path)
+    if baseline is None:
+        print("Run with the -update-baseline flag to store a baseline.")
+        sys.exit(1)
+    regressions = scale.get_regressions(results, baseline, threshold)
+    if len(regressions) > 0:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
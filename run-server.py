@@ -0,0 +1,16 @@
+import sys
+
+from server import server
+from workflows import common
+
+def main():
+    if '-help' in sys.argv or '-h' in sys.argv:
+        print("Usage: python run-server.py [-host HOST] [-port PORT]")
+        sys.exit(0)
+
+    host = common.get_command_option('-host', server.DEFAULT_HOST)
+    port = common.get_command_int_option('-port', server.DEFAULT_PORT)
+    server.run_server(host, port)
+
+if __name__ == "__main__":
+    main()
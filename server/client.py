@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+# Thin client handing a script invocation to a running server, only depends on the standard library
+
+# Seconds each poll blocks on the server while the job runs
+POLL_WAIT_SECONDS = 30
+
+def get_server_arguments(argv):
+    # Splits the -server <address> flag from the arguments the workflow receives
+    index = argv.index('-server')
+    if index + 1 >= len(argv):
+        print("Missing value for -server flag.")
+        sys.exit(1)
+    arguments = argv[1:index] + argv[index + 2:]
+
+    # Manifest files are read by the server from its own working directory
+    if len(arguments) > 0 and arguments[0].startswith("@") and arguments[0] != "@-":
+        arguments[0] = "@" + os.path.abspath(arguments[0][1:])
+    # So are execution plans
+    if '-execute-plan' in arguments and arguments.index('-execute-plan') + 1 < len(arguments):
+        plan_index = arguments.index('-execute-plan') + 1
+        arguments[plan_index] = os.path.abspath(arguments[plan_index])
+    return (argv[index + 1], arguments)
+
+def request_json(url, data=None):
+    body = json.dumps(data).encode("utf-8") if data is not None else None
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=POLL_WAIT_SECONDS + 30) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.load(e)["error"]
+        except Exception:
+            message = str(e)
+        print(f"Server rejected the request: {message}")
+        sys.exit(1)
+    except (urllib.error.URLError, OSError) as e:
+        print(f"Error reaching the server:\n{e}\n")
+        sys.exit(1)
+
+def run_remote_workflow(workflow, argv):
+    address, arguments = get_server_arguments(argv)
+    base_url = address if address.startswith("http") else f"http://{address}"
+    job = request_json(f"{base_url}/jobs", {"workflow": workflow, "arguments": arguments})
+    job_id = job["job_id"]
+    print(f"Submitted job {job_id} to {base_url}")
+
+    while job["status"] != "done":
+        job = request_json(f"{base_url}/jobs/{job_id}?wait={POLL_WAIT_SECONDS}")
+
+    if len(job["coalesced_job_ids"]) > 0:
+        print(f"Job {job_id} ran together with job(s) {', '.join(map(str, job['coalesced_job_ids']))} on the same playlist")
+    sys.stdout.write(job["output"])
+
+    # The server's preview and result files are written here too, NDJSON reports arrive converted to pretty JSON
+    for filename, contents in job["files"].items():
+        with open(filename.removesuffix(".gz").removesuffix(".ndjson").removesuffix(".json") + ".json", 'w') as f:
+            json.dump(contents, f, indent=4)
+    sys.exit(job["exit_code"])
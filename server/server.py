@@ -0,0 +1,249 @@
+import contextlib
+import io
+import json
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from auth import auth
+from operations import operations
+from operations import urls
+from reports import reports
+from workflows import common
+from workflows import workflows
+
+# Resident service running the workflows for local clients over HTTP
+# Credentials, the discovery-built client, the cache connection, the category map and the HTTP pools stay warm between jobs
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Finished jobs kept for clients to collect, oldest are dropped first
+MAX_FINISHED_JOBS = 1000
+
+# Seconds a client may block waiting for a job to finish
+MAX_WAIT_SECONDS = 60
+
+# Script name and number of positional arguments of each workflow
+WORKFLOWS = {
+    "bulk-add": ("bulk-add-to-playlist.py", 2),
+    "bulk-remove": ("bulk-remove-from-playlist.py", 2),
+    "divide": ("divide-into-categories.py", 1),
+    "sync": ("sync-playlist.py", 2)
+}
+
+state = {
+    "youtube": None,
+    "started_at": None,
+    "jobs": {},
+    "queue": [],
+    "next_job_id": 1
+}
+
+# Guards the jobs and the queue, and wakes the job runner and waiting clients
+_condition = threading.Condition()
+
+def run_workflow(workflow):
+    youtube = state["youtube"]
+    if workflow == "bulk-add":
+        workflows.bulk_videos_playlist_workflow(youtube, videos_at_hand_label="videos_to_add", playlist_function=operations.add_videos_to_playlist)
+    elif workflow == "bulk-remove":
+        workflows.bulk_videos_playlist_workflow(youtube, videos_at_hand_label="videos_to_remove", playlist_function=operations.remove_videos_from_playlist)
+    elif workflow == "sync":
+        workflows.sync_playlist_workflow(youtube)
+    else:
+        workflows.divide_into_categories_workflow(youtube)
+
+def validate_job(workflow, arguments):
+    # Returns an error message, jobs cannot answer the interactive prompts of the scripts
+    if workflow not in WORKFLOWS:
+        return f"Unknown workflow: {workflow}"
+    positional_count = WORKFLOWS[workflow][1]
+    # Execution plans were already previewed and hold their input, so they run without URL arguments or confirmation
+    executes_plan = workflow in ["bulk-add", "bulk-remove"] and isinstance(arguments, list) and '-execute-plan' in arguments
+    if executes_plan:
+        positional_count = 0
+    if not isinstance(arguments, list) or len(arguments) < positional_count or any(not isinstance(argument, str) for argument in arguments):
+        return f"The {workflow} workflow takes {positional_count} URL arguments followed by its flags"
+    flags = arguments[positional_count:]
+    if not executes_plan and not any(flag in flags for flag in ['-force', '-f', '-previewonly', '-p']):
+        return "Jobs need the -force or -previewonly flag, the confirmation prompt cannot be answered"
+    if arguments[0] == "@-":
+        return "Jobs cannot read a manifest from standard input, pass the manifest file instead"
+    if workflow == "divide" and not any(flag in flags for flag in ['-name', '-n']):
+        return "Divide jobs need the -name flag, the playlist name prompts cannot be answered"
+    return None
+
+def get_coalesce_key(job):
+    # Forced bulk jobs on the same playlists with the same flags run as one job over all of their inputs
+    # Manifest inputs cannot be joined with commas and plans are applied as they were previewed, so their jobs run alone
+    flags = job["arguments"][2:]
+    if job["workflow"] not in ["bulk-add", "bulk-remove"] or job["arguments"][0].startswith("@") or '-execute-plan' in job["arguments"] or '-resume' in flags or '-previewonly' in flags or '-p' in flags:
+        return None
+    playlist_ids = tuple(urls.get_playlist_id(playlist_url) for playlist_url in common.split_input_urls(job["arguments"][1]))
+    return (job["workflow"], playlist_ids, tuple(flags))
+
+def submit_job(workflow, arguments):
+    with _condition:
+        job_id = state["next_job_id"]
+        state["next_job_id"] += 1
+        job = {
+            "job_id": job_id,
+            "workflow": workflow,
+            "arguments": arguments,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "exit_code": None,
+            "output": "",
+            "files": {},
+            "coalesced_job_ids": []
+        }
+        state["jobs"][job_id] = job
+        state["queue"].append(job)
+        _condition.notify_all()
+        return job
+
+def take_next_jobs():
+    # Takes the oldest queued job together with every queued job it can be coalesced with
+    with _condition:
+        while len(state["queue"]) == 0:
+            _condition.wait()
+        job = state["queue"].pop(0)
+        key = get_coalesce_key(job)
+        jobs = [job]
+        if key is not None:
+            jobs.extend(queued_job for queued_job in state["queue"] if get_coalesce_key(queued_job) == key)
+            state["queue"] = [queued_job for queued_job in state["queue"] if queued_job not in jobs]
+        for job in jobs:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            job["coalesced_job_ids"] = [other_job["job_id"] for other_job in jobs if other_job is not job]
+        return jobs
+
+def get_job_arguments(jobs):
+    if len(jobs) == 1:
+        return jobs[0]["arguments"]
+    first_arguments = jobs[0]["arguments"]
+    return [",".join(job["arguments"][0] for job in jobs)] + first_arguments[1:]
+
+def run_jobs(jobs):
+    # Workflows read sys.argv and module-level settings, so jobs run one at a time on the job runner thread
+    script = WORKFLOWS[jobs[0]["workflow"]][0]
+    sys.argv = [script] + get_job_arguments(jobs)
+    common.saved_files.clear()
+    output = io.StringIO()
+    exit_code = 0
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            run_workflow(jobs[0]["workflow"])
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+
+    files = {}
+    for filename in common.saved_files:
+        files[filename] = reports.load_report(filename)
+
+    with _condition:
+        for job in jobs:
+            job["status"] = "done"
+            job["finished_at"] = time.time()
+            job["exit_code"] = exit_code
+            job["output"] = output.getvalue()
+            job["files"] = files
+        drop_finished_jobs()
+        _condition.notify_all()
+
+def drop_finished_jobs():
+    finished_job_ids = [job_id for job_id, job in state["jobs"].items() if job["status"] == "done"]
+    for job_id in finished_job_ids[:max(0, len(finished_job_ids) - MAX_FINISHED_JOBS)]:
+        del state["jobs"][job_id]
+
+def run_job_runner():
+    while True:
+        jobs = take_next_jobs()
+        run_jobs(jobs)
+        print(f"Finished job(s) {', '.join(str(job['job_id']) for job in jobs)} with exit code {jobs[0]['exit_code']}", file=sys.__stdout__, flush=True)
+
+def wait_for_job(job_id, wait_seconds):
+    deadline = time.time() + min(wait_seconds, MAX_WAIT_SECONDS)
+    with _condition:
+        while job_id in state["jobs"] and state["jobs"][job_id]["status"] != "done" and time.time() < deadline:
+            _condition.wait(deadline - time.time())
+        return state["jobs"].get(job_id)
+
+def get_status():
+    with _condition:
+        jobs = list(state["jobs"].values())
+        return {
+            "uptime_seconds": round(time.time() - state["started_at"], 3),
+            "queued": sum(1 for job in jobs if job["status"] == "queued"),
+            "running": sum(1 for job in jobs if job["status"] == "running"),
+            "done": sum(1 for job in jobs if job["status"] == "done")
+        }
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # POST /jobs submits a job, GET /jobs/<id>?wait=<seconds> reads it, GET /status reports the queue
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            return self.send_json(404, {"error": "Not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            return self.send_json(400, {"error": "Invalid JSON body"})
+        error = validate_job(body.get("workflow"), body.get("arguments"))
+        if error is not None:
+            return self.send_json(400, {"error": error})
+        job = submit_job(body["workflow"], body["arguments"])
+        self.send_json(202, {"job_id": job["job_id"], "status": job["status"]})
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        if parsed.path == "/status":
+            return self.send_json(200, get_status())
+        if not parsed.path.startswith("/jobs/"):
+            return self.send_json(404, {"error": "Not found"})
+        try:
+            job_id = int(parsed.path[len("/jobs/"):])
+            wait_seconds = float(urllib.parse.parse_qs(parsed.query).get("wait", ["0"])[0])
+        except ValueError:
+            return self.send_json(400, {"error": "Invalid job ID or wait value"})
+        job = wait_for_job(job_id, wait_seconds)
+        if job is None:
+            return self.send_json(404, {"error": f"Job {job_id} not found"})
+        with _condition:
+            job = dict(job)
+        self.send_json(200, job)
+
+    def send_json(self, status, data):
+        content = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # Job output is captured from stdout and stderr, so request logs go to the real stderr
+        sys.__stderr__.write(f"{self.address_string()} - {format % args}\n")
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    state["youtube"] = auth.get_authenticated_service()
+    state["started_at"] = time.time()
+    threading.Thread(target=run_job_runner, daemon=True).start()
+
+    http_server = ThreadingHTTPServer((host, port), RequestHandler)
+    print(f"Serving the workflows on http://{host}:{port}")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        print("Server stopped.")
+    finally:
+        http_server.server_close()
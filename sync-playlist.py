@@ -0,0 +1,21 @@
+import sys
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python sync-playlist.py <expression_of_video_or_playlist_urls> <playlist_url_to_sync> [-force] [-previewonly] [-reorder] [-nocache] [-refresh] [-library] [-workers N] [-ordered] [-budget N] [-dailybudget N] [-rate R] [-report json|ndjson|ndjson.gz] [-profile] [-prometheus <path>] [-engine sync|async] [-concurrency N] [-server <host:port>]")
+        sys.exit(1)
+
+    # Hand the job to a running server instead of running it in this process
+    if '-server' in sys.argv:
+        from server import client
+        client.run_remote_workflow("sync", sys.argv)
+
+    # The Google client stack is only imported once the arguments are valid
+    from auth import auth
+    from workflows import workflows
+
+    youtube = auth.get_authenticated_service()
+    workflows.sync_playlist_workflow(youtube)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from manifest import manifest
+
+VIDEO_ID = "dQw4w9WgXcQ"
+OTHER_VIDEO_ID = "9bZkp7q19f0"
+PLAYLIST_ID = "PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf"
+
+def read(lines):
+    return list(manifest.iter_entries(lines))
+
+class ManifestFormatTest(unittest.TestCase):
+    def test_text_lines_skip_comments_and_split_commas(self):
+        entries = read([
+            "# videos to add\n",
+            f"https://www.youtube.com/watch?v={VIDEO_ID}, {OTHER_VIDEO_ID}\n",
+            "\n",
+            f"https://www.youtube.com/playlist?list={PLAYLIST_ID}\n"
+        ])
+        self.assertEqual([(url_type, url_id) for source, url_type, url_id, details in entries], [
+            ("video", VIDEO_ID),
+            ("video", OTHER_VIDEO_ID),
+            ("playlist", PLAYLIST_ID)
+        ])
+
+    def test_csv_with_details(self):
+        entries = read(["video_id,title,category\n", f"{VIDEO_ID},Never Gonna Give You Up,Music\n"])
+        self.assertEqual(entries, [(VIDEO_ID, "video", VIDEO_ID, ("Never Gonna Give You Up", "Music"))])
+
+    def test_csv_input_column_anywhere_in_the_header(self):
+        entries = read(['"Title","URL"\n', f"Some title,https://www.youtube.com/watch?v={VIDEO_ID}\n"])
+        self.assertEqual([(url_type, url_id) for source, url_type, url_id, details in entries], [("video", VIDEO_ID)])
+
+    def test_text_line_with_commas_is_not_a_header(self):
+        entries = read([f"{VIDEO_ID},{OTHER_VIDEO_ID}\n"])
+        self.assertEqual([url_id for source, url_type, url_id, details in entries], [VIDEO_ID, OTHER_VIDEO_ID])
+
+    def test_ndjson_records(self):
+        entries = read([
+            f'{{"video_id": "{VIDEO_ID}", "title": "Never Gonna Give You Up", "category": "Music"}}\n',
+            f'{{"playlist_id": "{PLAYLIST_ID}"}}\n'
+        ])
+        self.assertEqual(entries, [
+            (VIDEO_ID, "video", VIDEO_ID, ("Never Gonna Give You Up", "Music")),
+            (PLAYLIST_ID, "playlist", PLAYLIST_ID, None)
+        ])
+
+    def test_invalid_ndjson_records_are_skipped(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            entries = read([f'{{"video_id": "{VIDEO_ID}"}}\n', "{not json\n"])
+        self.assertEqual([url_id for source, url_type, url_id, details in entries], [VIDEO_ID])
+
+class ManifestSourceTest(unittest.TestCase):
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "manifest.csv")
+            with open(path, 'w') as f:
+                f.write(f"url\nhttps://www.youtube.com/watch?v={VIDEO_ID}\n")
+            entries = list(manifest.read_entries(path))
+        self.assertEqual([(url_type, url_id) for source, url_type, url_id, details in entries], [("video", VIDEO_ID)])
+
+    def test_missing_file_exits(self):
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(SystemExit):
+            manifest.read_entries(os.path.join(tempfile.gettempdir(), "missing-manifest.txt"))
+
+    def test_stdin(self):
+        with mock.patch("sys.stdin", io.StringIO(f"{VIDEO_ID}\n{PLAYLIST_ID}\n")):
+            entries = list(manifest.read_entries("-"))
+        self.assertEqual([(url_type, url_id) for source, url_type, url_id, details in entries], [("video", VIDEO_ID), ("playlist", PLAYLIST_ID)])
+
+    def test_stdin_requires_prompts_to_be_skipped(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                manifest.check_stdin_argument(["bulk-add-to-playlist.py", "@-", PLAYLIST_ID])
+            with self.assertRaises(SystemExit):
+                manifest.check_stdin_argument(["divide-into-categories.py", "@-", "-force"], prompts_names=True)
+        manifest.check_stdin_argument(["bulk-add-to-playlist.py", "@-", PLAYLIST_ID, "-previewonly"])
+        manifest.check_stdin_argument(["divide-into-categories.py", "@-", "-force", "-name"], prompts_names=True)
+        manifest.check_stdin_argument(["bulk-add-to-playlist.py", "@manifest.txt", PLAYLIST_ID])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import random
+import unittest
+from planner import planner
+
+def apply_plan(destination_video_ids, plan):
+    # Applies the plan the way the sync workflow sends it: removals, then moves, then additions, each on the playlist left by the previous ones
+    # Removals are destination positions, moves act on the last item of each video
+    removed = set(plan["removals"])
+    items = [video_id for position, video_id in enumerate(destination_video_ids) if position not in removed]
+    for video_id, position in plan["moves"]:
+        del items[len(items) - 1 - items[::-1].index(video_id)]
+        items.insert(position, video_id)
+    for video_id, position in plan["additions"]:
+        items.insert(len(items) if position is None else position, video_id)
+    return items
+
+def get_longest_increasing_length(values):
+    lengths = []
+    for index, value in enumerate(values):
+        lengths.append(1 + max([lengths[previous] for previous in range(index) if values[previous] < value], default=0))
+    return max(lengths, default=0)
+
+class PlanSyncTest(unittest.TestCase):
+    def test_removals_and_additions(self):
+        plan = planner.plan_sync(dict.fromkeys(["a", "c", "d", "e"]), ["a", "b", "c"], {"d": None}, reorder=False)
+        self.assertEqual(plan["removals"], [1])
+        self.assertEqual(plan["additions"], [("d", None)])
+        self.assertEqual(plan["unavailable"], ["e"])
+        self.assertEqual(plan["moves"], [])
+        self.assertEqual(plan["duplicate_items"], 0)
+
+    def test_duplicates_of_target_videos_are_left_in_place(self):
+        destination_video_ids = ["a", "b", "a", "c"]
+        plan = planner.plan_sync(dict.fromkeys(["a", "c"]), destination_video_ids, {}, reorder=False)
+        self.assertEqual(plan["removals"], [1])
+        self.assertEqual(plan["duplicate_items"], 1)
+        self.assertEqual(apply_plan(destination_video_ids, plan), ["a", "a", "c"])
+
+    def test_every_item_of_a_removed_video_is_removed(self):
+        destination_video_ids = ["b", "a", "b"]
+        for reorder in [False, True]:
+            plan = planner.plan_sync(dict.fromkeys(["a"]), destination_video_ids, {}, reorder=reorder)
+            self.assertEqual(plan["removals"], [0, 2])
+            self.assertEqual(plan["duplicate_items"], 0)
+            self.assertEqual(apply_plan(destination_video_ids, plan), ["a"])
+
+    def test_reorder_moves_only_videos_off_the_longest_run(self):
+        target_video_ids = dict.fromkeys(["a", "b", "c", "d", "e"])
+        plan = planner.plan_sync(target_video_ids, ["e", "a", "b", "c", "d"], {}, reorder=True)
+        self.assertEqual(plan["moves"], [("e", 4)])
+        self.assertEqual(apply_plan(["e", "a", "b", "c", "d"], plan), list(target_video_ids))
+
+    def test_reorder_places_additions_after_their_target_predecessor(self):
+        target_video_ids = dict.fromkeys(["x", "a", "y", "b", "z"])
+        plan = planner.plan_sync(target_video_ids, ["b", "a"], dict.fromkeys(["x", "y", "z"]), reorder=True)
+        self.assertEqual(plan["additions"], [("x", 0), ("y", 2), ("z", 4)])
+        self.assertEqual(apply_plan(["b", "a"], plan), list(target_video_ids))
+
+    def test_reorder_reaches_the_target_order(self):
+        generator = random.Random(0)
+        for case in range(500):
+            video_ids = [f"v{index}" for index in range(generator.randint(0, 30))]
+            destination_video_ids = generator.sample(video_ids, generator.randint(0, len(video_ids)))
+            target_video_ids = dict.fromkeys(generator.sample(video_ids, generator.randint(0, len(video_ids))))
+            insertable_video_ids = dict.fromkeys(video_id for video_id in video_ids if generator.random() < 0.8)
+            plan = planner.plan_sync(target_video_ids, destination_video_ids, insertable_video_ids, reorder=True)
+
+            expected = [video_id for video_id in target_video_ids if video_id in destination_video_ids or video_id in insertable_video_ids]
+            self.assertEqual(apply_plan(destination_video_ids, plan), expected)
+
+            # Only the kept videos off the longest run already in target order move
+            ranks = [list(target_video_ids).index(video_id) for video_id in destination_video_ids if video_id in target_video_ids]
+            self.assertEqual(len(plan["moves"]), len(ranks) - get_longest_increasing_length(ranks))
+
+class ExpressionTest(unittest.TestCase):
+    def test_intersection_binds_tighter(self):
+        tree = planner.parse_expression("A + B & C - D")
+        url_video_ids = {"A": ["a", "b"], "B": ["b", "c"], "C": ["c", "d"], "D": ["a"]}
+        self.assertEqual(list(planner.evaluate_expression(tree, url_video_ids)), ["b", "c"])
+
+if __name__ == "__main__":
+    unittest.main()
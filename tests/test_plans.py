@@ -0,0 +1,85 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from models.models import Video, VideoCollection
+from planner import plans
+
+PLAN = {
+    "workflow": "bulk_videos_playlist",
+    "label": "videos_to_add",
+    "input_data": {"playlist_url": "https://www.youtube.com/playlist?list=PLtest", "videos_to_add_total": 1},
+    "destinations": [
+        {
+            "playlist_url": "https://www.youtube.com/playlist?list=PLtest",
+            "items_digest": "0" * 64,
+            "items_total": 0,
+            "operations": [{"video": {"video_id": "dQw4w9WgXcQ"}}]
+        }
+    ]
+}
+
+class PlanFileTest(unittest.TestCase):
+    def setUp(self):
+        # Plans are written to the working directory
+        self.working_directory = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.working_directory)
+        self.directory.cleanup()
+
+    def load_rejected(self, path):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit):
+            plans.load_plan(path)
+        return output.getvalue()
+
+    def test_round_trip(self):
+        path = plans.save_plan(PLAN)
+        plan = plans.load_plan(path)
+        self.assertEqual(plan["destinations"], PLAN["destinations"])
+        self.assertEqual(plan["version"], plans.PLAN_VERSION)
+
+    def test_reformatting_keeps_the_checksum_valid(self):
+        path = plans.save_plan(PLAN)
+        with open(path) as f:
+            plan = json.load(f)
+        with open(path, 'w') as f:
+            json.dump(plan, f)
+        self.assertEqual(plans.load_plan(path)["checksum"], plan["checksum"])
+
+    def test_edited_plan_is_rejected(self):
+        path = plans.save_plan(PLAN)
+        with open(path) as f:
+            plan = json.load(f)
+        plan["destinations"][0]["operations"].append({"video": {"video_id": "9bZkp7q19f0"}})
+        with open(path, 'w') as f:
+            json.dump(plan, f)
+        self.assertIn("was modified after it was written", self.load_rejected(path))
+
+    def test_other_version_is_rejected(self):
+        plan = dict(PLAN, version=plans.PLAN_VERSION - 1)
+        plan["checksum"] = plans.get_checksum(plan)
+        with open("plan-old.json", 'w') as f:
+            json.dump(plan, f)
+        self.assertIn("was not written by this version", self.load_rejected("plan-old.json"))
+
+    def test_unreadable_plan_is_rejected(self):
+        with open("plan-broken.json", 'w') as f:
+            f.write("{")
+        self.assertIn("Could not read plan", self.load_rejected("plan-broken.json"))
+
+class ItemsDigestTest(unittest.TestCase):
+    def test_digest_follows_the_playlist_items(self):
+        videos = VideoCollection([Video("dQw4w9WgXcQ", playlist_item_id="item1"), Video("9bZkp7q19f0", playlist_item_id="item2")])
+        reordered = VideoCollection([Video("9bZkp7q19f0", playlist_item_id="item2"), Video("dQw4w9WgXcQ", playlist_item_id="item1")])
+        replaced = VideoCollection([Video("dQw4w9WgXcQ", playlist_item_id="item1"), Video("kJQP7kiw5Fk", playlist_item_id="item3")])
+        self.assertEqual(plans.get_items_digest(videos), plans.get_items_digest(reordered))
+        self.assertNotEqual(plans.get_items_digest(videos), plans.get_items_digest(replaced))
+
+if __name__ == "__main__":
+    unittest.main()
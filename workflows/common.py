@@ -1,34 +1,155 @@
-import json
+import queue
 import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from cache import cache
+from cache import library
+from journal import journal
+from manifest import manifest
+from metrics import metrics
+from operations import async_engine
+from operations import dispatch
+from operations import executor
 from operations import operations
+from operations import urls
+from models.models import Video, VideoCollection
+from planner import plans
+from reports import reports
+
+# Number of playlists paged at the same time while resolving input URLs
+RESOLUTION_WORKERS = 8
+
+# Number of resolved chunks buffered ahead of the operation stage when streaming
+STREAM_BUFFERED_CHUNKS = 4
+
+# Preview and result files written by this process, in order
+saved_files = []
 
 def get_command_flags():
     return {
         "force": '-force' in sys.argv or '-f' in sys.argv,
         "previewonly": '-previewonly' in sys.argv or '-p' in sys.argv,
-        "name": '-name' in sys.argv or '-n' in sys.argv
+        "name": '-name' in sys.argv or '-n' in sys.argv,
+        "nocache": '-nocache' in sys.argv,
+        "refresh": '-refresh' in sys.argv,
+        "workers": get_command_int_option('-workers', 1),
+        "ordered": '-ordered' in sys.argv,
+        "reorder": '-reorder' in sys.argv,
+        "budget": get_command_int_option('-budget', None),
+        "dailybudget": get_command_int_option('-dailybudget', None),
+        "rate": get_command_float_option('-rate', None),
+        "resume": get_command_option('-resume', None),
+        "stream": '-stream' in sys.argv,
+        "profile": '-profile' in sys.argv,
+        "prometheus": get_command_option('-prometheus', None),
+        "engine": get_command_option('-engine', "sync"),
+        "concurrency": get_command_int_option('-concurrency', None),
+        "library": '-library' in sys.argv,
+        "duplicates": '-duplicates' in sys.argv,
+        "report": get_command_option('-report', "json"),
+        "executeplan": get_command_option('-execute-plan', None)
     }
 
-def clean_data(data):
-    if isinstance(data, dict):
-        return {k: clean_data(v) for k, v in data.items() if v not in [None, [], "", 0]}
-    elif isinstance(data, list):
-        return [clean_data(item) for item in data if item not in [None, [], "", 0]]
-    else:
-        return data
-
-def save_json(data, prefix, message):
-    cleaned_data = clean_data(data)
-    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-    filename = f"{prefix}-{timestamp}.json"
-    with open(filename, 'w') as f:
-        json.dump(cleaned_data, f, indent=4)
+def get_command_option(name, default=None):
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+        print(f"Missing value for {name} flag.")
+        sys.exit(1)
+    return default
+
+def get_command_int_option(name, default):
+    return get_command_typed_option(name, default, int)
+
+def get_command_float_option(name, default):
+    return get_command_typed_option(name, default, float)
+
+def get_command_typed_option(name, default, value_type):
+    value = get_command_option(name, default)
+    if value is None:
+        return None
+    try:
+        return value_type(value)
+    except ValueError:
+        print(f"Invalid value for {name} flag: {value}")
+        sys.exit(1)
+
+def apply_command_flags(flags):
+    metrics.reset()
+    cache.configure(enabled=not flags['nocache'], refresh=flags['refresh'])
+    executor.configure(workers=flags['workers'], ordered=flags['ordered'])
+    dispatch.configure(run_budget=flags['budget'], daily_budget=flags['dailybudget'], rate=flags['rate'])
+    if flags['engine'] not in ["sync", "async"]:
+        print(f"Invalid value for -engine flag: {flags['engine']}")
+        sys.exit(1)
+    if flags['engine'] == "async" and not async_engine.is_available():
+        print("The async engine requires the httpx package: pip install httpx[http2]")
+        sys.exit(1)
+    async_engine.configure(enabled=flags['engine'] == "async", concurrency=flags['concurrency'])
+    if flags['library'] and flags['nocache']:
+        print("The -library flag requires the cache, it cannot be combined with the -nocache flag.")
+        sys.exit(1)
+    if flags['report'] not in reports.FORMATS:
+        print(f"Invalid value for -report flag: {flags['report']}")
+        sys.exit(1)
+    reports.configure(flags['report'])
+    journal.start(flags['resume'])
+
+def serialize_videos_at_hand(videos_at_hand):
+    return {
+        "videos_at_hand": [video.to_dict() for video in videos_at_hand["videos_at_hand"].values()],
+        "unavailable_videos": [video.to_dict() for video in videos_at_hand["unavailable_videos"].values()],
+        "unavailable_playlist_ids": videos_at_hand["unavailable_playlist_ids"]
+    }
+
+def deserialize_videos_at_hand(videos_at_hand_data):
+    return {
+        "videos_at_hand": VideoCollection(Video.from_dict(video_data) for video_data in videos_at_hand_data["videos_at_hand"]),
+        "unavailable_videos": VideoCollection(Video.from_dict(video_data) for video_data in videos_at_hand_data["unavailable_videos"]),
+        "unavailable_playlist_ids": videos_at_hand_data["unavailable_playlist_ids"]
+    }
+
+def save_report(data, prefix, message):
+    filename = reports.save_report(data, prefix)
+    saved_files.append(filename)
     print(f"{message} {filename}")
 
-def finish_preview_workflow(preview_contents, preview_only):
-    save_json(preview_contents, "preview", "Preview generated. Please review: ")
+def get_preview_mutations_total(preview_data):
+    if "destinations" in preview_data:
+        return sum(get_preview_mutations_total(destination["preview_data"]) for destination in preview_data["destinations"])
+    if "playlists_creations" in preview_data:
+        return sum(
+            (0 if "playlist_id" in creation else 1) + creation["playlist_preview_data"]["video_additions_total"]
+            for creation in preview_data["playlists_creations"]
+        )
+    return preview_data.get("video_additions_total", 0) + preview_data.get("video_removals_total", 0) + preview_data.get("video_moves_total", 0)
+
+def finish_result_workflow(result_contents, flags, workflow):
+    journal.finish()
+    with metrics.phase("save"):
+        if flags['profile']:
+            result_contents["profile"] = metrics.get_report()
+        save_report(result_contents, "result", "Operation completed. Result saved to: ")
+    if flags['prometheus'] is not None:
+        metrics.write_prometheus(flags['prometheus'], workflow)
+
+def finish_preview_workflow(preview_contents, preview_only, plan=None):
+    # Estimate the quota the execution pass will spend before asking to proceed
+    estimated_quota_cost = dispatch.estimate_quota_cost(mutations=get_preview_mutations_total(preview_contents["preview_data"]))
+    preview_contents["preview_data"]["estimated_quota_cost"] = estimated_quota_cost
+    print(f"Estimated quota cost of the operation: {estimated_quota_cost} units")
+    run_budget = dispatch.settings["run_budget"]
+    if run_budget is not None and estimated_quota_cost > run_budget:
+        print(f"Warning: the estimate exceeds the run budget of {run_budget} units, the operation will stop once the budget is spent.")
+
+    save_report(preview_contents, "preview", "Preview generated. Please review: ")
+    if plan is not None:
+        plan_path = plans.save_plan(plan)
+        saved_files.append(plan_path)
+        print(f"Execution plan saved to: {plan_path} (run it later with -execute-plan {plan_path})")
     if preview_only:
         print("Exiting due to -previewonly flag.")
         sys.exit(0)
@@ -41,90 +162,300 @@ def finish_preview_workflow(preview_contents, preview_only):
         print("Operation cancelled.")
         sys.exit(0)
 
-def get_videos_at_hand(youtube, urls, categories):
-    videos_at_hand = {}
-    unavailable_video_data = {}
+def split_input_urls(argument):
+    return re.sub(r'\s+', '', argument).split(',')
+
+def get_input_entries(argument):
+    # Entries of the comma separated URLs argument, or of the manifest named by an @<path> argument
+    if manifest.is_manifest_argument(argument):
+        return manifest.read_entries(argument[1:])
+    return parse_input_urls(split_input_urls(argument))
+
+def parse_input_urls(input_urls):
+    # Same (source, url_type, url_id, details) entries as the manifests, without details
+    return [(url, *urls.parse_url(url), None) for url in input_urls]
+
+def get_videos_at_hand(youtube, input_urls, categories):
+    return resolve_input_entries(youtube, parse_input_urls(input_urls), categories)
+
+def resolve_input_entries(youtube, entries, categories):
+    videos_at_hand = VideoCollection()
+    unavailable_video_data = VideoCollection()
     unavailable_playlist_ids = set()
 
-    # Get video details from video or playlist URLs
-    for url in urls:
-        if "playlist" in url:
-            try: 
-                playlist_id = re.search(r"list=([^&]+)", url).group(1)
-            except Exception as e:
+    # Parse and normalize every URL up front, videos already described by a manifest are not fetched
+    parsed_urls = []
+    input_url_ids = {}
+    described_videos = {}
+    for url, url_type, url_id, details in entries:
+        if url_type is None:
+            if "playlist" in url:
                 print(f"Invalid playlist URL provided: {url}")
                 unavailable_playlist_ids.add(url)
-                continue
+            else:
+                print(f"Invalid video URL provided: {url}")
+                unavailable_video_data.add(Video(url))
+            continue
+        if details is not None:
+            described_videos[url_id] = get_described_video(url_id, details, categories)
+        parsed_urls.append((url_type, url_id))
+        input_url_ids[url] = (url_type, url_id)
+    parsed_urls = list(dict.fromkeys(parsed_urls))
 
-            all_playlist_videos = operations.get_all_playlist_video_data(youtube, playlist_id, categories)
+    # Page all playlists concurrently
+    playlist_ids = [url_id for url_type, url_id in parsed_urls if url_type == "playlist"]
+    playlist_items = {}
+    for playlist_id, items in get_playlists_items(youtube, playlist_ids).items():
+        # If failed to retrieve playlist contents, skip it
+        if not items[0]:
+            unavailable_playlist_ids.add(playlist_id)
+            continue
+        playlist_items[playlist_id] = items[1]
 
-            # If failed to retrieve playlist contents, skip to the next URL
-            if not all_playlist_videos[0]:
-                unavailable_playlist_ids.add(playlist_id)
-                continue
+    # Fetch the details of every video from all playlists and single URLs in one deduplicated pass
+    video_ids = [item["contentDetails"]["videoId"] for items in playlist_items.values() for item in items]
+    video_ids.extend(url_id for url_type, url_id in parsed_urls if url_type == "video" and url_id not in described_videos)
+    video_details = operations.fetch_video_details_batch(youtube, video_ids) if len(video_ids) > 0 else {}
 
-            # If there are unavailable videos in the playlist, save their IDs for later
-            if len(all_playlist_videos[1]["unavailable_video_data"]) > 0:
-                for video in all_playlist_videos[1]["unavailable_video_data"]:
-                    unavailable_video_data[video["video_id"]] = {
-                        "video_id": video["video_id"],
-                        "playlist_item_id": video["playlist_item_id"]
-                    }
-
-            # Add available videos to the list of videos at hand
-            for video in all_playlist_videos[1]["all_playlist_videos"]:
-                videos_at_hand[video["video_id"]] = {
-                    "video_id": video["video_id"],
-                    "video_url": video["video_url"],
-                    "video_title": video["video_title"],
-                    "video_category": video["video_category"],
-                    "playlist_item_id": video["playlist_item_id"]
-                }
+    # Assemble the results in input order
+    for url_type, url_id in parsed_urls:
+        if url_type == "playlist":
+            for item in playlist_items.get(url_id, []):
+                video_id = item["contentDetails"]["videoId"]
+                video = operations.build_video(video_id, video_details, categories, item["id"])
+
+                # If the video is unavailable, save its ID for later
+                if not video:
+                    print(f"No details found for video {video_id}")
+                    unavailable_video_data.add(Video(video_id, playlist_item_id=item["id"]))
+                    continue
+
+                videos_at_hand.add(video)
         else:
-            try: 
-                video_id = re.search(r"v=([^&]+)", url).group(1)
-            except Exception as e:
-                print(f"Invalid video URL provided: {url}")
-                unavailable_video_data[url] = {
-                    "video_id": url,
-                    "playlist_item_id": None
-                }
-                continue
-            
-            # Get video details missing from the playlist response
-            video_details = operations.get_single_video_data(youtube, video_id)
-
-            # If videos is unavailable, save ID for later
-            if not video_details[0]:
-                unavailable_video_data[video_id] = {
-                    "video_id": video_id,
-                    "playlist_item_id": None
-                }
+            video = described_videos.get(url_id) or operations.build_video(url_id, video_details, categories)
+
+            # If the video is unavailable, save its ID for later
+            if not video:
+                unavailable_video_data.add(Video(url_id))
                 continue
 
-            # Add available videos to the list of videos at hand
-            videos_at_hand[video_id] = {
-                "video_id": video_id,
-                "video_url": url,
-                "video_title": video_details["title"],
-                "video_category": categories.get(video_details["categoryId"], "Unknown")
-            }
+            videos_at_hand.add(video)
 
     return {
         "videos_at_hand": videos_at_hand,
         "unavailable_videos": unavailable_video_data,
         "unavailable_playlist_ids": list(unavailable_playlist_ids),
+        # Video IDs of each valid input URL in order, duplicates included, for workflows combining the inputs
+        "url_video_ids": {
+            url: [item["contentDetails"]["videoId"] for item in playlist_items.get(url_id, [])] if url_type == "playlist" else [url_id]
+            for url, (url_type, url_id) in input_url_ids.items()
+        },
+        # Playlist item IDs of each valid playlist URL, in the same order
+        "url_playlist_item_ids": {
+            url: [item["id"] for item in playlist_items.get(url_id, [])]
+            for url, (url_type, url_id) in input_url_ids.items() if url_type == "playlist"
+        }
     }
 
+def get_described_video(video_id, details, categories):
+    # Manifests may give the category by name or by ID
+    title, category = details
+    return Video(video_id, title, categories.get(category, category))
+
+def get_playlists_items(youtube, playlist_ids):
+    # Returns (success, items) per playlist ID, paging the playlists concurrently
+    if len(playlist_ids) == 0:
+        return {}
+    if async_engine.is_enabled():
+        return operations.get_playlists_items(youtube, playlist_ids)
+    with ThreadPoolExecutor(max_workers=min(RESOLUTION_WORKERS, len(playlist_ids))) as pool:
+        return dict(zip(playlist_ids, pool.map(lambda playlist_id: operations.get_all_playlist_items(youtube, playlist_id), playlist_ids)))
+
+def get_destination_playlist_videos(destination_playlist_data, playlist_url):
+    # Videos of a destination playlist resolved by get_videos_at_hand, available or not
+    destination_playlist_videos = VideoCollection()
+    destination_playlist_videos.update(destination_playlist_data["videos_at_hand"])
+    destination_playlist_videos.update(destination_playlist_data["unavailable_videos"])
+    destination_playlist_videos.duplicate_items = len(destination_playlist_data["url_video_ids"].get(playlist_url, [])) - len(destination_playlist_videos)
+    return destination_playlist_videos
+
+def get_destinations_videos(youtube, playlist_urls):
+    # Videos of each destination playlist URL, paged concurrently, or None for the playlists that could not be read
+    # Operations only look up the destination's video and playlist item IDs, so no video details are fetched
+    playlist_ids = {playlist_url: urls.get_playlist_id(playlist_url) for playlist_url in playlist_urls}
+    playlists_items = get_playlists_items(youtube, list(dict.fromkeys(playlist_id for playlist_id in playlist_ids.values() if playlist_id is not None)))
+    destinations_videos = {}
+    for playlist_url, playlist_id in playlist_ids.items():
+        items = playlists_items.get(playlist_id, (False, None))
+        if not items[0]:
+            destinations_videos[playlist_url] = None
+            continue
+        destination_playlist_videos = VideoCollection(Video(item["contentDetails"]["videoId"], playlist_item_id=item["id"]) for item in items[1])
+        destination_playlist_videos.duplicate_items = len(items[1]) - len(destination_playlist_videos)
+        destinations_videos[playlist_url] = destination_playlist_videos
+    return destinations_videos
+
+def refresh_library(youtube):
+    # Lists the user's playlists and validates every one of them page by page
+    # The playlist ETag only covers its metadata and item count, so a reordered or swapped item would go unnoticed without paging
+    # Unchanged pages are answered with 304 from their stored snapshot, costing one call per page
+    my_playlists = operations.get_my_playlists(youtube)
+    if not my_playlists[0]:
+        print("Could not refresh the library index.")
+        return False
+    listed_playlists = {playlist["id"]: playlist for playlist in my_playlists[1]}
+
+    indexed_playlists = library.get_playlists() if cache.is_readable() else {}
+    library.delete_playlists([playlist_id for playlist_id in indexed_playlists if playlist_id not in listed_playlists])
+    changed_playlists_total = 0
+    for playlist_id, items in get_playlists_items(youtube, list(listed_playlists)).items():
+        # Playlists failing to page keep their previous entries and are validated again on the next refresh
+        if not items[0]:
+            continue
+        indexed_items = library.get_playlist_items(playlist_id) if playlist_id in indexed_playlists else None
+        if indexed_playlists.get(playlist_id, {}).get("etag") == listed_playlists[playlist_id]["etag"] and indexed_items == [(item["contentDetails"]["videoId"], item["id"]) for item in items[1]]:
+            continue
+        library.put_playlist(playlist_id, listed_playlists[playlist_id]["snippet"]["title"], listed_playlists[playlist_id]["etag"], items[1])
+        changed_playlists_total += 1
+    print(f"Library index refreshed: {len(listed_playlists)} playlists, {changed_playlists_total} of them changed")
+    return True
+
+def get_library_playlist_videos(playlist_id):
+    # Videos of an indexed playlist, carrying only their IDs and playlist item IDs
+    items = (library.get_playlist_items(playlist_id) if playlist_id is not None else None) or []
+    videos = VideoCollection(Video(video_id, playlist_item_id=playlist_item_id) for video_id, playlist_item_id in items)
+    videos.duplicate_items = len(items) - len(videos)
+    return videos
+
+def iter_videos_at_hand(youtube, entries, categories):
+    # Streaming counterpart of resolve_input_entries yielding the same shape in chunks of at most 50 videos
+    seen_video_ids = set()
+    single_video_ids = {}
+    described_chunk = None
+
+    def new_chunk():
+        return {
+            "videos_at_hand": VideoCollection(),
+            "unavailable_videos": VideoCollection(),
+            "unavailable_playlist_ids": []
+        }
+
+    def unseen(videos):
+        unseen_videos = VideoCollection()
+        for video in videos:
+            if video.video_id not in seen_video_ids:
+                seen_video_ids.add(video.video_id)
+                unseen_videos.add(video)
+        return unseen_videos
+
+    def fetch_single_videos(video_ids):
+        chunk_video_ids = [video_id for video_id in video_ids if video_id not in seen_video_ids]
+        video_details = operations.fetch_video_details_batch(youtube, chunk_video_ids) if len(chunk_video_ids) > 0 else {}
+        chunk = new_chunk()
+        for video_id in chunk_video_ids:
+            seen_video_ids.add(video_id)
+            video = operations.build_video(video_id, video_details, categories)
+            if video:
+                chunk["videos_at_hand"].add(video)
+            else:
+                chunk["unavailable_videos"].add(Video(video_id))
+        return chunk
+
+    for url, url_type, url_id, details in entries:
+        chunk = new_chunk()
+        if url_type is None:
+            if "playlist" in url:
+                print(f"Invalid playlist URL provided: {url}")
+                chunk["unavailable_playlist_ids"].append(url)
+            else:
+                print(f"Invalid video URL provided: {url}")
+                chunk["unavailable_videos"].add(Video(url))
+            yield chunk
+        elif url_type == "video" and details is not None:
+            # Videos described by the manifest are passed on 50 at a time without any call
+            if url_id in seen_video_ids:
+                continue
+            seen_video_ids.add(url_id)
+            described_chunk = described_chunk or new_chunk()
+            described_chunk["videos_at_hand"].add(get_described_video(url_id, details, categories))
+            if len(described_chunk["videos_at_hand"]) >= operations.VIDEOS_LIST_MAX_IDS:
+                yield described_chunk
+                described_chunk = None
+        elif url_type == "video":
+            # Single video URLs are pooled into 50 ID chunks, so long manifests are fetched as they are read
+            single_video_ids[url_id] = None
+            if len(single_video_ids) >= operations.VIDEOS_LIST_MAX_IDS:
+                yield fetch_single_videos(single_video_ids)
+                single_video_ids = {}
+        else:
+            try:
+                for available_videos, unavailable_videos in operations.iter_playlist_video_chunks(youtube, url_id, categories):
+                    chunk = new_chunk()
+                    chunk["videos_at_hand"] = unseen(available_videos)
+                    chunk["unavailable_videos"] = unseen(unavailable_videos)
+                    yield chunk
+            except Exception as e:
+                print(f"Error retrieving playlist {url_id} contents:\n{e}\n")
+                chunk = new_chunk()
+                chunk["unavailable_playlist_ids"].append(url_id)
+                yield chunk
+
+    if described_chunk is not None:
+        yield described_chunk
+    if len(single_video_ids) > 0:
+        yield fetch_single_videos(single_video_ids)
+
+def iter_in_background(iterator, max_buffered):
+    # Runs the iterator on a producer thread so the consumer overlaps with it, buffering at most max_buffered items
+    buffer = queue.Queue(maxsize=max_buffered)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterator:
+                buffer.put((True, item))
+        except BaseException as e:
+            buffer.put((False, e))
+        buffer.put((True, done))
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        success, item = buffer.get()
+        if not success:
+            raise item
+        if item is done:
+            return
+        yield item
+
+def merge_operation_results(total, chunk):
+    # Combines the result dicts of operations run on consecutive chunks
+    if total is None:
+        return chunk
+    for key, value in chunk.items():
+        if key == "no_actions":
+            total[key] = total[key] and value
+        elif isinstance(value, list):
+            total[key].extend(value)
+        else:
+            total[key] += value
+    return total
+
 def categorize_videos(videos_at_hand):
-    categories = {}
-    for video_id in videos_at_hand:
-        video = videos_at_hand[video_id]
-        category = video["video_category"]
-        if category not in categories:
-            categories[category] = {}
-        categories[category][video_id] = video
-    return categories
+    return videos_at_hand.group_by_category()
+
+def get_category_preview_data(videos, destination_playlist_videos):
+    # Same shape as the addition preview of the category, built without going through the operation
+    video_additions = [video for video_id, video in videos.items() if video_id not in destination_playlist_videos]
+    already_in_playlist = [video for video_id, video in videos.items() if video_id in destination_playlist_videos]
+    return {
+        "no_actions": len(video_additions) == 0,
+        "video_additions": video_additions,
+        "already_in_playlist": already_in_playlist,
+        "failed": [],
+        "video_additions_total": len(video_additions),
+        "already_in_playlist_total": len(already_in_playlist),
+        "failed_total": 0
+    }
 
 def get_playlist_name(category, default_playlist_name, use_auto_names):
     auto_name = get_default_playlist_name(default_playlist_name, category)
@@ -1,52 +1,296 @@
-import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from cache import library
+from journal import journal
+from manifest import manifest
+from metrics import metrics
+from models.models import Video, VideoCollection
+from operations import executor
 from operations import operations
+from operations import urls
+from planner import planner
+from planner import plans
+from reports import reports
 from workflows import common
 
+# Category playlists created or filled at the same time, their calls still share the run's quota budget and rate limit
+CATEGORY_WORKERS = 8
+
+# Counterparts of the bulk operations applying the same videos to several destination playlists
+FAN_OUT_FUNCTIONS = {
+    operations.add_videos_to_playlist: operations.add_videos_to_playlists,
+    operations.remove_videos_from_playlist: operations.remove_videos_from_playlists
+}
+
 def bulk_videos_playlist_workflow(youtube, videos_at_hand_label, playlist_function):
-    urls = re.sub(r'\s+', '', sys.argv[1]).split(',')
-    playlist_url = sys.argv[2]
     flags = common.get_command_flags()
+    if flags['executeplan'] is not None:
+        common.apply_command_flags(flags)
+        execute_plan_workflow(youtube, flags, videos_at_hand_label)
+        return
+    inputs = common.get_input_entries(sys.argv[1])
+    playlist_url = sys.argv[2]
+    common.apply_command_flags(flags)
 
-    categories = operations.get_video_categories(youtube)
-
-    destination_playlist_data = common.get_videos_at_hand(youtube, [playlist_url], categories)
-    if len(destination_playlist_data["unavailable_playlist_ids"]) > 0:
-        print("Please provide a valid playlist URL to modify.")
+    if flags['stream'] and (not flags['force'] or flags['previewonly']):
+        print("The -stream flag requires the -force flag, previews need the full input.")
         sys.exit(1)
-    destination_playlist_videos = {}
-    destination_playlist_videos.update(destination_playlist_data["videos_at_hand"])
-    destination_playlist_videos.update(destination_playlist_data["unavailable_videos"])
 
-    videos_at_hand = common.get_videos_at_hand(youtube, urls, categories)
+    # Several comma separated destination playlists share one resolution of the input
+    playlist_urls = list(dict.fromkeys(common.split_input_urls(playlist_url)))
+    if len(playlist_urls) > 1:
+        if flags['stream']:
+            print("The -stream flag cannot be combined with several destination playlists.")
+            sys.exit(1)
+        fan_out_videos_playlists_workflow(youtube, inputs, playlist_urls, flags, videos_at_hand_label, FAN_OUT_FUNCTIONS[playlist_function])
+        return
+
+    with metrics.phase("categories"):
+        categories = operations.get_video_categories(youtube)
+
+    if flags['library']:
+        with metrics.phase("library"):
+            common.refresh_library(youtube)
+
+    # Previews write an execution plan holding a digest of the destination's items
+    writes_plan = not flags['force'] or flags['previewonly']
+    with metrics.phase("destination"):
+        destination_playlist_data = common.get_videos_at_hand(youtube, [playlist_url], categories)
+        if len(destination_playlist_data["unavailable_playlist_ids"]) > 0:
+            print("Please provide a valid playlist URL to modify.")
+            sys.exit(1)
+        destination_playlist_videos = common.get_destination_playlist_videos(destination_playlist_data, playlist_url)
+
+    if flags['stream']:
+        with metrics.phase("streaming"):
+            result_contents = stream_bulk_videos_playlist(youtube, inputs, categories, playlist_url, destination_playlist_videos, videos_at_hand_label, playlist_function)
+        common.finish_result_workflow(result_contents, flags, videos_at_hand_label)
+        return
+
+    with metrics.phase("resolution"):
+        # Reuse the input resolution of a resumed run
+        videos_at_hand = journal.get_input("bulk_videos_playlist", playlist_url=playlist_url, label=videos_at_hand_label)
+        if videos_at_hand is not None:
+            videos_at_hand = common.deserialize_videos_at_hand(videos_at_hand)
+        else:
+            videos_at_hand = common.resolve_input_entries(youtube, inputs, categories)
+            journal.record_input("bulk_videos_playlist", common.serialize_videos_at_hand(videos_at_hand), playlist_url=playlist_url, label=videos_at_hand_label)
     input_data = {
         "playlist_url": playlist_url,
         videos_at_hand_label: list(videos_at_hand["videos_at_hand"].values()),
         "unavailable_videos": list(videos_at_hand["unavailable_videos"].values()),
         "unavailable_playlist_ids": videos_at_hand["unavailable_playlist_ids"],
-        videos_at_hand_label + "_total": len(list(videos_at_hand["videos_at_hand"].values())),
-        "unavailable_videos_total": len(list(videos_at_hand["unavailable_videos"].values())),
+        videos_at_hand_label + "_total": len(videos_at_hand["videos_at_hand"]),
+        "unavailable_videos_total": len(videos_at_hand["unavailable_videos"]),
         "unavailable_playlist_ids_total": len(videos_at_hand["unavailable_playlist_ids"]),
     }
 
-    if not flags['force'] or flags['previewonly']:
-        preview_data = playlist_function(youtube, videos_at_hand["videos_at_hand"], playlist_url, destination_playlist_videos, is_preview=True)
-        preview_contents = {
-            "input_data": input_data,
-            "preview_data": preview_data
-        }
-        common.finish_preview_workflow(preview_contents, flags['previewonly'])
+    if writes_plan:
+        with metrics.phase("preview"):
+            preview_data = playlist_function(youtube, videos_at_hand["videos_at_hand"], playlist_url, destination_playlist_videos, is_preview=True)
+            preview_contents = {
+                "input_data": input_data,
+                "preview_data": preview_data
+            }
+            plan = get_bulk_plan(videos_at_hand_label, input_data, [(playlist_url, destination_playlist_videos)], [preview_data])
+        common.finish_preview_workflow(preview_contents, flags['previewonly'], plan)
 
-    result_data = playlist_function(youtube, videos_at_hand["videos_at_hand"], playlist_url, destination_playlist_videos, is_preview=False)
+        # The confirmed plan runs as previewed, without checking every video against the playlist again
+        with metrics.phase("execution"):
+            result_data = execute_bulk_plan(youtube, plan, [("result_data",)], [preview_data])[0]
+    else:
+        with metrics.phase("execution"), reports.section("result_data"):
+            result_data = playlist_function(youtube, videos_at_hand["videos_at_hand"], playlist_url, destination_playlist_videos, is_preview=False)
     result_contents = {
         "input_data": input_data,
         "result_data": result_data
     }
-    common.save_json(result_contents, "result", "Operation completed. Result saved to: ")
+    common.finish_result_workflow(result_contents, flags, videos_at_hand_label)
+
+def fan_out_videos_playlists_workflow(youtube, inputs, playlist_urls, flags, videos_at_hand_label, playlists_function):
+    # Resolves the input once, reads every destination at once, and runs the mutations of all destinations through one executor call
+    with metrics.phase("categories"):
+        categories = operations.get_video_categories(youtube)
+
+    if flags['library']:
+        with metrics.phase("library"):
+            common.refresh_library(youtube)
+
+    writes_plan = not flags['force'] or flags['previewonly']
+    with metrics.phase("destination"):
+        destinations_videos = common.get_destinations_videos(youtube, playlist_urls)
+        invalid_playlist_urls = [playlist_url for playlist_url, videos in destinations_videos.items() if videos is None]
+        if len(invalid_playlist_urls) > 0:
+            print(f"Please provide valid playlist URLs to modify: {', '.join(invalid_playlist_urls)}")
+            sys.exit(1)
+        destinations = list(destinations_videos.items())
+
+    with metrics.phase("resolution"):
+        # Reuse the input resolution of a resumed run
+        videos_at_hand = journal.get_input("bulk_videos_playlist", playlist_url=",".join(playlist_urls), label=videos_at_hand_label)
+        if videos_at_hand is not None:
+            videos_at_hand = common.deserialize_videos_at_hand(videos_at_hand)
+        else:
+            videos_at_hand = common.resolve_input_entries(youtube, inputs, categories)
+            journal.record_input("bulk_videos_playlist", common.serialize_videos_at_hand(videos_at_hand), playlist_url=",".join(playlist_urls), label=videos_at_hand_label)
+    input_data = {
+        "playlist_urls": playlist_urls,
+        videos_at_hand_label: list(videos_at_hand["videos_at_hand"].values()),
+        "unavailable_videos": list(videos_at_hand["unavailable_videos"].values()),
+        "unavailable_playlist_ids": videos_at_hand["unavailable_playlist_ids"],
+        "playlist_urls_total": len(playlist_urls),
+        videos_at_hand_label + "_total": len(videos_at_hand["videos_at_hand"]),
+        "unavailable_videos_total": len(videos_at_hand["unavailable_videos"]),
+        "unavailable_playlist_ids_total": len(videos_at_hand["unavailable_playlist_ids"]),
+    }
+
+    report_sections = get_destinations_report_sections(len(destinations))
+    if writes_plan:
+        with metrics.phase("preview"):
+            destinations_preview_data = playlists_function(youtube, videos_at_hand["videos_at_hand"], destinations, is_preview=True)
+            preview_contents = {
+                "input_data": input_data,
+                "preview_data": {
+                    "no_actions": all(preview_data["no_actions"] for preview_data in destinations_preview_data),
+                    "destinations": [
+                        {"playlist_url": playlist_url, "preview_data": preview_data}
+                        for playlist_url, preview_data in zip(playlist_urls, destinations_preview_data)
+                    ]
+                }
+            }
+            plan = get_bulk_plan(videos_at_hand_label, input_data, destinations, destinations_preview_data)
+        common.finish_preview_workflow(preview_contents, flags['previewonly'], plan)
+
+        with metrics.phase("execution"):
+            destinations_result_data = execute_bulk_plan(youtube, plan, report_sections, destinations_preview_data)
+    else:
+        with metrics.phase("execution"):
+            destinations_result_data = playlists_function(youtube, videos_at_hand["videos_at_hand"], destinations, is_preview=False, report_sections=report_sections)
+    result_contents = {
+        "input_data": input_data,
+        "result_data": get_destinations_result_data(playlist_urls, destinations_result_data)
+    }
+    common.finish_result_workflow(result_contents, flags, videos_at_hand_label)
+
+def get_destinations_report_sections(destinations_total):
+    return [("result_data", "destinations", index, "result_data") for index in range(destinations_total)]
+
+def get_destinations_result_data(playlist_urls, destinations_result_data):
+    return {
+        "no_actions": all(result_data["no_actions"] for result_data in destinations_result_data),
+        "destinations": [
+            {"playlist_url": playlist_url, "result_data": result_data}
+            for playlist_url, result_data in zip(playlist_urls, destinations_result_data)
+        ],
+        "failed_total": sum(result_data["failed_total"] for result_data in destinations_result_data)
+    }
+
+def get_bulk_plan(videos_at_hand_label, input_data, destinations, destinations_preview_data):
+    # Item-level operations of a bulk preview, holding all the execution needs to run them without reading the destinations
+    plan_destinations = []
+    for (playlist_url, destination_playlist_videos), preview_data in zip(destinations, destinations_preview_data):
+        if videos_at_hand_label == "videos_to_add":
+            # Positions are planned when the preview runs with -ordered
+            plan_operations = []
+            for index, video in enumerate(preview_data["video_additions"]):
+                plan_operation = {"video": video.to_dict()}
+                if executor.settings["ordered"]:
+                    plan_operation["position"] = destination_playlist_videos.get_items_total() + index
+                plan_operations.append(plan_operation)
+        else:
+            plan_operations = [
+                {"video": video.to_dict(), "playlist_item_id": destination_playlist_videos[video.video_id].playlist_item_id}
+                for video in preview_data["video_removals"]
+            ]
+        plan_destinations.append({
+            "playlist_url": playlist_url,
+            "items_digest": plans.get_items_digest(destination_playlist_videos),
+            "items_total": destination_playlist_videos.get_items_total(),
+            "operations": plan_operations
+        })
+    return {
+        "workflow": "bulk_videos_playlist",
+        "label": videos_at_hand_label,
+        "input_data": {k: v for k, v in input_data.items() if k.startswith("playlist_url") or k.endswith("_total")},
+        "destinations": plan_destinations
+    }
+
+def execute_bulk_plan(youtube, plan, report_sections, destinations_preview_data=None):
+    # Runs the operations of the plan and returns the result data of each destination
+    # Operations a resumed journal already completed are dropped, and the skipped videos are listed when the preview ran in this process
+    is_addition = plan["label"] == "videos_to_add"
+    playlist_ids = [urls.get_playlist_id(destination["playlist_url"]) for destination in plan["destinations"]]
+    plan_operations = [
+        [
+            plan_operation for plan_operation in destination["operations"]
+            if not journal.is_completed("insert" if is_addition else "delete", playlist_ids[index], plan_operation["video"]["video_id"])
+        ]
+        for index, destination in enumerate(plan["destinations"])
+    ]
+    videos = [[Video.from_dict(plan_operation["video"]) for plan_operation in destination_operations] for destination_operations in plan_operations]
+    if destinations_preview_data is not None:
+        skipped_videos = [preview_data["already_in_playlist" if is_addition else "not_in_playlist"] for preview_data in destinations_preview_data]
+    else:
+        skipped_videos = [[] for destination in plan["destinations"]]
+
+    if is_addition:
+        positions = [
+            {plan_operation["video"]["video_id"]: plan_operation["position"] for plan_operation in destination_operations}
+            if any("position" in plan_operation for plan_operation in destination_operations) else None
+            for destination_operations in plan_operations
+        ]
+        start_positions = [destination["items_total"] for destination in plan["destinations"]]
+        video_additions, failed = operations.insert_videos(youtube, playlist_ids, videos, start_positions, positions, report_sections=report_sections)
+        return [operations.get_additions_result_data(video_additions[index], skipped_videos[index], failed[index]) for index in range(len(playlist_ids))]
+
+    playlist_item_ids = [[plan_operation["playlist_item_id"] for plan_operation in destination_operations] for destination_operations in plan_operations]
+    video_removals, failed = operations.delete_videos(youtube, playlist_ids, videos, playlist_item_ids, report_sections=report_sections)
+    return [operations.get_removals_result_data(video_removals[index], skipped_videos[index], failed[index]) for index in range(len(playlist_ids))]
+
+def execute_plan_workflow(youtube, flags, videos_at_hand_label):
+    # Applies a plan written by an earlier preview, without resolving the input or reading the destinations again
+    plan_path = flags['executeplan']
+    plan = plans.load_plan(plan_path)
+    if plan["workflow"] != "bulk_videos_playlist" or plan["label"] != videos_at_hand_label:
+        print(f"Plan {plan_path} belongs to a different operation.")
+        sys.exit(1)
+    playlist_urls = [destination["playlist_url"] for destination in plan["destinations"]]
+
+    if flags['library']:
+        with metrics.phase("library"):
+            common.refresh_library(youtube)
+
+    # The destinations are listed again, each page validated against its cached copy, and their items compared with the preview's
+    # A resumed execution changed the destinations itself, the journal tells which operations already ran instead
+    if flags['resume'] is None:
+        with metrics.phase("staleness"):
+            destinations_videos = common.get_destinations_videos(youtube, playlist_urls)
+            stale_playlist_urls = [
+                destination["playlist_url"] for destination in plan["destinations"]
+                if destinations_videos[destination["playlist_url"]] is None
+                or plans.get_items_digest(destinations_videos[destination["playlist_url"]]) != destination["items_digest"]
+            ]
+            if len(stale_playlist_urls) > 0:
+                print(f"Playlists changed since the plan was written, generate a new preview: {', '.join(stale_playlist_urls)}")
+                sys.exit(1)
+
+    # Plans of single destination runs give the same result as those runs
+    is_fan_out = "playlist_urls" in plan["input_data"]
+    with metrics.phase("execution"):
+        report_sections = get_destinations_report_sections(len(playlist_urls)) if is_fan_out else [("result_data",)]
+        destinations_result_data = execute_bulk_plan(youtube, plan, report_sections)
+    result_contents = {
+        "input_data": dict(plan["input_data"], plan=plan_path),
+        "result_data": get_destinations_result_data(playlist_urls, destinations_result_data) if is_fan_out else destinations_result_data[0]
+    }
+    common.finish_result_workflow(result_contents, flags, videos_at_hand_label)
 
 def divide_into_categories_workflow(youtube):
-    urls = re.sub(r'\s+', '', sys.argv[1]).split(',')
+    inputs = common.get_input_entries(sys.argv[1])
+    urls = [] if manifest.is_manifest_argument(sys.argv[1]) else common.split_input_urls(sys.argv[1])
     flags = common.get_command_flags()
+    common.apply_command_flags(flags)
 
     default_playlist_name = None
     if len(urls) == 1 and "playlist" in urls[0]:
@@ -54,34 +298,166 @@ def divide_into_categories_workflow(youtube):
         if playlist_data != None:
             default_playlist_name = playlist_data["title"]        
 
-    categories = operations.get_video_categories(youtube)
+    if flags['stream'] and (not flags['force'] or flags['previewonly']):
+        print("The -stream flag requires the -force flag, previews need the full input.")
+        sys.exit(1)
+
+    with metrics.phase("categories"):
+        categories = operations.get_video_categories(youtube)
+
+    # Category playlists already in the library index are filled instead of created again
+    use_library = flags['library']
+    if use_library:
+        with metrics.phase("library"):
+            use_library = common.refresh_library(youtube)
 
-    videos_at_hand = common.get_videos_at_hand(youtube, urls, categories)
+    if flags['stream']:
+        with metrics.phase("streaming"):
+            result_contents = stream_divide_into_categories(youtube, inputs, categories, default_playlist_name, flags['name'], use_library)
+        common.finish_result_workflow(result_contents, flags, "videos_to_categorize")
+        return
+
+    with metrics.phase("resolution"):
+        # Reuse the input resolution of a resumed run
+        videos_at_hand = journal.get_input("divide_into_categories")
+        if videos_at_hand is not None:
+            videos_at_hand = common.deserialize_videos_at_hand(videos_at_hand)
+        else:
+            videos_at_hand = common.resolve_input_entries(youtube, inputs, categories)
+            journal.record_input("divide_into_categories", common.serialize_videos_at_hand(videos_at_hand))
     input_data = {
         "videos_to_categorize": list(videos_at_hand["videos_at_hand"].values()),
         "unavailable_videos": list(videos_at_hand["unavailable_videos"].values()),
         "unavailable_playlist_ids": videos_at_hand["unavailable_playlist_ids"],
-        "videos_to_categorize_total": len(list(videos_at_hand["videos_at_hand"].values())),
-        "unavailable_videos_total": len(list(videos_at_hand["unavailable_videos"].values())),
+        "videos_to_categorize_total": len(videos_at_hand["videos_at_hand"]),
+        "unavailable_videos_total": len(videos_at_hand["unavailable_videos"]),
         "unavailable_playlist_ids_total": len(videos_at_hand["unavailable_playlist_ids"])
     }
 
     categories_data = common.categorize_videos(videos_at_hand["videos_at_hand"])
     playlist_names = {}
     if not flags['force'] or flags['previewonly']:
-        playlists_creations_preview = []
+        with metrics.phase("preview"):
+            playlists_creations_preview = []
+            for category, videos in categories_data.items():
+                playlist_name = common.get_playlist_name(category, default_playlist_name, flags['name'])
+                playlist_names[category] = playlist_name
+                playlist_id = library.find_playlist_id(playlist_name) if use_library else None
+                playlist_preview_data = common.get_category_preview_data(videos, common.get_library_playlist_videos(playlist_id))
+                playlists_creations_preview.append({
+                    "playlist_name": playlist_name,
+                    "playlist_id": playlist_id,
+                    "playlist_preview_data": playlist_preview_data
+                })
+            preview_data = {
+                "no_actions": len(playlists_creations_preview) == 0,
+                "playlists_creations": playlists_creations_preview,
+                "playlists_creations_total": len(playlists_creations_preview)
+            }
+            preview_contents = {
+                "input_data": input_data,
+                "preview_data": preview_data
+            }
+        common.finish_preview_workflow(preview_contents, flags['previewonly'])
+
+    with metrics.phase("execution"):
+        playlists, playlists_result_data = fill_category_playlists(youtube, categories_data, playlist_names, default_playlist_name, flags['name'], use_library)
+        playlists_creations = []
+        failed = []
         for category, videos in categories_data.items():
-            playlist_name = common.get_playlist_name(category, default_playlist_name, flags['name'])
-            playlist_names[category] = playlist_name
-            playlist_preview_data = operations.add_videos_to_playlist(youtube, videos, playlist_url=None, destination_playlist_videos=[], is_preview=True)
-            playlists_creations_preview.append({
-                "playlist_name": playlist_name,
-                "playlist_preview_data": playlist_preview_data
+            playlist = playlists[category]
+            if not playlist[0]:
+                failed.append({
+                    "playlist_name": playlist[1]["playlist_name"],
+                    "videos_not_categorized": videos
+                })
+                continue
+            playlists_creations.append({
+                "playlist_name": playlist[1]["playlist_name"],
+                "playlist_id": playlist[1]["playlist_id"],
+                "playlist_url": playlist[1]["playlist_url"],
+                "playlist_result_data": playlists_result_data[category]
             })
+    result_data = {
+        "no_actions": len(playlists_creations) == 0,
+        "playlists_creations": playlists_creations,
+        "failed": failed,
+        "playlists_creations_total": len(playlists_creations),
+        "failed_total": len(failed),
+    }
+    result_contents = {
+        "input_data": input_data,
+        "result_data": result_data
+    }
+    common.finish_result_workflow(result_contents, flags, "videos_to_categorize")
+
+def sync_playlist_workflow(youtube):
+    expression = sys.argv[1]
+    playlist_url = sys.argv[2]
+    flags = common.get_command_flags()
+    common.apply_command_flags(flags)
+
+    tree = planner.parse_expression(expression)
+    if tree is None:
+        sys.exit(1)
+    operand_urls = list(dict.fromkeys(planner.get_expression_urls(tree)))
+
+    with metrics.phase("categories"):
+        categories = operations.get_video_categories(youtube)
+
+    if flags['library']:
+        with metrics.phase("library"):
+            common.refresh_library(youtube)
+
+    with metrics.phase("destination"):
+        destination_playlist_data = common.get_videos_at_hand(youtube, [playlist_url], categories)
+        if len(destination_playlist_data["unavailable_playlist_ids"]) > 0 or playlist_url not in destination_playlist_data["url_video_ids"]:
+            print("Please provide a valid playlist URL to modify.")
+            sys.exit(1)
+        destination_playlist_videos = common.get_destination_playlist_videos(destination_playlist_data, playlist_url)
+        destination_video_ids = destination_playlist_data["url_video_ids"][playlist_url]
+        destination_playlist_item_ids = destination_playlist_data["url_playlist_item_ids"][playlist_url]
+
+    with metrics.phase("resolution"):
+        videos_at_hand = common.get_videos_at_hand(youtube, operand_urls, categories)
+
+    # A missing operand would turn into mass removals, so the sync only runs on fully resolved input
+    unresolved_urls = [url for url in operand_urls if url not in videos_at_hand["url_video_ids"]]
+    if len(unresolved_urls) > 0 or len(videos_at_hand["unavailable_playlist_ids"]) > 0:
+        print("Could not resolve every URL of the expression, nothing will be synced.")
+        sys.exit(1)
+
+    with metrics.phase("planning"):
+        target_video_ids = planner.evaluate_expression(tree, videos_at_hand["url_video_ids"])
+        plan = planner.plan_sync(target_video_ids, destination_video_ids, videos_at_hand["videos_at_hand"], flags['reorder'])
+        # Removals are destination positions, duplicate items of the same video are each removed
+        video_removals = [
+            get_item_video(destination_playlist_videos[destination_video_ids[position]], destination_playlist_item_ids[position])
+            for position in plan["removals"]
+        ]
+        video_moves = [(destination_playlist_videos[video_id], position) for video_id, position in plan["moves"]]
+        video_additions = VideoCollection(videos_at_hand["videos_at_hand"][video_id] for video_id, position in plan["additions"])
+        positions = {video_id: position for video_id, position in plan["additions"]} if flags['reorder'] else None
+
+    input_data = {
+        "expression": expression,
+        "playlist_url": playlist_url,
+        "target_videos_total": len(target_video_ids),
+        "destination_items_total": len(destination_video_ids),
+        "destination_duplicate_items_total": plan["duplicate_items"],
+        "unavailable_target_video_ids": plan["unavailable"],
+        "unavailable_target_video_ids_total": len(plan["unavailable"])
+    }
+
+    if not flags['force'] or flags['previewonly']:
         preview_data = {
-            "no_actions": len(playlists_creations_preview) == 0,
-            "playlists_creations": playlists_creations_preview,
-            "playlists_creations_total": len(playlists_creations_preview)
+            "no_actions": len(video_removals) == 0 and len(video_moves) == 0 and len(video_additions) == 0,
+            "video_removals": video_removals,
+            "video_moves": [{"video": video, "position": position} for video, position in video_moves],
+            "video_additions": [{"video": video, "position": positions[video.video_id]} for video in video_additions.values()] if positions is not None else list(video_additions.values()),
+            "video_removals_total": len(video_removals),
+            "video_moves_total": len(video_moves),
+            "video_additions_total": len(video_additions)
         }
         preview_contents = {
             "input_data": input_data,
@@ -89,37 +465,291 @@ def divide_into_categories_workflow(youtube):
         }
         common.finish_preview_workflow(preview_contents, flags['previewonly'])
 
-    playlists_creations = []
-    failed = []
-    for category, videos in categories_data.items():
-        if category in playlist_names:
-            playlist_name = playlist_names[category]
-        else:
-            playlist_name = common.get_playlist_name(category, default_playlist_name, flags['name'])
-        playlist = operations.create_playlist(youtube, playlist_name)
-        if not playlist [0]:
-            failed.append({
-                "playlist_name": playlist_name,
-                "videos_not_categorized": videos
-            })
-            continue
+    with metrics.phase("execution"):
+        with reports.section("result_data", "removal_data"):
+            removed, failed = operations.delete_videos(youtube, [urls.get_playlist_id(playlist_url)], [video_removals], [[video.playlist_item_id for video in video_removals]])
+            removal_data = operations.get_removals_result_data(removed[0], [], failed[0])
+
+        # Planned positions assume every earlier step succeeded, otherwise new videos are appended instead
+        if flags['reorder'] and removal_data["failed_total"] > 0:
+            print("Some removals failed, skipping the reordering. Run the sync again to reorder the playlist.")
+            video_moves = []
+            positions = None
+        with reports.section("result_data", "move_data"):
+            move_data = operations.move_videos_in_playlist(youtube, video_moves, playlist_url, is_preview=False)
+        if move_data["failed_total"] > 0:
+            print("Some moves failed, appending new videos instead. Run the sync again to reorder the playlist.")
+            positions = None
+        if positions is None and flags['ordered']:
+            start_position = len(destination_video_ids) - removal_data["video_removals_total"]
+            positions = {video_id: start_position + index for index, video_id in enumerate(video_additions)}
+        with reports.section("result_data", "addition_data"):
+            addition_data = operations.add_videos_to_playlist(youtube, video_additions, playlist_url, destination_playlist_videos, is_preview=False, positions=positions)
+
+    result_data = {
+        "no_actions": removal_data["no_actions"] and move_data["no_actions"] and addition_data["no_actions"],
+        "removal_data": removal_data,
+        "move_data": move_data,
+        "addition_data": addition_data
+    }
+    result_contents = {
+        "input_data": input_data,
+        "result_data": result_data
+    }
+    common.finish_result_workflow(result_contents, flags, "sync")
+
+def get_item_video(video, playlist_item_id):
+    # The video of one of several items holding it
+    return Video(video.video_id, video.video_title, video.video_category, playlist_item_id)
+
+def query_library_workflow(youtube):
+    # Looks the input videos up in the library index, which only pages the playlists changed since the last query
+    input_urls = common.split_input_urls(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].startswith('-') else []
+    flags = common.get_command_flags()
+    flags['library'] = True
+    common.apply_command_flags(flags)
+
+    with metrics.phase("library"):
+        if not common.refresh_library(youtube):
+            sys.exit(1)
+        library_playlists = library.get_playlists()
+
+    with metrics.phase("categories"):
+        categories = operations.get_video_categories(youtube)
+
+    with metrics.phase("resolution"):
+        videos_at_hand = common.get_videos_at_hand(youtube, input_urls, categories)
+
+    with metrics.phase("query"):
+        # Unavailable videos are looked up too, playlists keep the items of deleted and private videos
+        videos = list(videos_at_hand["videos_at_hand"].values()) + list(videos_at_hand["unavailable_videos"].values())
+        memberships = library.get_video_memberships([video.video_id for video in videos])
+        video_memberships = [
+            {
+                "video": video,
+                "playlists": [
+                    get_library_playlist_entry(playlist_id, library_playlists, playlist_item_ids)
+                    for playlist_id, playlist_item_ids in memberships[video.video_id].items()
+                ]
+            }
+            for video in videos if video.video_id in memberships
+        ]
+        videos_not_in_library = [video for video in videos if video.video_id not in memberships]
+        duplicate_items = [
+            {
+                "video_id": video_id,
+                **get_library_playlist_entry(playlist_id, library_playlists, playlist_item_ids)
+            }
+            for playlist_id, playlist_duplicates in (library.get_duplicate_items() if flags['duplicates'] else {}).items()
+            for video_id, playlist_item_ids in playlist_duplicates.items()
+        ]
+
+    input_data = {
+        "urls": input_urls,
+        "unavailable_playlist_ids": videos_at_hand["unavailable_playlist_ids"],
+        "videos_to_query_total": len(videos),
+        "unavailable_playlist_ids_total": len(videos_at_hand["unavailable_playlist_ids"])
+    }
+    result_data = {
+        "library_playlists_total": len(library_playlists),
+        "video_memberships": video_memberships,
+        "videos_not_in_library": videos_not_in_library,
+        "duplicate_items": duplicate_items,
+        "video_memberships_total": len(video_memberships),
+        "videos_in_several_playlists_total": sum(1 for membership in video_memberships if len(membership["playlists"]) > 1),
+        "videos_not_in_library_total": len(videos_not_in_library),
+        "duplicate_items_total": len(duplicate_items)
+    }
+    result_contents = {
+        "input_data": input_data,
+        "result_data": result_data
+    }
+    common.finish_result_workflow(result_contents, flags, "library")
+
+def get_library_playlist_entry(playlist_id, library_playlists, playlist_item_ids):
+    return {
+        "playlist_id": playlist_id,
+        "playlist_title": library_playlists.get(playlist_id, {}).get("title"),
+        "playlist_url": f"https://www.youtube.com/playlist?list={playlist_id}",
+        "playlist_item_ids": playlist_item_ids
+    }
+
+def fill_category_playlists(youtube, categories_data, playlist_names, default_playlist_name, use_auto_names, use_library):
+    # Returns the playlist of each category and the result data of filling it
+    # Names are asked for first, then every playlist is created before the categories are filled side by side
+    for category in categories_data:
+        if category not in playlist_names and journal.get_created_playlist(category) is None:
+            playlist_names[category] = common.get_playlist_name(category, default_playlist_name, use_auto_names)
+
+    if len(categories_data) == 0:
+        return ({}, {})
+    categories = list(categories_data)
+    with ThreadPoolExecutor(max_workers=min(CATEGORY_WORKERS, len(categories))) as pool:
+        playlists = dict(zip(categories, pool.map(
+            lambda category: create_category_playlist(youtube, category, playlist_names, default_playlist_name, use_auto_names, use_library),
+            categories
+        )))
+
+        # The result lists the created playlists in category order, whatever order they are filled in
+        created_categories = [category for category in categories if playlists[category][0]]
+        creation_indexes = {category: index for index, category in enumerate(created_categories)}
+
+        # One progress bar covers every category, counting the videos of each category once it is filled
+        progress_bar = tqdm(total=sum(len(categories_data[category]) for category in created_categories), desc="Filling category playlists", unit="video")
+
+        def fill_category_playlist(category):
+            playlist = playlists[category][1]
+            destination_playlist_videos = common.get_library_playlist_videos(playlist["playlist_id"]) if use_library else VideoCollection()
+            with reports.section("result_data", "playlists_creations", creation_indexes[category], "playlist_result_data"):
+                playlist_result_data = operations.add_videos_to_playlist(youtube, categories_data[category], playlist["playlist_url"], destination_playlist_videos, is_preview=False, show_progress=False)
+            progress_bar.update(len(categories_data[category]))
+            return playlist_result_data
+
+        # Largest categories start first, so the run lasts about as long as its largest category
+        largest_first = sorted(created_categories, key=lambda category: len(categories_data[category]), reverse=True)
+        playlists_result_data = dict(zip(largest_first, pool.map(fill_category_playlist, largest_first)))
+        progress_bar.close()
+    return (playlists, playlists_result_data)
 
-        playlist_result_data = operations.add_videos_to_playlist(youtube, videos, playlist[1]["playlist_url"], destination_playlist_videos=[], is_preview=False)
-        playlists_creations.append({
+def create_category_playlist(youtube, category, playlist_names, default_playlist_name, use_auto_names, use_library=False):
+    # Playlists created by an interrupted run are reused instead of created again
+    created_playlist = journal.get_created_playlist(category)
+    if created_playlist is not None:
+        print(f"Reusing playlist {created_playlist['playlist_id']} created for category '{category}'")
+        return (True, created_playlist)
+
+    if category in playlist_names:
+        playlist_name = playlist_names[category]
+    else:
+        playlist_name = common.get_playlist_name(category, default_playlist_name, use_auto_names)
+
+    # A playlist of the same name in the library index is reused, and recorded so resumed runs reuse it too
+    playlist_id = library.find_playlist_id(playlist_name) if use_library else None
+    if playlist_id is not None:
+        print(f"Reusing your playlist {playlist_id} named '{playlist_name}' for category '{category}'")
+        reused_playlist = {
             "playlist_name": playlist_name,
-            "playlist_id": playlist[1]["playlist_id"],
-            "playlist_url": playlist[1]["playlist_url"],
+            "playlist_id": playlist_id,
+            "playlist_url": f"https://www.youtube.com/playlist?list={playlist_id}"
+        }
+        journal.record("playlist", category=category, **reused_playlist)
+        return (True, reused_playlist)
+
+    journal.begin()
+    playlist = operations.create_playlist(youtube, playlist_name)
+    if not playlist[0]:
+        journal.record_failure()
+        return (False, {"playlist_name": playlist_name})
+
+    created_playlist = {
+        "playlist_name": playlist_name,
+        "playlist_id": playlist[1]["playlist_id"],
+        "playlist_url": playlist[1]["playlist_url"]
+    }
+    journal.record("playlist", category=category, **created_playlist)
+    return (True, created_playlist)
+
+def stream_bulk_videos_playlist(youtube, inputs, categories, playlist_url, destination_playlist_videos, videos_at_hand_label, playlist_function):
+    # Operates on each resolved chunk while later playlist pages are still downloading
+    result_data = None
+    videos_at_hand_total = 0
+    unavailable_videos = []
+    unavailable_playlist_ids = []
+    for chunk in common.iter_in_background(common.iter_videos_at_hand(youtube, inputs, categories), common.STREAM_BUFFERED_CHUNKS):
+        videos_at_hand_total += len(chunk["videos_at_hand"])
+        unavailable_videos.extend(chunk["unavailable_videos"].values())
+        unavailable_playlist_ids.extend(chunk["unavailable_playlist_ids"])
+        if len(chunk["videos_at_hand"]) > 0:
+            with reports.section("result_data"):
+                chunk_result_data = playlist_function(youtube, chunk["videos_at_hand"], playlist_url, destination_playlist_videos, is_preview=False)
+            result_data = common.merge_operation_results(result_data, chunk_result_data)
+
+            # Later chunks see the videos added so far, which keeps -ordered positions contiguous
+            for video in chunk_result_data.get("video_additions", []):
+                destination_playlist_videos.add(video)
+
+    if result_data is None:
+        result_data = playlist_function(youtube, {}, playlist_url, destination_playlist_videos, is_preview=False)
+
+    # Processed videos are listed in the result data only, the input data keeps the totals
+    input_data = {
+        "playlist_url": playlist_url,
+        "unavailable_videos": unavailable_videos,
+        "unavailable_playlist_ids": unavailable_playlist_ids,
+        videos_at_hand_label + "_total": videos_at_hand_total,
+        "unavailable_videos_total": len(unavailable_videos),
+        "unavailable_playlist_ids_total": len(unavailable_playlist_ids)
+    }
+    return {
+        "input_data": input_data,
+        "result_data": result_data
+    }
+
+def stream_divide_into_categories(youtube, inputs, categories, default_playlist_name, use_auto_names, use_library=False):
+    # Creates category playlists as categories show up and fills them chunk by chunk
+    category_playlists = {}
+    category_videos_added = {}
+    category_results = {}
+    # Playlists are listed in the result in the order their first videos were added
+    creation_indexes = {}
+    failed = {}
+    videos_to_categorize_total = 0
+    unavailable_videos = []
+    unavailable_playlist_ids = []
+    for chunk in common.iter_in_background(common.iter_videos_at_hand(youtube, inputs, categories), common.STREAM_BUFFERED_CHUNKS):
+        videos_to_categorize_total += len(chunk["videos_at_hand"])
+        unavailable_videos.extend(chunk["unavailable_videos"].values())
+        unavailable_playlist_ids.extend(chunk["unavailable_playlist_ids"])
+
+        for category, videos in common.categorize_videos(chunk["videos_at_hand"]).items():
+            if category not in category_playlists:
+                category_playlists[category] = create_category_playlist(youtube, category, {}, default_playlist_name, use_auto_names, use_library)
+            playlist = category_playlists[category]
+            if not playlist[0]:
+                if category not in failed:
+                    failed[category] = {
+                        "playlist_name": playlist[1]["playlist_name"],
+                        "videos_not_categorized": VideoCollection()
+                    }
+                failed[category]["videos_not_categorized"].update(videos)
+                continue
+
+            if category not in category_videos_added:
+                category_videos_added[category] = common.get_library_playlist_videos(playlist[1]["playlist_id"]) if use_library else VideoCollection()
+            videos_added = category_videos_added[category]
+            if category not in creation_indexes:
+                creation_indexes[category] = len(creation_indexes)
+            with reports.section("result_data", "playlists_creations", creation_indexes[category], "playlist_result_data"):
+                playlist_result_data = operations.add_videos_to_playlist(youtube, videos, playlist[1]["playlist_url"], destination_playlist_videos=videos_added, is_preview=False)
+            category_results[category] = common.merge_operation_results(category_results.get(category), playlist_result_data)
+            for video in playlist_result_data["video_additions"]:
+                videos_added.add(video)
+
+    playlists_creations = [
+        {
+            "playlist_name": category_playlists[category][1]["playlist_name"],
+            "playlist_id": category_playlists[category][1]["playlist_id"],
+            "playlist_url": category_playlists[category][1]["playlist_url"],
             "playlist_result_data": playlist_result_data
-        })
+        }
+        for category, playlist_result_data in category_results.items()
+    ]
+    failed = list(failed.values())
+    input_data = {
+        "unavailable_videos": unavailable_videos,
+        "unavailable_playlist_ids": unavailable_playlist_ids,
+        "videos_to_categorize_total": videos_to_categorize_total,
+        "unavailable_videos_total": len(unavailable_videos),
+        "unavailable_playlist_ids_total": len(unavailable_playlist_ids)
+    }
     result_data = {
         "no_actions": len(playlists_creations) == 0,
         "playlists_creations": playlists_creations,
         "failed": failed,
         "playlists_creations_total": len(playlists_creations),
-        "failed_total": len(failed),
+        "failed_total": len(failed)
     }
-    result_contents = {
+    return {
         "input_data": input_data,
         "result_data": result_data
-    }
-    common.save_json(result_contents, "result", "Operation completed. Result saved to: ")
\ No newline at end of file
+    }
\ No newline at end of file